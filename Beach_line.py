@@ -8,8 +8,15 @@ import numpy as np
 
 
 class Arc:
+    # łuki są tworzone po trzy przy każdym zdarzeniu punktowym, a ich pola czyta pętla drzewa czerwono-czarnego,
+    # więc rezygnujemy z __dict__ na rzecz stałego zestawu pól
+    __slots__ = ('parent', 'left', 'right', 'prev', 'next', 'color', 'site', 'left_half_edge', 'right_half_edge',
+                 'event')
+
     def __init__(self, site):
+        self.reset(site)
 
+    def reset(self, site):
         #tree part
         self.parent = None
         self.left = None
@@ -31,10 +38,41 @@ class BeachLine:
     def __init__(self, compute_breakpoint):
         self.root = None
         self.compute_breakpoint = compute_breakpoint
+        # pula usuniętych łuków do ponownego użycia, żeby przy każdym zdarzeniu nie alokować nowych obiektów
+        self.free_arcs = []
+        self.pool_hits = 0
+        self.pool_misses = 0
+        #liczba łuków w drzewie
+        self.size = 0
+
+    def create_arc(self, site):
+        '''
+        zwraca łuk dla site, w miarę możliwości wyczyszczony łuk z puli zamiast nowego obiektu
+        :param site: site związany z łukiem
+        :return: łuk
+        '''
+        if self.free_arcs:
+            self.pool_hits += 1
+            arc = self.free_arcs.pop()
+            arc.reset(site)
+            return arc
+        self.pool_misses += 1
+        return Arc(site)
+
+    def release(self, arc):
+        '''
+        oddaje łuk do puli. Wolno wołać dopiero, gdy łuk nie jest już w drzewie i nic z niego nie czyta,
+        czyli po replace/delete i po obsłudze zdarzenia, które go usunęło
+        :param arc: usunięty łuk
+        '''
+        #zerujemy referencje, żeby łuk w puli nie trzymał przy życiu reszty drzewa ani półprostych
+        arc.reset(None)
+        self.free_arcs.append(arc)
 
     def set_root(self, arc):
         self.root = arc
         self.root.color = 0
+        self.size = 1
 
     def is_empty(self):
         return self.root is None
@@ -133,6 +171,7 @@ class BeachLine:
         y.next = x
         x.prev = y
 
+        self.size += 1
         self.fix_insert(y)
 
     def insert_after(self, x, y):
@@ -152,6 +191,7 @@ class BeachLine:
         y.prev = x
         x.next = y
 
+        self.size += 1
         self.fix_insert(y)
 
     def replace(self, x, y):
@@ -250,6 +290,7 @@ class BeachLine:
             node_v.parent = node_u.parent
 
     def delete(self, node):
+        self.size -= 1
         # find the node position
         node_color = node.color
         if node.left is None:
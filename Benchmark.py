@@ -0,0 +1,458 @@
+#pomiary całego algorytmu Fortune'a (czas, pamięć) na dużych zbiorach punktów
+#uruchomienie: python Benchmark.py run --output wyniki.json
+#              python Benchmark.py compare baseline.json wyniki.json
+#              python Benchmark.py memory --sizes 100000 1000000
+#              python Benchmark.py memory --stream --sizes 100000 1000000
+#              python Benchmark.py stats --sizes 10000
+#              python Benchmark.py check --sizes 100 1000 10000
+#              python Benchmark.py locate --sizes 1000 100000 --queries 100000
+#              python Benchmark.py io --sizes 10000 100000
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import numpy as np
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.benchmark_cache')
+DEFAULT_SIZES = [10 ** 2, 10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]
+
+
+#generatory zbiorów punktów, odpowiedniki funkcji z komórki 4 notatnika, ale deterministyczne (ziarno) i wektorowe
+def uniform(n, rng):
+    return rng.uniform(0, 2, size=(n, 2))
+
+
+def grid_coordinates(n, rng, epsilon=1e-5):
+    #kwadrat ceil(sqrt(n)) x ceil(sqrt(n)) punktów kratowych obcięty do n, z szumem na współrzędnej y
+    side = int(np.ceil(np.sqrt(n)))
+    i, j = np.divmod(np.arange(n), side)
+    return np.column_stack((i, j + rng.uniform(0, epsilon, size=n))).astype(float)
+
+
+def points_on_circle(n, rng, R=10, epsilon=1e-5):
+    alpha = np.arange(n) / n * 2 * np.pi + rng.uniform(0, epsilon, size=n)
+    return np.column_stack((R * np.sin(alpha), R * np.cos(alpha)))
+
+
+def points_on_vertical_line(n, rng, y=0.5, x_min=0.05, x_max=1, epsilon=1e-4):
+    return np.column_stack((np.arange(n) / n * (x_max - x_min) + x_min, y + rng.uniform(0, epsilon, size=n)))
+
+
+def clustered(n, rng, clusters=20, spread=0.02):
+    #punkty skupione wokół losowych środków (rozkład normalny), typowe dla danych pomiarowych
+    centers = rng.uniform(0, 2, size=(clusters, 2))
+    return centers[rng.integers(0, clusters, size=n)] + rng.normal(0, spread, size=(n, 2))
+
+
+def equal_y(n, rng, rows=20):
+    #punkty w kilku poziomych rzędach o dokładnie równych y (wiele zdarzeń punktowych na tej samej wysokości)
+    return np.column_stack((rng.uniform(0, 2, size=n), rng.integers(0, rows, size=n) / rows * 2))
+
+
+def lattice(n, rng):
+    #siatka trójkątna bez szumu: punkty co drugiego rzędu leżą dokładnie pod breakpointami rzędu wyżej
+    side = int(np.ceil(np.sqrt(n)))
+    i, j = np.divmod(np.arange(n), side)
+    return np.column_stack((j + 0.5 * (i % 2), i * np.sqrt(3) / 2)).astype(float)
+
+
+DATASETS = {'uniform': uniform, 'grid': grid_coordinates, 'circle': points_on_circle,
+            'vertical_line': points_on_vertical_line, 'clustered': clustered, 'equal_y': equal_y, 'lattice': lattice}
+CHECK_DATASETS = ['uniform', 'clustered', 'circle', 'equal_y', 'lattice']
+
+
+def load_dataset(name, n, seed=0):
+    '''
+    zbiór punktów jest generowany raz i zapisywany w CACHE_DIR, więc kolejne uruchomienia mierzą te same dane
+    :return: tablica (n, 2) float64
+    '''
+    path = os.path.join(CACHE_DIR, '%s_%d_%d.npy' % (name, n, seed))
+    if os.path.exists(path):
+        return np.load(path)
+    points = DATASETS[name](n, np.random.default_rng(seed))
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    np.save(path, points)
+    return points
+
+
+#silniki liczące diagram, każdy dostaje tablicę punktów i liczy pełny diagram
+def run_fortune(points):
+    from Fortune_algorithm import FortuneAlgorithm
+
+    fortune = FortuneAlgorithm(points, named_metric='euclidean_2d_scalar')
+    fortune.construct()
+    fortune.bound()
+
+
+def run_scipy(points):
+    from scipy.spatial import Voronoi
+
+    Voronoi(points)
+
+
+def run_delaunay(points):
+    from Delaunay_voronoi import delaunay_voronoi
+
+    delaunay_voronoi(points)
+
+
+ENGINES = {'fortune': run_fortune, 'scipy': run_scipy, 'delaunay': run_delaunay}
+
+
+def time_engine(engine, points, repeat=5, warmup=1):
+    '''
+    :return: słownik ze statystykami czasów (s) z repeat pomiarów perf_counter po warmup rozgrzewkach
+    '''
+    for _ in range(warmup):
+        engine(points)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        engine(points)
+        times.append(time.perf_counter() - start)
+    return {'min': min(times), 'median': statistics.median(times), 'mean': statistics.mean(times),
+            'stdev': statistics.stdev(times) if len(times) > 1 else 0.0, 'times': times}
+
+
+def run(engines, datasets, sizes, repeat, warmup, budget, seed=0):
+    '''
+    mierzy każdy silnik na każdym zbiorze dla rosnących n. Gdy pojedynczy przebieg przekroczy budget sekund,
+    większe n dla tej pary silnik/zbiór są pomijane
+    :return: słownik gotowy do zapisania jako JSON
+    '''
+    results = []
+    print('%10s %14s %10s %12s %12s' % ('engine', 'dataset', 'n', 'median [s]', 'stdev [s]'))
+    for engine_name in engines:
+        for dataset in datasets:
+            for n in sorted(sizes):
+                points = load_dataset(dataset, n, seed)
+                try:
+                    stats = time_engine(ENGINES[engine_name], points, repeat, warmup)
+                except Exception as error:
+                    results.append({'engine': engine_name, 'dataset': dataset, 'n': n, 'error': repr(error)})
+                    print('%10s %14s %10d %25s' % (engine_name, dataset, n, type(error).__name__))
+                    break
+                results.append({'engine': engine_name, 'dataset': dataset, 'n': n, **stats})
+                print('%10s %14s %10d %12.4f %12.4f' % (engine_name, dataset, n, stats['median'], stats['stdev']))
+                if stats['min'] > budget:
+                    break
+    return {'python': platform.python_version(), 'machine': platform.machine(), 'seed': seed,
+            'repeat': repeat, 'warmup': warmup, 'results': results}
+
+
+def compare(baseline, current, threshold):
+    '''
+    porównuje medianę czasu każdego pomiaru z bazowym. Pomiar jest regresją, gdy jest wolniejszy o więcej niż threshold
+    :return: lista regresji (engine, dataset, n, stosunek czasów)
+    '''
+    key = lambda r: (r['engine'], r['dataset'], r['n'])
+    reference = {key(r): r for r in baseline['results'] if 'median' in r}
+    regressions = []
+    print('%10s %14s %10s %12s %12s %8s' % ('engine', 'dataset', 'n', 'baseline', 'current', 'ratio'))
+    for result in current['results']:
+        if 'median' not in result or key(result) not in reference:
+            continue
+        ratio = result['median'] / reference[key(result)]['median']
+        flag = ''
+        if ratio > 1 + threshold:
+            regressions.append(key(result) + (ratio,))
+            flag = '  REGRESSION'
+        print('%10s %14s %10d %12.4f %12.4f %7.2fx%s' % (key(result) + (reference[key(result)]['median'],
+                                                                   result['median'], ratio, flag)))
+    return regressions
+
+
+def sweep_stats(datasets, sizes, seed=0):
+    '''
+    zamiatanie z licznikami (construct(stats=True)) dla każdego zbioru, pozwala porównać np. punkty prawie współliniowe
+    z jednostajnymi
+    :return: lista słowników z SweepStats.as_dict()
+    '''
+    from Fortune_algorithm import FortuneAlgorithm
+
+    results = []
+    for dataset in datasets:
+        for n in sizes:
+            fortune = FortuneAlgorithm(load_dataset(dataset, n, seed), named_metric='euclidean_2d_scalar')
+            fortune.construct(stats=True)
+            fortune.bound()
+            result = {'dataset': dataset, 'n': n, **fortune.stats.as_dict()}
+            results.append(result)
+            print(json.dumps(result))
+    return results
+
+
+def ridge_map(pairs, segments, tolerance):
+    '''
+    :param pairs: pary punktów rozdzielanych przez krawędzie
+    :param segments: końce krawędzi, brakujący koniec półprostej to (nan, nan)
+    :return: słownik (mniejszy punkt, większy punkt) -> skończone końce krawędzi, bez krawędzi krótszych niż tolerance
+    '''
+    pairs = np.sort(np.asarray(pairs, dtype=np.int64).reshape(-1, 2), axis=1)
+    segments = np.asarray(segments, dtype=float).reshape(-1, 2, 2)
+    with np.errstate(invalid='ignore'):
+        keep = ~(np.linalg.norm(segments[:, 0] - segments[:, 1], axis=1) <= tolerance)
+    return {tuple(pair): segment[~np.isnan(segment).any(axis=1)]
+            for pair, segment in zip(pairs[keep].tolist(), segments[keep])}
+
+
+def ridge_error(a, b):
+    #największa odległość odpowiadających sobie końców dwóch krawędzi (inf, gdy różni je liczba końców)
+    if len(a) != len(b):
+        return np.inf
+    if len(a) < 2:
+        return np.abs(a - b).max(initial=0.0)
+    return min(np.abs(a - b).max(), np.abs(a - b[::-1]).max())
+
+
+def check_against_scipy(datasets, sizes, seed=0, tolerance=1e-6):
+    '''
+    porównuje krawędzie i półproste diagramu z zamiatania (przed bound) z krawędziami scipy.spatial.Voronoi.
+    Krawędzie krótsze niż tolerance (względem rozmiaru zbioru) są pomijane, bo wierzchołek wspólny dla więcej niż
+    trzech punktów oba programy dzielą zależnie od zaokrągleń
+    :return: lista słowników: liczba krawędzi, liczba krawędzi tylko w jednym diagramie albo o innej liczbie końców
+    i największa odległość końców krawędzi wspólnych
+    '''
+    from scipy.spatial import Voronoi
+    from Fortune_algorithm import FortuneAlgorithm
+
+    point = lambda vertex: (np.nan, np.nan) if vertex is None else vertex.point
+    results = []
+    print('%14s %10s %10s %10s %14s' % ('dataset', 'n', 'edges', 'mismatched', 'max error'))
+    for dataset in datasets:
+        for n in sorted(sizes):
+            points = load_dataset(dataset, n, seed)
+            scale = tolerance * max(1.0, np.abs(points).max())
+
+            fortune = FortuneAlgorithm(points, named_metric='euclidean_2d_scalar')
+            fortune.construct()
+            half_edges = [e for e in fortune.diagram.half_edges if e.twin is not None and
+                          e.incident_face.site.idx < e.twin.incident_face.site.idx]
+            found = ridge_map([(e.incident_face.site.idx, e.twin.incident_face.site.idx) for e in half_edges],
+                              [(point(e.origin), point(e.destination)) for e in half_edges], scale)
+
+            voronoi = Voronoi(points)
+            ridge_vertices = np.asarray(voronoi.ridge_vertices, dtype=np.int64).reshape(-1, 2)
+            segments = np.where((ridge_vertices == -1)[:, :, None], np.nan, voronoi.vertices[ridge_vertices])
+            expected = ridge_map(voronoi.ridge_points, segments, scale)
+
+            errors = [ridge_error(found[pair], expected[pair]) for pair in found.keys() & expected.keys()]
+            mismatched = len(found.keys() ^ expected.keys()) + sum(error == np.inf for error in errors)
+            error = max([error for error in errors if error < np.inf], default=0.0)
+            result = {'dataset': dataset, 'n': n, 'edges': len(expected), 'mismatched': mismatched,
+                      'max_error': error}
+            results.append(result)
+            print('%14s %10d %10d %10d %14.3e' % (dataset, n, result['edges'], mismatched, error))
+    return results
+
+
+def locate_benchmark(datasets, sizes, queries, seed=0, brute_force_limit=10 ** 9):
+    '''
+    porównuje SiteGrid (budowa i zapytania) z argmin po odległościach do wszystkich punktów. Zapytania są losowane
+    jednostajnie w prostokącie otaczającym punkty. Argmin liczymy tylko, gdy queries * n nie przekracza
+    brute_force_limit
+    :return: lista słowników z czasami (s) i liczbą różnych odpowiedzi (różne odległości, nie indeksy)
+    '''
+    from Point_location import SiteGrid, brute_force_nearest
+
+    results = []
+    print('%14s %10s %10s %10s %12s %12s %10s' % ('dataset', 'n', 'queries', 'build [s]', 'grid [s]', 'argmin [s]',
+                                                 'mismatches'))
+    for dataset in datasets:
+        for n in sorted(sizes):
+            points = load_dataset(dataset, n, seed)
+            query_points = np.random.default_rng(seed + 1).uniform(points.min(axis=0), points.max(axis=0),
+                                                                   size=(queries, 2))
+            start = time.perf_counter()
+            grid = SiteGrid(points)
+            build = time.perf_counter() - start
+            start = time.perf_counter()
+            found = grid.nearest(query_points)
+            result = {'dataset': dataset, 'n': n, 'queries': queries, 'build': build,
+                      'grid': time.perf_counter() - start, 'argmin': None, 'mismatches': None}
+            if queries * n <= brute_force_limit:
+                start = time.perf_counter()
+                expected = brute_force_nearest(points, query_points)
+                result['argmin'] = time.perf_counter() - start
+                distance = lambda indices: np.einsum('ij,ij->i', points[indices] - query_points,
+                                                     points[indices] - query_points)
+                result['mismatches'] = int(np.count_nonzero(distance(found) != distance(expected)))
+            results.append(result)
+            print('%14s %10d %10d %10.4f %12.4f %12s %10s' % (dataset, n, queries, build, result['grid'],
+                                                             '-' if result['argmin'] is None else
+                                                             '%.4f' % result['argmin'],
+                                                             '-' if result['mismatches'] is None else
+                                                             result['mismatches']))
+    return results
+
+
+def io_benchmark(sizes, seed=0, directory=CACHE_DIR):
+    '''
+    porównuje zapis i odczyt punktów w JSON (jak w komórce 11 notatnika) z plikami .npy mapowanymi do pamięci
+    oraz czas zapisu i ponownego otwarcia diagramu (CompactVoronoiDiagram) w formacie Diagram_io
+    :return: lista słowników z czasami (s) i rozmiarem pliku diagramu (MB)
+    '''
+    import Diagram_io
+    from Fortune_algorithm import FortuneAlgorithm
+    from Voronoi_diagram import CompactVoronoiDiagram
+
+    os.makedirs(directory, exist_ok=True)
+    points_json = os.path.join(directory, 'io_points.json')
+    points_npy = os.path.join(directory, 'io_points.npy')
+    diagram_npz = os.path.join(directory, 'io_diagram.npz')
+
+    results = []
+    print('%10s %12s %12s %12s %12s %12s %12s %10s' % ('n', 'json save', 'json load', 'npy save', 'npy load',
+                                                       'npz save', 'npz load', 'npz [MB]'))
+    for n in sizes:
+        points = load_dataset('uniform', n, seed)
+        result = {'n': n}
+
+        start = time.perf_counter()
+        with open(points_json, 'w') as outfile:
+            json.dump(points.tolist(), outfile)
+        result['json_save'] = time.perf_counter() - start
+        start = time.perf_counter()
+        with open(points_json) as infile:
+            np.array(json.load(infile))
+        result['json_load'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        Diagram_io.save_points(points_npy, points)
+        result['npy_save'] = time.perf_counter() - start
+        start = time.perf_counter()
+        Diagram_io.load_points(points_npy)
+        result['npy_load'] = time.perf_counter() - start
+
+        fortune = FortuneAlgorithm(points, named_metric='euclidean_2d_scalar', diagram_type=CompactVoronoiDiagram)
+        fortune.construct()
+        fortune.bound()
+        start = time.perf_counter()
+        Diagram_io.save_diagram(diagram_npz, fortune.diagram)
+        result['npz_save'] = time.perf_counter() - start
+        start = time.perf_counter()
+        Diagram_io.load_diagram(diagram_npz)
+        result['npz_load'] = time.perf_counter() - start
+        result['npz_mb'] = os.path.getsize(diagram_npz) / 2 ** 20
+
+        results.append(result)
+        print('%10d %12.4f %12.4f %12.4f %12.4f %12.4f %12.4f %10.1f' % (
+            n, result['json_save'], result['json_load'], result['npy_save'], result['npy_load'], result['npz_save'],
+            result['npz_load'], result['npz_mb']))
+    return results
+
+
+def measure_memory(number_of_points, named_metric='euclidean_2d_scalar', seed=0):
+    '''
+    wykonuje jedno zamiatanie dla losowych punktów z rozkładu jednostajnego i mierzy zużycie pamięci.
+    Powinno być wołane w osobnym procesie, bo maksymalne RSS dotyczy całego procesu
+    :return: słownik z maksymalnym RSS (MB), liczbą zaalokowanych bloków przed i po zamiataniu oraz czasem (s)
+    '''
+    from Fortune_algorithm import FortuneAlgorithm
+
+    points = np.random.default_rng(seed).uniform(0, 1, size=(number_of_points, 2))
+    blocks_before = sys.getallocatedblocks()
+
+    start = time.perf_counter()
+    fortune = FortuneAlgorithm(points, named_metric=named_metric)
+    fortune.construct()
+    fortune.bound(float("inf"), float("inf"), -float("inf"), -float("inf"))
+    elapsed = time.perf_counter() - start
+
+    return {'n': number_of_points, 'metric': named_metric, 'time': elapsed,
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            'allocated_blocks': sys.getallocatedblocks() - blocks_before}
+
+
+def sorted_uniform_stream(n, seed=0, stripes=1024):
+    '''
+    punkty z rozkładu jednostajnego w kwadracie jednostkowym posortowane po y malejąco, generowane pasami poziomymi,
+    więc w pamięci jest naraz tylko jeden pas (wejście dla zamiatania strumieniowego)
+    :return: generator krotek (x, y)
+    '''
+    rng = np.random.default_rng(seed)
+    counts = rng.multinomial(n, np.full(stripes, 1 / stripes))
+    for stripe, count in enumerate(counts):
+        top = 1 - stripe / stripes
+        ys = np.sort(rng.uniform(top - 1 / stripes, top, size=count))[::-1]
+        yield from zip(rng.uniform(0, 1, size=count).tolist(), ys.tolist())
+
+
+def measure_stream_memory(number_of_points, named_metric='euclidean_2d_scalar', seed=0):
+    #jak measure_memory, ale dla StreamingFortune czytającego punkty z sorted_uniform_stream
+    from Streaming_sweep import StreamingFortune
+
+    blocks_before = sys.getallocatedblocks()
+    start = time.perf_counter()
+    fortune = StreamingFortune(sorted_uniform_stream(number_of_points, seed), named_metric)
+    edges = sum(1 for _ in fortune.edges())
+    elapsed = time.perf_counter() - start
+
+    return {'n': number_of_points, 'metric': named_metric, 'time': elapsed, 'edges': edges,
+            'max_beach_line': fortune.max_beach_line_size,
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            'allocated_blocks': sys.getallocatedblocks() - blocks_before}
+
+
+def memory(sizes, named_metric, stream=False):
+    print('%10s %10s %14s %18s' % ('n', 'time [s]', 'peak RSS [MB]', 'allocated blocks'))
+    results = []
+    for n in sizes:
+        command = [sys.executable, __file__, 'memory-child', '--sizes', str(n), '--metric', named_metric]
+        output = subprocess.run(command + (['--stream'] if stream else []),
+                                check=True, capture_output=True, text=True).stdout
+        result = json.loads(output)
+        results.append(result)
+        print('%10d %10.2f %14.1f %18d' % (n, result['time'], result['peak_rss_mb'], result['allocated_blocks']))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('command', choices=['run', 'compare', 'stats', 'check', 'locate', 'io', 'memory', 'memory-child'])
+    parser.add_argument('files', nargs='*', help='compare: plik bazowy i plik z bieżącymi wynikami')
+    parser.add_argument('--sizes', type=int, nargs='+', default=None)
+    parser.add_argument('--metric', default='euclidean_2d_scalar')
+    parser.add_argument('--engines', nargs='+', choices=sorted(ENGINES), default=sorted(ENGINES))
+    parser.add_argument('--datasets', nargs='+', choices=sorted(DATASETS), default=sorted(DATASETS))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--budget', type=float, default=60.0, help='czas [s], po którym nie mierzymy większych n')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--queries', type=int, default=10 ** 5, help='locate: liczba zapytań')
+    parser.add_argument('--stream', action='store_true', help='memory: zamiatanie strumieniowe (Streaming_sweep)')
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--threshold', type=float, default=0.1, help='dopuszczalne spowolnienie (0.1 = 10%%)')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        report = run(args.engines, args.datasets, args.sizes or DEFAULT_SIZES, args.repeat, args.warmup, args.budget,
+                     args.seed)
+        with open(args.output, 'w') as outfile:
+            json.dump(report, outfile, indent=1)
+    elif args.command == 'compare':
+        with open(args.files[0]) as baseline_file, open(args.files[1]) as current_file:
+            found = compare(json.load(baseline_file), json.load(current_file), args.threshold)
+        sys.exit(1 if found else 0)
+    elif args.command == 'stats':
+        sweep_stats(args.datasets, args.sizes or [10 ** 4], args.seed)
+    elif args.command == 'check':
+        found = check_against_scipy(args.datasets if args.datasets != sorted(DATASETS) else CHECK_DATASETS,
+                                    args.sizes or [10 ** 2, 10 ** 3, 10 ** 4], args.seed)
+        sys.exit(1 if any(result['mismatched'] for result in found) else 0)
+    elif args.command == 'locate':
+        locate_benchmark(args.datasets, args.sizes or [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6], args.queries, args.seed)
+    elif args.command == 'io':
+        io_benchmark(args.sizes or [10 ** 4, 10 ** 5], args.seed)
+    elif args.command == 'memory':
+        memory(args.sizes or [10 ** 5, 10 ** 6], args.metric, args.stream)
+    elif args.stream:
+        print(json.dumps(measure_stream_memory(args.sizes[0], args.metric)))
+    else:
+        print(json.dumps(measure_memory(args.sizes[0], args.metric)))
@@ -0,0 +1,74 @@
+#diagram Voronoia jako graf dualny triangulacji Delaunaya (scipy.spatial.Delaunay), wersja wektorowa algorytmu
+#z komórki 4 notatnika: wierzchołki diagramu to środki okręgów opisanych na trójkątach, krawędź diagramu łączy
+#środki dwóch sąsiednich trójkątów, a bok otoczki (trójkąt bez sąsiada) daje półprostą
+
+import numpy as np
+from scipy.spatial import Delaunay
+
+
+def circumcenters(a, b, c):
+    '''
+    środki okręgów opisanych na trójkątach abc, https://en.wikipedia.org/wiki/Circumscribed_circle
+    (Circumcenter coordinates), liczone względem wierzchołka a, co zmniejsza błędy zaokrągleń
+    :param a, b, c: tablice (T, 2) wierzchołków trójkątów
+    :return: tablica (T, 2)
+    '''
+    b = b - a
+    c = c - a
+    d = 2 * (b[:, 0] * c[:, 1] - b[:, 1] * c[:, 0])
+    b2 = np.einsum('ij,ij->i', b, b)
+    c2 = np.einsum('ij,ij->i', c, c)
+    ux = (c[:, 1] * b2 - b[:, 1] * c2) / d
+    uy = (b[:, 0] * c2 - c[:, 0] * b2) / d
+    return a + np.column_stack((ux, uy))
+
+
+def delaunay_voronoi(points):
+    '''
+    wyznacza krawędzie i półproste diagramu Voronoia z triangulacji Delaunaya bez pętli po trójkątach
+    :param points: tablica (n, 2) punktów (co najmniej trzy niewspółliniowe)
+    :return: słownik: 'vertices' (T, 2) wierzchołki diagramu (środki okręgów opisanych, po jednym na trójkąt),
+    'edges' (F, 2, 2) odcinki, 'edge_vertices' (F, 2) ich wierzchołki, 'edge_sites' (F, 2) punkty, które rozdzielają,
+    'ray_origins' (R, 2), 'ray_vertices' (R,), 'ray_directions' (R, 2) i 'ray_sites' (R, 2) półproste.
+    Wektor kierunku półprostej ma długość boku otoczki, tak jak w calculate_vec z notatnika
+    '''
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    triangulation = Delaunay(points)
+    simplices = triangulation.simplices
+    neighbors = triangulation.neighbors
+    vertices = circumcenters(*(points[simplices[:, i]] for i in range(3)))
+
+    #bok naprzeciw wierzchołka i trójkąta t to (i + 1, i + 2), a neighbors[t, i] to trójkąt po drugiej stronie boku
+    triangles = np.arange(len(simplices))[:, None]
+    first = simplices[:, [1, 2, 0]]
+    second = simplices[:, [2, 0, 1]]
+
+    #każdą krawędź wewnętrzną bierzemy raz, od trójkąta o mniejszym numerze
+    inner = neighbors > triangles
+    t, i = np.nonzero(inner)
+    edge_vertices = np.column_stack((t, neighbors[t, i]))
+    edge_sites = np.column_stack((first[t, i], second[t, i]))
+
+    #półprosta jest prostopadła do boku otoczki ab i biegnie na zewnątrz, czyli od wierzchołka c naprzeciw boku
+    t, i = np.nonzero(neighbors < 0)
+    a, b, c = points[first[t, i]], points[second[t, i]], points[simplices[t, i]]
+    side = b - a
+    direction = np.column_stack((-side[:, 1], side[:, 0]))
+    inward = np.einsum('ij,ij->i', direction, c - a) > 0
+    direction[inward] *= -1
+
+    return {'vertices': vertices,
+            'edges': vertices[edge_vertices], 'edge_vertices': edge_vertices, 'edge_sites': edge_sites,
+            'ray_origins': vertices[t], 'ray_vertices': t, 'ray_directions': direction,
+            'ray_sites': np.column_stack((first[t, i], second[t, i]))}
+
+
+def Voronoi_from_triangulation(points):
+    '''
+    wynik w postaci z notatnika: krawędź to lista dwóch punktów (tupli), półprosta to tupla (początek, wektor)
+    '''
+    result = delaunay_voronoi(points)
+    voronoi_edges = [[tuple(start), tuple(end)] for start, end in result['edges'].tolist()]
+    voronoi_edges += [(tuple(origin), tuple(direction))
+                      for origin, direction in zip(result['ray_origins'].tolist(), result['ray_directions'].tolist())]
+    return voronoi_edges
@@ -0,0 +1,131 @@
+#zapis i odczyt dużych zbiorów punktów i diagramów w postaci binarnej, bez zamiany współrzędnych na tekst (JSON)
+#
+#punkty: plik .npy z tablicą (n, 2) float64 albo surowy plik float64 (x0, y0, x1, y1, ...) w kolejności little-endian.
+#Oba są mapowane do pamięci (np.memmap), więc odczyt nie kopiuje danych, a strony pliku dociąga system przy dostępie.
+#
+#diagram: nieskompresowany plik .npz (np.savez) z tablicami jak w CompactVoronoiDiagram oraz polami 'format'
+#i 'version'. Tablice w .npz są zapisane w zipie bez kompresji, więc przy odczycie mapujemy je bezpośrednio z pliku:
+#z nagłówka zipa bierzemy położenie pliku .npy, z nagłówka .npy typ, kształt i początek danych
+
+import zipfile
+import numpy as np
+from numpy.lib import format as npy_format
+from Voronoi_diagram import CompactVoronoiDiagram
+
+DIAGRAM_FORMAT = 'voronoi-diagram'
+DIAGRAM_VERSION = 1
+DIAGRAM_ARRAYS = ('sites', 'vertices', 'edges', 'faces', 'links', 'face_edges')
+
+
+def load_points(path, mmap_mode='r'):
+    '''
+    :param path: plik .npy z tablicą (n, 2) float64 albo surowy plik float64 (dowolne inne rozszerzenie)
+    :param mmap_mode: tryb np.memmap ('r' tylko odczyt, 'c' zmiany tylko w pamięci), None wczytuje cały plik
+    :return: tablica (n, 2) float64 (np.memmap, gdy mmap_mode nie jest None)
+    '''
+    if str(path).endswith('.npy'):
+        points = np.load(path, mmap_mode=mmap_mode)
+    elif mmap_mode is None:
+        points = np.fromfile(path, dtype='<f8')
+    else:
+        points = np.memmap(path, dtype='<f8', mode=mmap_mode)
+
+    if points.dtype != np.float64 or (points.ndim == 2 and points.shape[1] != 2) or points.ndim > 2 or \
+            points.size % 2:
+        raise ValueError('expected float64 points (n, 2)', path, points.dtype, points.shape)
+    return points.reshape(-1, 2)
+
+
+def save_points(path, points):
+    #zapis w formacie dla load_points: .npy albo surowe float64
+    points = np.ascontiguousarray(points, dtype='<f8').reshape(-1, 2)
+    if str(path).endswith('.npy'):
+        np.save(path, points)
+    else:
+        points.tofile(path)
+
+
+def diagram_arrays(diagram):
+    '''
+    tablice diagramu w postaci CompactVoronoiDiagram, dla VoronoiDiagram przepisane z obiektów
+    :return: słownik: 'sites' (n, 2), 'vertices' (V, 2), 'edges' (E, 2) początek i koniec, 'faces' (E,) ściana,
+    'links' (E, 3) bliźniak, następna i poprzednia półprosta, 'face_edges' (n,) pierwsza półprosta ściany;
+    -1 oznacza brak
+    '''
+    if isinstance(diagram, CompactVoronoiDiagram):
+        return {'sites': diagram.sites_array(), 'vertices': diagram.vertices_array(), 'edges': diagram.edges_array(),
+                'faces': diagram.half_edge_faces(), 'links': diagram.half_edge_links(),
+                'face_edges': diagram.face_edges()}
+
+    index = {id(e): i for i, e in enumerate(diagram.half_edges)}
+    position = lambda e: -1 if e is None else index[id(e)]
+    links = np.array([(position(e.twin), position(e.next), position(e.prev)) for e in diagram.half_edges],
+                     dtype=np.int32).reshape(-1, 3)
+    faces = np.array([e.incident_face.site.idx for e in diagram.half_edges], dtype=np.int32)
+    face_edges = np.array([position(f.edge) for f in diagram.faces], dtype=np.int32)
+    return {'sites': diagram.sites_array(), 'vertices': diagram.vertices_array(), 'edges': diagram.edges_array(),
+            'faces': faces, 'links': links, 'face_edges': face_edges}
+
+
+def save_diagram(path, diagram):
+    '''
+    zapisuje diagram (VoronoiDiagram albo CompactVoronoiDiagram) w formacie DIAGRAM_FORMAT w wersji DIAGRAM_VERSION
+    :param path: plik .npz (np.savez dopisuje rozszerzenie, gdy go brak)
+    '''
+    arrays = diagram_arrays(diagram)
+    np.savez(path, format=np.array(DIAGRAM_FORMAT), version=np.array(DIAGRAM_VERSION),
+             bounded=np.array(diagram.bounded),
+             **{name: np.ascontiguousarray(arrays[name]) for name in DIAGRAM_ARRAYS})
+
+
+def npz_memmaps(path, mode='r'):
+    '''
+    mapuje do pamięci tablice nieskompresowanego pliku .npz
+    :param mode: tryb np.memmap
+    :return: słownik nazwa -> np.memmap (tablice puste i obiektowe są wczytywane zwykle)
+    '''
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as file:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError('compressed member cannot be memory-mapped', path, info.filename)
+            #lokalny nagłówek zipa: 30 bajtów, potem nazwa i pole extra (ich długości są w bajtach 26-29)
+            file.seek(info.header_offset + 26)
+            name_length, extra_length = np.frombuffer(file.read(4), dtype='<u2')
+            file.seek(info.header_offset + 30 + int(name_length) + int(extra_length))
+            version = npy_format.read_magic(file)
+            if version == (1, 0):
+                shape, fortran_order, dtype = npy_format.read_array_header_1_0(file)
+            else:
+                shape, fortran_order, dtype = npy_format.read_array_header_2_0(file)
+            if dtype.hasobject or 0 in shape:
+                with archive.open(info) as member:
+                    arrays[name] = npy_format.read_array(member)
+                continue
+            arrays[name] = np.memmap(path, dtype=dtype, mode=mode, offset=file.tell(), shape=shape,
+                                     order='F' if fortran_order else 'C')
+    return arrays
+
+
+def load_diagram(path, mmap_mode='c'):
+    '''
+    odczytuje diagram zapisany przez save_diagram
+    :param mmap_mode: tryb np.memmap tablic diagramu ('c' pozwala dalej zmieniać diagram w pamięci, nie ruszając
+    pliku), None wczytuje tablice do pamięci
+    :return: CompactVoronoiDiagram na tablicach z pliku
+    '''
+    if mmap_mode is None:
+        with np.load(path) as stored:
+            arrays = {name: stored[name] for name in stored.files}
+    else:
+        arrays = npz_memmaps(path, mmap_mode)
+
+    if 'format' not in arrays or str(arrays['format'][()]) != DIAGRAM_FORMAT:
+        raise ValueError('not a Voronoi diagram file', path)
+    version = int(arrays['version'][()])
+    if version > DIAGRAM_VERSION:
+        raise ValueError('unsupported diagram file version', path, version)
+
+    return CompactVoronoiDiagram.from_arrays(*(arrays[name] for name in DIAGRAM_ARRAYS),
+                                             bounded=bool(arrays['bounded'][()]))
@@ -12,6 +12,7 @@ class EventType(Enum):
 
 
 class Event:
+    __slots__ = ('y', 'site', 'type', 'arc', 'point', 'valid')
     epsilon = 1e-9
 
     def __init__(self, y, event_type, site=None, arc=None, point=None):
@@ -28,9 +29,9 @@ class Event:
         self.type = event_type
         self.arc = arc
         self.point = point
+        #fałszywy alarm jest oznaczany na samym evencie, kolejka pomija go przy zdejmowaniu
+        self.valid = True
 
     def __lt__(self, other):
         #jest też zdefiniowane porównywanie pomiędzy obiektami typu event, żeby nie robić tego w priority queue
         return self.y > other.y or (np.abs(self.y - other.y) < self.epsilon and self.type < other.type)
-    def __hash__(self):
-        return hash(tuple(self.point))
\ No newline at end of file
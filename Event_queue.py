@@ -0,0 +1,110 @@
+from heapq import heapify, heappush, heappop
+from Event import Event, EventType
+
+
+class EventQueue:
+    '''
+    struktura zdarzeń algorytmu zamiatającego oparta o heapq (bez blokad, w przeciwieństwie do queue.PriorityQueue)
+    Na kopcu trzymamy krotki (-y, ranga typu, numer kolejny, event), więc porównania odbywają się na zwykłych floatach
+    i intach, a nie przez Event.__lt__. Zdarzenia punktowe i okręgowe trzymamy na osobnych kopcach, żeby zachować
+    dotychczasowe rozstrzyganie remisów: w obrębie Event.epsilon zdarzenie punktowe ma pierwszeństwo przed okręgowym
+
+    Fałszywe alarmy (zdarzenia okręgowe, których łuk zmienił się zanim do nich doszliśmy) nie są usuwane z kopca od razu,
+    tylko oznaczane flagą event.valid i pomijane przy zdejmowaniu. Gdy martwe wpisy przekroczą ułamek
+    compaction_threshold kopca zdarzeń okręgowych, kopiec jest przebudowywany z samych żywych zdarzeń.
+    '''
+
+    def __init__(self, events=(), compaction_threshold=0.5, compaction_min_size=64):
+        '''
+        :param events: początkowe zdarzenia (zwykle wszystkie zdarzenia punktowe), kopiec budujemy z nich w O(n)
+        :param compaction_threshold: ułamek martwych wpisów w kopcu zdarzeń okręgowych, po którym kopiec jest przebudowywany
+        :param compaction_min_size: poniżej tej liczby martwych wpisów nie przebudowujemy kopca (nie opłaca się)
+        '''
+        self.sequence = 0
+        self.site_heap = []
+        self.circle_heap = []
+        self.compaction_threshold = compaction_threshold
+        self.compaction_min_size = compaction_min_size
+
+        #liczniki: martwe wpisy obecnie na kopcu, wszystkie dodane zdarzenia okręgowe, wszystkie unieważnione, przebudowy
+        self.dead = 0
+        self.circle_events = 0
+        self.invalidated = 0
+        self.compactions = 0
+
+        for event in events:
+            self.sequence += 1
+            entry = (-float(event.y), event.type.value, self.sequence, event)
+            if event.type is EventType.site:
+                self.site_heap.append(entry)
+            else:
+                self.circle_heap.append(entry)
+                self.circle_events += 1
+
+        heapify(self.site_heap)
+        heapify(self.circle_heap)
+
+    def __len__(self):
+        #liczba żywych zdarzeń
+        return len(self.site_heap) + len(self.circle_heap) - self.dead
+
+    def empty(self):
+        return len(self) == 0
+
+    def put(self, event):
+        self.sequence += 1
+        entry = (-float(event.y), event.type.value, self.sequence, event)
+        if event.type is EventType.site:
+            heappush(self.site_heap, entry)
+        else:
+            heappush(self.circle_heap, entry)
+            self.circle_events += 1
+
+    def invalidate(self, event):
+        '''
+        oznacza zdarzenie jako fałszywy alarm, zdarzenie zostanie pominięte przy zdejmowaniu z kolejki
+        :param event: zdarzenie (okręgowe), które jest jeszcze w kolejce
+        '''
+        if not event.valid:
+            return
+        event.valid = False
+        self.dead += 1
+        self.invalidated += 1
+
+        if self.dead > self.compaction_min_size and self.dead > self.compaction_threshold * len(self.circle_heap):
+            self.compact()
+
+    def compact(self):
+        #przebudowa kopca zdarzeń okręgowych bez martwych wpisów, koszt O(rozmiar kopca) rozkłada się na unieważnienia
+        self.circle_heap = [entry for entry in self.circle_heap if entry[3].valid]
+        heapify(self.circle_heap)
+        self.dead = 0
+        self.compactions += 1
+
+    def get(self):
+        '''
+        :return: żywe zdarzenie o największej współrzędnej y; zdarzenie okręgowe wyprzedza punktowe tylko wtedy,
+        gdy leży wyżej o co najmniej Event.epsilon
+        '''
+        circle_heap = self.circle_heap
+        while circle_heap and not circle_heap[0][3].valid:
+            heappop(circle_heap)
+            self.dead -= 1
+
+        if not circle_heap:
+            return heappop(self.site_heap)[3]
+        if not self.site_heap:
+            return heappop(circle_heap)[3]
+
+        # klucze są zanegowane, więc -y_okręgu + y_punktu >= epsilon oznacza, że okrąg jest wyżej o epsilon
+        if self.site_heap[0][0] - circle_heap[0][0] >= Event.epsilon:
+            return heappop(circle_heap)[3]
+        return heappop(self.site_heap)[3]
+
+    def counts(self):
+        '''
+        :return: słownik z liczbą żywych i martwych zdarzeń na kopcu oraz łączną liczbą zdarzeń okręgowych
+        dodanych i unieważnionych (fałszywych alarmów) od początku działania
+        '''
+        return {'live': len(self), 'dead': self.dead, 'circle_events': self.circle_events,
+                'invalidated': self.invalidated, 'compactions': self.compactions}
@@ -1,28 +1,133 @@
+import time
 import numpy as np
 from Event import Event, EventType
-from Beach_line import Arc, BeachLine
-from Metric import euclidean_2d
-from Voronoi_diagram import VoronoiDiagram
-from queue import PriorityQueue
+from Beach_line import BeachLine
+from Metric import euclidean_2d, euclidean_2d_scalar
+from Voronoi_diagram import VoronoiDiagram, link_box_boundary
+from Event_queue import EventQueue
+from Sweep_stats import SweepStats, CountingBeachLine, CountingEventQueue
 import Visualization as Vis
 
 
 def diagram_edges(diagram):
     '''
     :param diagram: diagram czyli parametr FortuneAlgorith
-    :return: edges; lista krawędzi w postaci tupli dwóch punktów
+    :return: edges; tablica (F, 2, 2) krawędzi w postaci par punktów, koszt O(1) dzięki indeksowi w diagramie
     '''
-    edges = []
-    for e in diagram.half_edges:
-        if e.origin is not None and e.destination is not None:
-            edges.append((e.origin.point, e.destination.point))
-    return edges
+    return diagram.complete_edges()
+
+
+def beach_line_points(arc_sites, breakpoints, l, x_left, x_right, resolution=1000, min_samples=8):
+    '''
+    próbkuje wszystkie łuki linii brzegowej naraz. Łuk dostaje liczbę punktów proporcjonalną do swojej szerokości na
+    wykresie (cały zakres [x_left, x_right] to resolution punktów), ale nie mniej niż min_samples
+    :param arc_sites: tablica (N, 2) ognisk kolejnych łuków
+    :param breakpoints: tablica (N - 1,) breakpointów, i-ty leży między łukiem i oraz i+1
+    :param l: współrzędna y miotły (kierownicy parabol)
+    :param x_left: lewy brzeg rysowanego obszaru
+    :param x_right: prawy brzeg rysowanego obszaru
+    :return: tablica (M, 2) punktów linii brzegowej
+    '''
+    if len(arc_sites) == 0:
+        return np.empty((0, 2))
+    left = np.clip(np.concatenate(([-np.inf], breakpoints)), x_left, x_right)
+    right = np.clip(np.concatenate((breakpoints, [np.inf])), x_left, x_right)
+    p = (arc_sites[:, 1] - l) / 2
+    width = right - left
+
+    counts = np.maximum(np.ceil(width / (x_right - x_left) * resolution), min_samples).astype(np.int64)
+    # łuk leżący na miotle jest pionowym odcinkiem, a łuk poza wykresem nie ma czego rysować
+    counts[(p == 0) | (width <= 0)] = 0
+
+    arc = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.cumsum(counts) - counts
+    t = (np.arange(len(arc)) - offsets[arc]) / np.maximum(counts[arc] - 1, 1)
+    x = left[arc] + t * width[arc]
+    h = arc_sites[arc, 0]
+    y = (x - h) ** 2 / (4 * p[arc]) + l + p[arc]
+    return np.column_stack((x, y))
+
+
+class Observers:
+    '''
+    zbiera metody obserwatorów zamiatania w osobne listy dla każdego rodzaju powiadomienia,
+    żeby w pętli zamiatania nie sprawdzać za każdym razem, kto czego słucha
+    '''
+    hooks = ('on_site_event', 'on_circle_event', 'on_vertex', 'on_finish')
+
+    def __init__(self, observers):
+        for hook in Observers.hooks:
+            setattr(self, hook, [getattr(o, hook) for o in observers if hasattr(o, hook)])
+
+    def finish(self, algorithm):
+        for callback in self.on_finish:
+            callback(algorithm)
+
+
+class SceneRecorder:
+    '''
+    obserwator zamiatania tworzący sceny wizualizacji: jedną przed obsługą każdego zdarzenia punktowego
+    i jedną po zakończeniu zamiatania. Sceny czekają w pending, aż odbierze je take(). Kolekcje zmieniające się
+    w każdej scenie (zdarzenie, linia brzegowa, miotła) Vis.Plot sam rozpoznaje i rysuje blittingiem
+    '''
+
+    def __init__(self, points):
+        self.points = points
+        self.min_x = min((point[0] for point in points), default=0)
+        self.max_x = max((point[0] for point in points), default=0)
+        self.pending = []
+        # zakres x rysowania linii brzegowej (jak w left_and_right_bound): punkty diagramu sprawdzamy raz,
+        # a wierzchołki tylko te dodane od poprzedniej sceny, zamiast kopiować wszystkie co zdarzenie
+        self.x_left = None
+        self.x_right = None
+        self.seen_vertices = 0
+
+    def take(self):
+        scenes, self.pending = self.pending, []
+        return scenes
+
+    def left_and_right_bound(self, algorithm):
+        if self.x_left is None:
+            self.x_left, _, self.x_right, _ = algorithm.adjust_box(float("inf"), float("inf"), -float("inf"),
+                                                                   -float("inf"), algorithm.diagram.sites_array())
+        # wierzchołek, którego krawędzie są jeszcze otwarte, nie leży na żadnej skończonej krawędzi, więc bierzemy
+        # wierzchołki diagramu, a nie końce krawędzi z indeksu
+        vertices = algorithm.diagram.vertices_array(self.seen_vertices)
+        if len(vertices):
+            self.x_left, _, self.x_right, _ = algorithm.adjust_box(self.x_left, float("inf"), self.x_right,
+                                                                   -float("inf"), vertices)
+            self.seen_vertices += len(vertices)
+        return self.x_left, self.x_right
+
+    def on_site_event(self, algorithm, event):
+        edges = diagram_edges(algorithm.diagram)
+        x_left, x_right = self.left_and_right_bound(algorithm)
+        arc_list = algorithm.beach_line.inorder()
+        # wszystkie breakpointy linii brzegowej liczymy jednym wywołaniem, i-ty leży między łukiem i oraz i+1
+        arc_sites = np.array([node.site.point for node in arc_list], dtype=float).reshape(-1, 2)
+        breakpoints = algorithm.metric.compute_breakpoints(arc_sites[:-1], arc_sites[1:], event.point[1])
+        result = beach_line_points(arc_sites, breakpoints, event.point[1], x_left, x_right)
+
+        self.pending.append(Vis.Scene(
+            [Vis.PointsCollection([event.point], color='red'),
+             Vis.PointsCollection(self.points, color='purple'),
+             Vis.PointsCollection(result, s=3, color='green')],
+            [Vis.LinesCollection([((self.min_x, event.point[1],), (self.max_x, event.point[1]))], color='brown'),
+             Vis.LinesCollection(edges, color='red')]
+        ))
+
+    def on_finish(self, algorithm):
+        self.pending.append(self.final_scene(algorithm))
+
+    def final_scene(self, algorithm):
+        return Vis.Scene([Vis.PointsCollection(self.points, color='purple')],
+                         [Vis.LinesCollection(diagram_edges(algorithm.diagram), color='red')])
 
 
 class FortuneAlgorithm:
-    metrics = {'euclidean_2d': euclidean_2d}
+    metrics = {'euclidean_2d': euclidean_2d, 'euclidean_2d_scalar': euclidean_2d_scalar}
 
-    def __init__(self, points, named_metric='euclidean_2d', metric=None):
+    def __init__(self, points, named_metric='euclidean_2d', metric=None, diagram_type=VoronoiDiagram):
         '''
         inicjalizuje podstawowe struktury algorytmu zamiatającego, linie brzegową oraz metryke w jakiej wyznaczamy diagram, a także sam pusty diagram
         :param points: lista punktów dla których wyznaczamy diagram Voronoi
@@ -30,118 +135,126 @@ class FortuneAlgorithm:
         :param metric: wybrana metryka
         '''
 
-        self.diagram = VoronoiDiagram(points)
-
         if metric is not None:
             self.metric = metric
-            self.compute_convergence_point = metric.compute_convergence_point
         elif named_metric in FortuneAlgorithm.metrics:
             self.metric = FortuneAlgorithm.metrics[named_metric]
-            self.compute_convergence_point = metric.compute_convergence_point
         else:
             raise ValueError('Can\'t resolve metric function', metric, 'please choose from list, \
             or implement your own. list: ', FortuneAlgorithm.metrics.keys())
+        self.compute_convergence_point = self.metric.compute_convergence_point
+
+        self.diagram = diagram_type([self.metric.prepare_point(p) for p in points])
         # linia brzegowa
         self.beach_line = BeachLine(self.metric.compute_breakpoint)
+        # statystyki zamiatania, tylko po construct(stats=True)
+        self.stats = None
+        # pionowe krawędzie między punktami pierwszego rzędu (patrz add_arc_beside), ich górny koniec domyka bound:
+        # lewa półprosta -> (prawa półprosta, lewy punkt, prawy punkt)
+        self.vertical_rays = {}
 
-    def construct(self, points):
+    def construct(self, points=None, observers=(), stats=False):
         """
-        Wykonuje właściwe działanie algorytmu poprzez obsługę zdarzeń typu zdarzenie punktowe oraz zdarzenie kołowe.
-        Oprócz tego obługuje tworzenie się scen wizualizacji w miarę obsługiwania kolejnych eventów.
-        :return: Scenes; lista obiektów typu Scene z narzędzia graficznego
+        Wykonuje właściwe działanie algorytmu poprzez obsługę zdarzeń typu zdarzenie punktowe oraz zdarzenie kołowe,
+        wynik zostaje w self.diagram (obramowanie półprostych dokłada dopiero bound).
+        Bez obserwatorów pętla zamiatania nie robi nic poza obsługą zdarzeń, więc tej wersji używamy do pomiarów czasu.
+        :param points: jeśli podane, to dodatkowo powstają sceny wizualizacji i zwracamy je (patrz construct_scenes)
+        :param observers: obiekty powiadamiane o przebiegu zamiatania, każdy może mieć dowolne z metod
+        on_site_event(algorithm, event), on_circle_event(algorithm, event) (przed obsługą zdarzenia),
+        on_vertex(algorithm, vertex, point) (po dodaniu wierzchołka) oraz on_finish(algorithm) (po zamiataniu)
+        :param stats: czy zbierać statystyki zamiatania do self.stats (patrz Sweep_stats.SweepStats)
+        :return: Scenes; lista obiektów typu Scene z narzędzia graficznego, gdy podano points, wpp. None
         """
+        if stats:
+            self.enable_stats()
 
-        max_x = -float("inf")
-        min_x = float("inf")
-        for point in points:
-            if point[0] > max_x:
-                max_x = point[0]
-            if point[0] < min_x:
-                min_x = point[0]
+        if points is not None:
+            return list(self.construct_scenes(points, observers))
 
-        scenes = []
-        events = PriorityQueue()
+        events = self.create_events()
 
-        for s in self.diagram.sites:
-            event = Event(s.point[1], EventType.site, site=s, point=s.point)
-            events.put(event)
+        if not observers and self.stats is None:
+            while not events.empty():
+                event = events.get()
+
+                if event.type == EventType.site:
+                    self.handle_site_event(event, events)
+                else:
+                    self.handle_circle_event(event, events)
+            return
+
+        hooks = Observers(observers)
+        handle_event = self.handle_observed_event if self.stats is None else self.handle_counted_event
+        while not events.empty():
+            handle_event(events.get(), events, hooks)
+        hooks.finish(self)
 
-        not_valid_events = set()
+    def construct_scenes(self, points, observers=()):
+        """
+        Generatorowa wersja construct z wizualizacją: sceny tworzy SceneRecorder jako jeden z obserwatorów, a zamiatanie
+        postępuje dopiero, gdy pobierzemy kolejną scenę, więc w pamięci trzymamy tylko te sceny, które zatrzyma
+        odbiorca (np. Vis.SceneStream w Vis.Plot). Na końcu wywołuje bound
+        :return: generator obiektów typu Scene z narzędzia graficznego
+        """
+        recorder = SceneRecorder(points)
+        hooks = Observers((recorder,) + tuple(observers))
+        events = self.create_events()
+        handle_event = self.handle_observed_event if self.stats is None else self.handle_counted_event
 
         while not events.empty():
-            event = events.get()
-            if event.type.value == 0:
-                x_left, x_right = self.left_and_right_bound()
-                edges = diagram_edges(self.diagram)
-                parabolas = []
-                arc_list = self.beach_line.inorder()
-                for node in arc_list:
-                    breakpoint_right = np.inf
-                    breakpoint_left = -np.inf
-                    if node.prev is not None:
-                        breakpoint_left = self.metric.compute_breakpoint(node.prev.site.point, node.site.point,
-                                                                         event.point[1])
-
-                    if node.next is not None:
-                        breakpoint_right = self.metric.compute_breakpoint(node.site.point, node.next.site.point,
-                                                                          event.point[1])
-                    p = (node.site.point[1] - event.point[1]) / 2
-                    h = node.site.point[0]
-                    k = event.point[1] + p
-                    if p != 0:
-                        a = 1 / (4 * p)
-                        b = -(h / (2 * p))
-                        c = (h ** 2) / (4 * p) + k
-
-                        if breakpoint_left > x_left and breakpoint_right < x_right:
-                            x = np.arange(breakpoint_left, breakpoint_right, np.abs(breakpoint_left-breakpoint_right)*0.001)
-                        elif breakpoint_left < x_left and breakpoint_right < x_right:
-                            x = np.arange(x_left, breakpoint_right, np.abs(x_left-breakpoint_right)*0.001)
-                        elif breakpoint_left > x_left and breakpoint_right > x_right:
-                            x = np.arange(breakpoint_left, x_right, np.abs(breakpoint_left-x_right)*0.001)
-                        else:
-                            x = np.arange(x_left, x_right, np.abs(x_left-x_right)*0.001)
-                        y = a * (x ** 2) + b * x + c
-
-                        points1 = list(zip(x, y))
-                        parabolas.append(points1)
-
-                result = []
-                for parabola in parabolas:
-                    for point in parabola:
-                        result.append(point)
-
-                scenes.append(Vis.Scene(
-                    [Vis.PointsCollection([event.point], color='red'), Vis.PointsCollection(points, color='purple'),
-                     Vis.PointsCollection(result, s=3, color='green')],
-                    [Vis.LinesCollection([((min_x, event.point[1],), (max_x, event.point[1]))], color='brown'),
-                     Vis.LinesCollection(edges, color='red')]
-                    ))
-
-            if event in not_valid_events:
-                continue
-
-            if event.type == EventType.site:
-                self.handle_site_event(event, not_valid_events, events)
-            else:
-                self.handle_circle_event(event, not_valid_events, events)
-
-        edges = diagram_edges(self.diagram)
-        scenes.append(
-            Vis.Scene([Vis.PointsCollection(points, color='purple')
-                       ],
-                      [
-                          Vis.LinesCollection(edges, color='red')]
-                      ))
+            handle_event(events.get(), events, hooks)
+            yield from recorder.take()
+
+        hooks.finish(self)
+        yield from recorder.take()
         self.bound()
-        edges = diagram_edges(self.diagram)
-        scenes.append(
-            Vis.Scene([Vis.PointsCollection(points, color='purple')
-                       ],
-                      [
-                          Vis.LinesCollection(edges, color='red')]
-                      ))
-        return scenes
+        yield recorder.final_scene(self)
+
+    def create_events(self):
+        #kolejka zostaje w obiekcie, żeby po zakończeniu można było odczytać events.counts()
+        site_events = (Event(s.point[1], EventType.site, site=s, point=s.point) for s in self.diagram.sites)
+        if self.stats is None:
+            self.events = EventQueue(site_events)
+        else:
+            self.events = CountingEventQueue(site_events, self.stats)
+        return self.events
+
+    def enable_stats(self):
+        '''
+        włącza zbieranie statystyk: podmienia (jeszcze pustą) linię brzegową na liczącą, a kolejkę zdarzeń
+        create_events utworzy w wersji mierzącej czas
+        '''
+        self.stats = SweepStats()
+        self.beach_line = CountingBeachLine(self.metric.compute_breakpoint, self.stats)
+
+    def handle_counted_event(self, event, events, hooks):
+        #handle_observed_event z licznikami; czas kolejki i szukania łuku liczony osobno odejmujemy od obsługi zdarzenia
+        stats = self.stats
+        if event.type == EventType.site:
+            stats.site_events += 1
+        else:
+            stats.circle_events_fired += 1
+
+        measured = stats.times['queue'] + stats.times['tree_search']
+        start = time.perf_counter()
+        self.handle_observed_event(event, events, hooks)
+        elapsed = time.perf_counter() - start
+        stats.times['event_handling'] += elapsed - (stats.times['queue'] + stats.times['tree_search'] - measured)
+
+    def handle_observed_event(self, event, events, hooks):
+        '''
+        obsługa jednego zdarzenia razem z powiadomieniem obserwatorów, używana tylko wtedy, gdy jakiś obserwator jest
+        '''
+        if event.type == EventType.site:
+            for callback in hooks.on_site_event:
+                callback(self, event)
+            self.handle_site_event(event, events)
+        else:
+            for callback in hooks.on_circle_event:
+                callback(self, event)
+            vertex = self.handle_circle_event(event, events)
+            for callback in hooks.on_vertex:
+                callback(self, vertex, event.point)
 
     def break_arc_by_site(self, arc, site):
         """
@@ -149,17 +262,18 @@ class FortuneAlgorithm:
         :param site: punkt, który powoduje podział łuków na trzy
         :return: middle arc; jest to łuk związany z punktem wykrytym w ramach site eventu
         """
-        middle_arc = Arc(site)
+        middle_arc = self.beach_line.create_arc(site)
 
-        left_arc = Arc(arc.site)
+        left_arc = self.beach_line.create_arc(arc.site)
         left_arc.left_half_edge = arc.left_half_edge
 
-        right_arc = Arc(arc.site)
+        right_arc = self.beach_line.create_arc(arc.site)
         right_arc.right_half_edge = arc.right_half_edge
 
         self.beach_line.replace(arc, middle_arc)
         self.beach_line.insert_before(middle_arc, left_arc)
         self.beach_line.insert_after(middle_arc, right_arc)
+        self.beach_line.release(arc)
 
         return middle_arc
 
@@ -172,6 +286,8 @@ class FortuneAlgorithm:
         left.right_half_edge = self.diagram.add_half_edge(left.site.face)
         right.left_half_edge = self.diagram.add_half_edge(right.site.face)
 
+        self.diagram.set_twins(left.right_half_edge, right.left_half_edge)
+
 
     def add_event(self, left, middle, right, events, beachline_y):
         '''
@@ -186,7 +302,11 @@ class FortuneAlgorithm:
 
         y, convergence_point = self.metric.compute_convergence_point(left.site.point, middle.site.point,
                                                                      right.site.point)
-        is_below_broom = y <= beachline_y
+        # dla punktów (prawie) współokręgowych najniższy punkt okręgu wypada w granicach błędu zaokrągleń nad miotłą,
+        # zdarzenie jest wtedy prawdziwe i obsługujemy je od razu, na wysokości miotły
+        is_below_broom = y <= beachline_y or y - beachline_y <= 1e-12 * (abs(convergence_point[1] - y) +
+                                                                          abs(beachline_y))
+        y = min(y, beachline_y)
 
         left_point_is_moving_right = left.site.point[1] < middle.site.point[1]
         right_point_is_moving_right = middle.site.point[1] < right.site.point[1]
@@ -204,24 +324,38 @@ class FortuneAlgorithm:
             middle.event = event
             events.put(event)
 
-    def handle_site_event(self, event, not_valid_events, events):
+    def handle_site_event(self, event, events):
         '''
         funckcja odpowiada za obsługę zdarzenia punktowego, napierw dzieli łuk na trzy łuki po napotakniu punktu
         Następnie zaś jeśli jest to możliwe, dodaje zdarzenie kołowe (muszą być trzy punkty związane z kolejnymi łukami obok siebie)
         :param event: aktualnie obsługiwane zdarzenie
-        :param not_valid_events: lista fałszywych alarmów
         :param events: struktura zdarzeń
         '''
         site = event.site
 
         if self.beach_line.is_empty():
-            self.beach_line.set_root(Arc(site))
+            self.beach_line.set_root(self.beach_line.create_arc(site))
             return
 
         arc_above = self.beach_line.get_arc_above(site.point, site.point[1])
 
+        if arc_above.site.point[1] == site.point[1]:
+            # oba punkty leżą na miotle, więc ich parabole są pionowymi półprostymi: nowy łuk staje obok
+            self.add_arc_beside(arc_above, site)
+            return
+
+        x, y = site.point
+        if arc_above.prev is not None and \
+                self.metric.compute_breakpoint(arc_above.prev.site.point, arc_above.site.point, y) == x:
+            self.add_arc_between(arc_above.prev, arc_above, site, events)
+            return
+        if arc_above.next is not None and \
+                self.metric.compute_breakpoint(arc_above.site.point, arc_above.next.site.point, y) == x:
+            self.add_arc_between(arc_above, arc_above.next, site, events)
+            return
+
         if arc_above.event is not None:
-            not_valid_events.add(arc_above.event)
+            events.invalidate(arc_above.event)
 
         middle_arc = self.break_arc_by_site(arc_above, site)
         left_arc = middle_arc.prev
@@ -238,6 +372,84 @@ class FortuneAlgorithm:
         if right_arc.next is not None:
             self.add_event(middle_arc, right_arc, right_arc.next, events, site.point[1])
 
+    def add_arc_between(self, left_arc, right_arc, site, events):
+        '''
+        zdarzenie punktowe dla punktu leżącego dokładnie pod breakpointem łuków left_arc i right_arc (np. w siatkach
+        punktów). Podział jednego z nich zostawiłby łuk o zerowej szerokości, którego zdarzenie okręgowe odrzuca
+        add_event, więc od razu kończymy krawędź łuków w wierzchołku nad punktem i zaczynamy w nim dwie nowe krawędzie,
+        jak w remove_arc
+        :param left_arc: łuk na lewo od breakpointu
+        :param right_arc: łuk na prawo od breakpointu
+        :param site: nowy punkt
+        :param events: struktura zdarzeń
+        '''
+        _, point = self.metric.compute_convergence_point(left_arc.site.point, site.point, right_arc.site.point)
+        vertex = self.diagram.add_vertex(point)
+
+        if left_arc.event is not None:
+            events.invalidate(left_arc.event)
+        if right_arc.event is not None:
+            events.invalidate(right_arc.event)
+
+        middle_arc = self.beach_line.create_arc(site)
+        self.beach_line.insert_after(left_arc, middle_arc)
+
+        prev_half_edge = left_arc.right_half_edge
+        next_half_edge = right_arc.left_half_edge
+        self.diagram.set_origin(prev_half_edge, vertex)
+        self.diagram.set_destination(next_half_edge, vertex)
+
+        self.add_edge(left_arc, middle_arc)
+        self.add_edge(middle_arc, right_arc)
+
+        self.diagram.set_destination(left_arc.right_half_edge, vertex)
+        self.diagram.set_origin(middle_arc.left_half_edge, vertex)
+        self.diagram.set_destination(middle_arc.right_half_edge, vertex)
+        self.diagram.set_origin(right_arc.left_half_edge, vertex)
+
+        self.diagram.link(left_arc.right_half_edge, prev_half_edge)
+        self.diagram.link(middle_arc.right_half_edge, middle_arc.left_half_edge)
+        self.diagram.link(next_half_edge, right_arc.left_half_edge)
+
+        if left_arc.prev is not None:
+            self.add_event(left_arc.prev, left_arc, middle_arc, events, site.point[1])
+        if right_arc.next is not None:
+            self.add_event(middle_arc, right_arc, right_arc.next, events, site.point[1])
+
+    def add_arc_beside(self, arc, site):
+        '''
+        zdarzenie punktowe dla punktu o tej samej wysokości co punkt łuku arc, możliwe tylko w pierwszym rzędzie
+        punktów (wszystkie łuki linii brzegowej leżą wtedy na miotle). Krawędzią między łukami jest cała pionowa
+        symetralna, więc zamiast dzielić arc na trzy wstawiamy nowy łuk obok niego. Gdy nowy łuk trafia między dwa
+        łuki, ich krawędź nie powstanie, a jej półproste zostają bliźniakami półprostych nowego łuku
+        :param arc: łuk nad punktem site
+        :param site: nowy punkt
+        '''
+        middle_arc = self.beach_line.create_arc(site)
+        if site.point[0] < arc.site.point[0]:
+            left_arc, right_arc = arc.prev, arc
+            self.beach_line.insert_before(arc, middle_arc)
+        else:
+            left_arc, right_arc = arc, arc.next
+            self.beach_line.insert_after(arc, middle_arc)
+
+        if left_arc is not None and right_arc is not None:
+            middle_arc.left_half_edge = self.diagram.add_half_edge(site.face)
+            middle_arc.right_half_edge = self.diagram.add_half_edge(site.face)
+            self.diagram.set_twins(left_arc.right_half_edge, middle_arc.left_half_edge)
+            self.diagram.set_twins(middle_arc.right_half_edge, right_arc.left_half_edge)
+        elif left_arc is not None:
+            self.add_edge(left_arc, middle_arc)
+        else:
+            self.add_edge(middle_arc, right_arc)
+
+        #nad pierwszym rzędem nie ma łuków, więc górnego końca tych krawędzi nie wyznaczy żaden punkt przecięcia;
+        #wpis dla left_arc.right_half_edge nadpisujemy, bo jej bliźniakiem jest teraz półprosta nowego łuku
+        if left_arc is not None:
+            self.vertical_rays[left_arc.right_half_edge] = (middle_arc.left_half_edge, left_arc.site, site)
+        if right_arc is not None:
+            self.vertical_rays[middle_arc.right_half_edge] = (right_arc.left_half_edge, site, right_arc.site)
+
     def remove_arc(self, arc, vertex):
         '''
         funkcja odpowiadająca za usunięcie łuku, który zapadł się właśnie do punktu diagramu voronoi
@@ -245,29 +457,39 @@ class FortuneAlgorithm:
         :param arc: Łuk który właśnie się zapadł do punktu i który należy usunąć
         :param vertex: jest to punkt, do którego właśnie zapadł się łuk paraboli
         '''
-        arc.prev.right_half_edge.origin = vertex
-        arc.left_half_edge.destination = vertex
+        self.diagram.set_origin(arc.prev.right_half_edge, vertex)
+        self.diagram.set_destination(arc.left_half_edge, vertex)
 
-        arc.right_half_edge.origin = vertex
-        arc.next.left_half_edge.destination = vertex
+        self.diagram.set_origin(arc.right_half_edge, vertex)
+        self.diagram.set_destination(arc.next.left_half_edge, vertex)
+
+        # w ścianie usuwanego łuku półprosta kończąca się w vertex jest poprzedniczką tej, która z niego wychodzi
+        self.diagram.link(arc.left_half_edge, arc.right_half_edge)
 
         self.beach_line.delete(arc)
 
+        prev_half_edge = arc.prev.right_half_edge
+        next_half_edge = arc.next.left_half_edge
+
         self.add_edge(arc.prev, arc.next)
 
-        arc.prev.right_half_edge.destination = vertex
-        arc.next.left_half_edge.origin = vertex
+        self.diagram.set_destination(arc.prev.right_half_edge, vertex)
+        self.diagram.set_origin(arc.next.left_half_edge, vertex)
 
+        # nowa krawędź wpina się w cykle ścian sąsiednich łuków
+        self.diagram.link(arc.prev.right_half_edge, prev_half_edge)
+        self.diagram.link(next_half_edge, arc.next.left_half_edge)
 
-    def handle_circle_event(self, event, not_valid_events, events):
+
+    def handle_circle_event(self, event, events):
         '''
         Metoda odpowiedzialna za obsługę zdarzenia okręgowego , najpierw do diagramu Voronoia zostaje dodany nowo utworzony punkt
         Następnie z linii brzegowej zostaje usunięty łuk, który właśnie zapadł się do punktu
-        Na końcu sprawdza czy może w łukach nie są trzymane fałszywe alarmy, jeśli tak to dodaje je do setu not_valid_events
+        Na końcu sprawdza czy może w łukach nie są trzymane fałszywe alarmy, jeśli tak to unieważnia je w strukturze zdarzeń
         na samym końcu próbuje jak poprzednio dla zdarzeń punktowych dodać zdarzenia okręgowe
         :param event: zdarzenie aktualnie obsługiwane (jest ono zdarzeniem okręgowym)
-        :param not_valid_events: zbiór fałszywych alarmów
         :param events: struktura zdarzeń
+        :return: nowy wierzchołek diagramu
         '''
         point = event.point
         arc = event.arc
@@ -278,12 +500,13 @@ class FortuneAlgorithm:
         right_arc = arc.next
 
         if left_arc is not None and left_arc.event is not None:
-            not_valid_events.add(left_arc.event)
+            events.invalidate(left_arc.event)
 
         if right_arc is not None and right_arc.event is not None:
-            not_valid_events.add(right_arc.event)
+            events.invalidate(right_arc.event)
 
         self.remove_arc(arc, voronoi_vertex)
+        self.beach_line.release(arc)
 
         if left_arc.prev is not None:
             self.add_event(left_arc.prev, left_arc, right_arc, events, event.y)
@@ -291,6 +514,8 @@ class FortuneAlgorithm:
         if right_arc.next is not None:
             self.add_event(left_arc, right_arc, right_arc.next, events, event.y)
 
+        return voronoi_vertex
+
     def adjust_box(self, x_left, y_left, x_right, y_right, points):
         '''
         metoda ta dopasowuje rysowanie półprostych tak, żeby półproste rysowane na końcu, które odpowiadają za nieskończone obszary diagramu Voronoi
@@ -299,16 +524,16 @@ class FortuneAlgorithm:
         :param y_left: współrzędna y lewego dolnego rogu plota
         :param x_right: współrzędna x prawego górnego rogu plota
         :param y_right: współrzędna y prawego górnego rogu plota
-        :param points: punkty przekazane do znajdowania diagramu Voronoia
+        :param points: tablica (N, 2) punktów przekazanych do znajdowania diagramu Voronoia (albo jego wierzchołków)
         :return:
         '''
-        for p in points:
+        if len(points) > 0:
             gap_between_box = np.array([0.5, 0.5])
-            x_left = min(x_left, p.point[0] - gap_between_box[0])
-            y_left = min(y_left, p.point[1] - gap_between_box[1])
+            x_left = min(x_left, points[:, 0].min() - gap_between_box[0])
+            y_left = min(y_left, points[:, 1].min() - gap_between_box[1])
 
-            x_right = max(x_right, p.point[0] + gap_between_box[0])
-            y_right = max(y_right, p.point[1] + gap_between_box[1])
+            x_right = max(x_right, points[:, 0].max() + gap_between_box[0])
+            y_right = max(y_right, points[:, 1].max() + gap_between_box[1])
 
         return x_left, y_left, x_right, y_right
 
@@ -342,13 +567,14 @@ class FortuneAlgorithm:
         if direction[1] > eps:
             t2 = (y_right - origin[1]) / direction[1]
 
-            if t2 < t1:
+            # t1 jest None dla pionowej półprostej (między łukami punktów o tej samej wysokości)
+            if t1 is None or t2 < t1:
                 intersection = origin + t2 * direction
 
         elif direction[1] < -eps:
             t2 = (y_left - origin[1]) / direction[1]
 
-            if t2 < t1:
+            if t1 is None or t2 < t1:
                 intersection = origin + t2 * direction
 
         return intersection
@@ -361,30 +587,55 @@ class FortuneAlgorithm:
         :param x_right: współrzędna x prawego górnego rogu plota
         :param y_right: współrzędna y prawego górnego rogu plota
         '''
-        x_left, y_left, x_right, y_right = self.adjust_box(x_left, y_left, x_right, y_right, self.diagram.sites)
-        x_left, y_left, x_right, y_right = self.adjust_box(x_left, y_left, x_right, y_right, self.diagram.vertices)
+        start = time.perf_counter()
+        x_left, y_left, x_right, y_right = self.adjust_box(x_left, y_left, x_right, y_right, self.diagram.sites_array())
+        x_left, y_left, x_right, y_right = self.adjust_box(x_left, y_left, x_right, y_right, self.diagram.vertices_array())
 
         if not self.beach_line.is_empty():
             left_arc = self.beach_line.get_leftmost_arc()
             right_arc = left_arc.next
+            # półproste zaczynające się i kończące na obramowaniu, po pętli domykamy nimi cykle ścian
+            starts, ends = [], []
 
             while right_arc is not None:
-                direction = (left_arc.site.point - right_arc.site.point)[[1, 0]]
+                left_point = np.asarray(left_arc.site.point)
+                right_point = np.asarray(right_arc.site.point)
+                direction = (left_point - right_point)[[1, 0]]
                 direction[0] *= -1
-                origin = (left_arc.site.point + right_arc.site.point) * 0.5
+                origin = (left_point + right_point) * 0.5
 
                 intersection = self.get_intersection(x_left, y_left, x_right, y_right, origin, direction)
                 vertex = self.diagram.add_vertex(intersection)
 
-                left_arc.right_half_edge.origin = vertex
-                right_arc.left_half_edge.destination = vertex
+                self.diagram.set_origin(left_arc.right_half_edge, vertex)
+                self.diagram.set_destination(right_arc.left_half_edge, vertex)
+
+                starts.append((left_arc.site.face, left_arc.right_half_edge, vertex, intersection))
+                ends.append((right_arc.site.face, right_arc.left_half_edge, vertex, intersection))
 
                 left_arc = right_arc
                 right_arc = right_arc.next
 
+            # górne końce pionowych krawędzi pierwszego rzędu punktów leżą na górnym boku obramowania
+            for left_half_edge, (right_half_edge, left_site, right_site) in self.vertical_rays.items():
+                intersection = np.array([(left_site.point[0] + right_site.point[0]) * 0.5, y_right])
+                vertex = self.diagram.add_vertex(intersection)
+
+                self.diagram.set_destination(left_half_edge, vertex)
+                self.diagram.set_origin(right_half_edge, vertex)
+
+                ends.append((left_site.face, left_half_edge, vertex, intersection))
+                starts.append((right_site.face, right_half_edge, vertex, intersection))
+
+            link_box_boundary(self.diagram, x_left, y_left, x_right, y_right, starts, ends)
+
+        self.diagram.bounded = True
+        if self.stats is not None:
+            self.stats.times['bound'] += time.perf_counter() - start
+
     def left_and_right_bound(self, x_left=float("inf"), y_left=float("inf"), x_right=-float("inf"),
                              y_right=-float("inf")):
         #funckja przydatna do określenia dokąd należy rysować parabole (żeby nie wystawały znacznie poza wykres)
-        x_left, y_left, x_right, y_right = self.adjust_box(x_left, y_left, x_right, y_right, self.diagram.sites)
-        x_left, y_left, x_right, y_right = self.adjust_box(x_left, y_left, x_right, y_right, self.diagram.vertices)
+        x_left, y_left, x_right, y_right = self.adjust_box(x_left, y_left, x_right, y_right, self.diagram.sites_array())
+        x_left, y_left, x_right, y_right = self.adjust_box(x_left, y_left, x_right, y_right, self.diagram.vertices_array())
         return x_left, x_right
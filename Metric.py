@@ -1,8 +1,18 @@
+import math
 import numpy as np
 
 
 class Metric:
 
+    @staticmethod
+    def prepare_point(point):
+        """
+        Zamienia punkt wejściowy na postać, na której operują funkcje metryki (domyślnie zostawia go bez zmian)
+        :param point: punkt wejściowy
+        :return: punkt w postaci wygodnej dla metryki
+        """
+        return point
+
     @staticmethod
     def compute_breakpoint(point1, point2, l):
         """
@@ -24,6 +34,33 @@ class Metric:
         """
         pass
 
+    @classmethod
+    def compute_breakpoints(cls, left_sites, right_sites, l):
+        """
+        Wersja wsadowa compute_breakpoint. Domyślnie woła compute_breakpoint w pętli, żeby każda metryka miała ją
+        od razu; metryki, które potrafią liczyć na całych tablicach, powinny ją nadpisać
+        :param left_sites: tablica (N, 2) ognisk lewych parabol
+        :param right_sites: tablica (N, 2) ognisk prawych parabol
+        :param l: współrzędna y kierownicy dla wszystkich parabol
+        :return: tablica (N,) współrzędnych x punktów przecięcia parabol
+        """
+        return np.array([cls.compute_breakpoint(p1, p2, l) for p1, p2 in zip(left_sites, right_sites)], dtype=float)
+
+    @classmethod
+    def compute_convergence_points(cls, points1, points2, points3):
+        """
+        Wersja wsadowa compute_convergence_point, domyślnie liczona w pętli (tak jak compute_breakpoints)
+        :param points1: tablica (N, 2) pierwszych punktów
+        :param points2: tablica (N, 2) drugich punktów
+        :param points3: tablica (N, 2) trzecich punktów
+        :return: tablica (N,) najniższych współrzędnych y okręgów oraz tablica (N, 2) ich środków
+        """
+        ys = np.empty(len(points1))
+        centers = np.empty((len(points1), 2))
+        for i, (p1, p2, p3) in enumerate(zip(points1, points2, points3)):
+            ys[i], centers[i] = cls.compute_convergence_point(p1, p2, p3)
+        return ys, centers
+
 
 class euclidean_2d(Metric):
 
@@ -32,35 +69,152 @@ class euclidean_2d(Metric):
         x1, y1 = point1
         x2, y2 = point2
 
-        eps = 1e-9
+        # przypadki, w których wzór niżej dzieli przez zero: parabole o tej samej wysokości ogniska
+        # i parabola zdegenerowana do pionowej półprostej (ognisko na kierownicy)
+        if y1 == y2:
+            return (x1 + x2) * 0.5
+        if y1 == l:
+            return x1
+        if y2 == l:
+            return x2
+
+        # równanie przecięcia parabol mnożymy przez wysokości ognisk nad kierownicą zamiast przez nie dzielić,
+        # wtedy wyróżnik jest iloczynem 4*h1*h2*(dx^2 + a^2) i nie traci cyfr, gdy ognisko jest tuż nad kierownicą.
+        # Pierwiastek wybieramy w postaci bez odejmowania liczb bliskich sobie
+        h1 = y1 - l
+        h2 = y2 - l
+        dx = x2 - x1
+        a = h2 - h1
+
+        s = np.sqrt(max(h1*h2 * (dx*dx + a*a), 0.0))
+        if dx >= 0:
+            return x1 + h1 * (dx*dx + h2*a) / (s + h1*dx)
+        return x1 + (s - h1*dx) / a
+
+    @staticmethod
+    def compute_convergence_point(point1, point2, point3):
+        # środek okręgu opisanego liczony względem point1, co przy bliskich punktach zmniejsza błędy zaokrągleń.
+        # Dla punktów współliniowych okrąg nie istnieje, wtedy najniższy punkt jest w nieskończoności
+        x1, y1 = point1
+        bx, by = point2[0] - x1, point2[1] - y1
+        cx, cy = point3[0] - x1, point3[1] - y1
+
+        d = 2.0 * (bx*cy - by*cx)
+        if d == 0:
+            return np.inf, np.array([np.nan, np.nan])
+
+        b2 = bx*bx + by*by
+        c2 = cx*cx + cy*cy
+        ux = (cy*b2 - by*c2) / d
+        uy = (bx*c2 - cx*b2) / d
+
+        r = np.sqrt(ux*ux + uy*uy)
+
+        # dla środka nad punktem uy - r to różnica bliskich liczb, gdy okrąg jest wielki (punkty prawie współliniowe),
+        # liczymy ją wtedy jako -ux^2 / (uy + r)
+        y = y1 + uy - r if uy <= 0 else y1 - ux*ux / (uy + r)
+
+        return y, np.array([x1 + ux, y1 + uy])
+
+    @classmethod
+    def compute_breakpoints(cls, left_sites, right_sites, l):
+        left_sites = np.asarray(left_sites, dtype=float)
+        right_sites = np.asarray(right_sites, dtype=float)
+        x1, y1 = left_sites[:, 0], left_sites[:, 1]
+        x2, y2 = right_sites[:, 0], right_sites[:, 1]
+
+        h1 = y1 - l
+        h2 = y2 - l
+        dx = x2 - x1
+        a = h2 - h1
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            s = np.sqrt(np.maximum(h1*h2 * (dx*dx + a*a), 0.0))
+            breakpoints = np.where(dx >= 0, x1 + h1 * (dx*dx + h2*a) / (s + h1*dx), x1 + (s - h1*dx) / a)
+
+        # te same przypadki szczególne co w compute_breakpoint, w tej samej kolejności
+        breakpoints = np.where(y2 == l, x2, breakpoints)
+        breakpoints = np.where(y1 == l, x1, breakpoints)
+        return np.where(y1 == y2, (x1 + x2) * 0.5, breakpoints)
+
+    @classmethod
+    def compute_convergence_points(cls, points1, points2, points3):
+        points1 = np.asarray(points1, dtype=float)
+        points2 = np.asarray(points2, dtype=float)
+        points3 = np.asarray(points3, dtype=float)
+
+        x1, y1 = points1[:, 0], points1[:, 1]
+        bx, by = points2[:, 0] - x1, points2[:, 1] - y1
+        cx, cy = points3[:, 0] - x1, points3[:, 1] - y1
+
+        d = 2.0 * (bx*cy - by*cx)
+        b2 = bx*bx + by*by
+        c2 = cx*cx + cy*cy
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ux = (cy*b2 - by*c2) / d
+            uy = (bx*c2 - cx*b2) / d
+
+        r = np.sqrt(ux*ux + uy*uy)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ys = np.where(uy <= 0, y1 + uy - r, y1 - ux*ux / (uy + r))
+        ys = np.where(d == 0, np.inf, ys)
+        centers = np.column_stack((x1 + ux, y1 + uy))
+        centers[d == 0] = np.nan
+
+        return ys, centers
+
+
+class euclidean_2d_scalar(euclidean_2d):
+    """
+    ta sama metryka co euclidean_2d, ale liczona na zwykłych floatach Pythona zamiast na dwuelementowych tablicach numpy.
+    Dla pojedynczych wywołań narzut numpy jest dużo większy niż sama arytmetyka. Kolejność działań jest taka sama
+    jak w euclidean_2d, więc wyniki są identyczne co do bitu. Wersje wsadowe dziedziczy z euclidean_2d.
+    """
 
-        d1 = 0.5/((y1 - l) + eps)
-        d2 = 0.5/((y2 - l) + eps)
+    @staticmethod
+    def prepare_point(point):
+        return float(point[0]), float(point[1])
 
-        a = d1 - d2
-        b = 2.0 * (d2*x2 - d1*x1)
-        c = (x1*x1 - l*l + y1*y1) * d1 - (x2*x2 - l*l + y2*y2) * d2
+    @staticmethod
+    def compute_breakpoint(point1, point2, l):
+        x1, y1 = point1
+        x2, y2 = point2
+
+        if y1 == y2:
+            return (x1 + x2) * 0.5
+        if y1 == l:
+            return x1
+        if y2 == l:
+            return x2
 
-        delta = b*b - 4.0*a*c
+        h1 = y1 - l
+        h2 = y2 - l
+        dx = x2 - x1
+        a = h2 - h1
 
-        return (-b + np.sqrt(np.abs(delta))) / (2.0*a + eps)
+        s = math.sqrt(max(h1*h2 * (dx*dx + a*a), 0.0))
+        if dx >= 0:
+            return x1 + h1 * (dx*dx + h2*a) / (s + h1*dx)
+        return x1 + (s - h1*dx) / a
 
     @staticmethod
     def compute_convergence_point(point1, point2, point3):
-        eps = 1e-9
-
-        v1 = (point1-point2)[[1, 0]]
-        v2 = (point2 - point3)[[1, 0]]
-        v1[0] = -v1[0]
-        v2[0] = -v2[0]
+        x1, y1 = point1
+        bx, by = point2[0] - x1, point2[1] - y1
+        cx, cy = point3[0] - x1, point3[1] - y1
 
-        delta = (point3 - point1) * 0.5
-        t = (delta[0] * v2[1] - delta[1]*v2[0]) / (v1[0] * v2[1] - v1[1]*v2[0] + eps)
+        d = 2.0 * (bx*cy - by*cx)
+        if d == 0:
+            return math.inf, (math.nan, math.nan)
 
-        center = 0.5 * (point1 + point2) + t*v1
+        b2 = bx*bx + by*by
+        c2 = cx*cx + cy*cy
+        ux = (cy*b2 - by*c2) / d
+        uy = (bx*c2 - cx*b2) / d
 
-        r = np.sqrt(np.sum((point1 - center)**2))
+        r = math.sqrt(ux*ux + uy*uy)
 
-        y = center[1] - r
+        y = y1 + uy - r if uy <= 0 else y1 - ux*ux / (uy + r)
 
-        return y, center
\ No newline at end of file
+        return y, (x1 + ux, y1 + uy)
@@ -0,0 +1,364 @@
+#pomiary wydajności pojedynczych elementów algorytmu Fortune'a
+#uruchomienie: python Microbenchmark.py [nazwa_pomiaru ...]
+
+import sys
+import time
+import numpy as np
+from queue import PriorityQueue
+from Event import Event, EventType
+from Event_queue import EventQueue
+from Metric import euclidean_2d, euclidean_2d_scalar
+from Beach_line import Arc, BeachLine
+from Fortune_algorithm import FortuneAlgorithm
+
+
+def event_stream(number_of_sites, seed=0):
+    '''
+    generuje ciąg zdarzeń przypominający przebieg zamiatania: wszystkie zdarzenia punktowe na start,
+    a w trakcie po każdym zdjęciu zdarzenia dokładane są średnio dwa zdarzenia okręgowe poniżej miotły
+    :param number_of_sites: liczba zdarzeń punktowych
+    :param seed: ziarno generatora
+    :return: zdarzenia punktowe oraz lista par (y, czy dołożyć zdarzenie okręgowe)
+    '''
+    rng = np.random.default_rng(seed)
+    points = rng.uniform(0, 1, size=(number_of_sites, 2))
+    sites = [Event(p[1], EventType.site, point=p) for p in points]
+    circle_drops = rng.uniform(0, 0.05, size=2 * number_of_sites)
+    return sites, circle_drops
+
+
+def run_event_queue(queue, circle_drops):
+    pops = 0
+    drop_idx = 0
+    while not queue.empty():
+        event = queue.get()
+        pops += 1
+        if drop_idx < len(circle_drops) - 1 and event.type is EventType.site:
+            for _ in range(2):
+                y = event.y - circle_drops[drop_idx]
+                queue.put(Event(y, EventType.circle, point=(0.0, y)))
+                drop_idx += 1
+    return pops
+
+
+def bench_event_queue(sizes=(10 ** 3, 10 ** 4, 10 ** 5), repeat=3):
+    '''
+    porównuje koszt jednego zdarzenia (put + get) w queue.PriorityQueue z Event.__lt__ oraz w EventQueue
+    '''
+    print('event queue: ns/event (best of %d)' % repeat)
+    print('%10s %16s %16s %8s' % ('n', 'PriorityQueue', 'EventQueue', 'speedup'))
+    for n in sizes:
+        sites, circle_drops = event_stream(n)
+        results = []
+        for make_queue in (_priority_queue, EventQueue):
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                pops = run_event_queue(make_queue(sites), circle_drops)
+                best = min(best, time.perf_counter() - start)
+            results.append(best / pops * 1e9)
+        print('%10d %16.1f %16.1f %7.2fx' % (n, results[0], results[1], results[0] / results[1]))
+
+
+def _priority_queue(events):
+    queue = PriorityQueue()
+    for event in events:
+        queue.put(event)
+    return queue
+
+
+def bench_metric(number_of_calls=10 ** 5, repeat=3):
+    '''
+    porównuje koszt pojedynczego wywołania compute_breakpoint i compute_convergence_point w metrykach euklidesowych
+    '''
+    rng = np.random.default_rng(0)
+    points = rng.uniform(0, 1, size=(number_of_calls, 3, 2))
+    print('metric kernels: ns/call (best of %d)' % repeat)
+    print('%22s %28s' % ('metric', 'breakpoint / convergence'))
+    for metric in (euclidean_2d, euclidean_2d_scalar):
+        triples = [[metric.prepare_point(p) for p in triple] for triple in points]
+        l = metric.prepare_point((0.0, -0.5))[1]
+        breakpoint_time, convergence_time = float('inf'), float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for p1, p2, p3 in triples:
+                metric.compute_breakpoint(p1, p2, l)
+            breakpoint_time = min(breakpoint_time, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for p1, p2, p3 in triples:
+                metric.compute_convergence_point(p1, p2, p3)
+            convergence_time = min(convergence_time, time.perf_counter() - start)
+        print('%22s %13.1f / %12.1f' % (metric.__name__, breakpoint_time / number_of_calls * 1e9,
+                                          convergence_time / number_of_calls * 1e9))
+
+
+#operacje nagrane z prawdziwego zamiatania, odtwarzane potem na każdym elemencie osobno
+
+class SweepLog:
+    '''
+    zapis jednego zamiatania: operacje na linii brzegowej (łuki jako numery w sites), wywołania funkcji metryki
+    i operacje na kolejce zdarzeń (zdarzenia jako numery w events)
+    '''
+
+    def __init__(self):
+        self.sites = []
+        self.tree = []
+        self.breakpoints = []
+        self.convergence_points = []
+        self.events = []
+        self.initial_events = []
+        self.queue = []
+
+
+class RecordingMetric:
+    #metryka zapisująca argumenty wywołań, resztę przekazuje do właściwej metryki
+    def __init__(self, metric, log):
+        self.metric = metric
+        self.log = log
+        self.prepare_point = metric.prepare_point
+        self.compute_breakpoints = metric.compute_breakpoints
+
+    def compute_breakpoint(self, point1, point2, l):
+        self.log.breakpoints.append((point1, point2, l))
+        return self.metric.compute_breakpoint(point1, point2, l)
+
+    def compute_convergence_point(self, point1, point2, point3):
+        self.log.convergence_points.append((point1, point2, point3))
+        return self.metric.compute_convergence_point(point1, point2, point3)
+
+
+class RecordingBeachLine(BeachLine):
+    def __init__(self, compute_breakpoint, log):
+        super().__init__(compute_breakpoint)
+        self.log = log
+        self.ids = {}
+
+    def create_arc(self, site):
+        #łuki z puli są używane ponownie, więc numer nadajemy przy każdym utworzeniu
+        arc = super().create_arc(site)
+        self.ids[id(arc)] = len(self.log.sites)
+        self.log.sites.append(site)
+        return arc
+
+    def set_root(self, arc):
+        self.log.tree.append(('set_root', self.ids[id(arc)]))
+        super().set_root(arc)
+
+    def get_arc_above(self, point, l):
+        self.log.tree.append(('get_arc_above', point, l))
+        return super().get_arc_above(point, l)
+
+    def insert_before(self, x, y):
+        self.log.tree.append(('insert_before', self.ids[id(x)], self.ids[id(y)]))
+        super().insert_before(x, y)
+
+    def insert_after(self, x, y):
+        self.log.tree.append(('insert_after', self.ids[id(x)], self.ids[id(y)]))
+        super().insert_after(x, y)
+
+    def replace(self, x, y):
+        self.log.tree.append(('replace', self.ids[id(x)], self.ids[id(y)]))
+        super().replace(x, y)
+
+    def delete(self, node):
+        self.log.tree.append(('delete', self.ids[id(node)]))
+        super().delete(node)
+
+
+class RecordingEventQueue(EventQueue):
+    def __init__(self, events, log):
+        events = list(events)
+        self.log = log
+        self.ids = {}
+        for event in events:
+            log.initial_events.append(self.register(event))
+        super().__init__(events)
+
+    def register(self, event):
+        self.ids[id(event)] = len(self.log.events)
+        self.log.events.append((event.y, event.type, event.point))
+        return self.ids[id(event)]
+
+    def put(self, event):
+        self.log.queue.append(('put', self.register(event)))
+        super().put(event)
+
+    def get(self):
+        self.log.queue.append(('get',))
+        return super().get()
+
+    def invalidate(self, event):
+        self.log.queue.append(('invalidate', self.ids[id(event)]))
+        super().invalidate(event)
+
+
+class RecordingFortune(FortuneAlgorithm):
+    def __init__(self, points, log, metric=euclidean_2d_scalar):
+        super().__init__(points, metric=RecordingMetric(metric, log))
+        self.beach_line = RecordingBeachLine(self.metric.compute_breakpoint, log)
+        self.log = log
+
+    def create_events(self):
+        self.events = RecordingEventQueue((Event(s.point[1], EventType.site, site=s, point=s.point)
+                                           for s in self.diagram.sites), self.log)
+        return self.events
+
+
+def record_sweep(number_of_sites, seed=0, metric=euclidean_2d_scalar):
+    '''
+    :param metric: metryka zamiatania; nagrane argumenty jej funkcji mają jej postać punktów (prepare_point)
+    :return: SweepLog zamiatania losowych punktów z rozkładu jednostajnego
+    '''
+    log = SweepLog()
+    points = np.random.default_rng(seed).uniform(0, 1, size=(number_of_sites, 2))
+    RecordingFortune(points, log, metric).construct()
+    return log
+
+
+def timer_overhead(samples=10 ** 5):
+    #koszt pary wywołań perf_counter_ns, odejmowany od czasu każdej operacji
+    clock = time.perf_counter_ns
+    costs = []
+    for _ in range(samples):
+        start = clock()
+        costs.append(clock() - start)
+    return float(np.median(costs))
+
+
+def replay_beach_line(log, overhead):
+    '''
+    odtwarza operacje na nowej linii brzegowej, mierząc każdą osobno
+    :return: słownik rodzaj operacji -> (liczba, łączny czas w ns) oraz to samo w podziale na rozmiar linii brzegowej
+    (przedział [2^(k-1), 2^k) opisany przez k)
+    '''
+    clock = time.perf_counter_ns
+    beach_line = BeachLine(euclidean_2d_scalar.compute_breakpoint)
+    arcs = [Arc(site) for site in log.sites]
+    totals = {}
+    by_size = {}
+    size = 0
+    for op in log.tree:
+        kind = op[0]
+        if kind == 'get_arc_above':
+            start = clock()
+            beach_line.get_arc_above(op[1], op[2])
+            elapsed = clock() - start
+        elif kind == 'set_root':
+            start = clock()
+            beach_line.set_root(arcs[op[1]])
+            elapsed = clock() - start
+        elif kind == 'delete':
+            start = clock()
+            beach_line.delete(arcs[op[1]])
+            elapsed = clock() - start
+        else:
+            method = getattr(beach_line, kind)
+            x, y = arcs[op[1]], arcs[op[2]]
+            start = clock()
+            method(x, y)
+            elapsed = clock() - start
+        kind = 'insert' if kind.startswith('insert') else kind
+        elapsed -= overhead
+        count, total = totals.get(kind, (0, 0))
+        totals[kind] = (count + 1, total + elapsed)
+        bucket = by_size.setdefault(size.bit_length(), {})
+        count, total = bucket.get(kind, (0, 0))
+        bucket[kind] = (count + 1, total + elapsed)
+        size += {'set_root': 1, 'insert': 1, 'delete': -1}.get(kind, 0)
+    return totals, by_size
+
+
+def replay_event_queue(log, overhead):
+    clock = time.perf_counter_ns
+    events = [Event(y, event_type, point=point) for y, event_type, point in log.events]
+    queue = EventQueue(events[i] for i in log.initial_events)
+    totals = {}
+    for op in log.queue:
+        kind = op[0]
+        if kind == 'get':
+            start = clock()
+            queue.get()
+            elapsed = clock() - start
+        elif kind == 'put':
+            event = events[op[1]]
+            start = clock()
+            queue.put(event)
+            elapsed = clock() - start
+        else:
+            event = events[op[1]]
+            start = clock()
+            queue.invalidate(event)
+            elapsed = clock() - start
+        count, total = totals.get(kind, (0, 0))
+        totals[kind] = (count + 1, total + elapsed - overhead)
+    return totals
+
+
+def _ns_per_op(totals, kind):
+    count, total = totals.get(kind, (0, 0))
+    return total / count if count else float('nan')
+
+
+def bench_beach_line(sizes=(10 ** 3, 10 ** 4, 10 ** 5)):
+    '''
+    koszt operacji na linii brzegowej (insert i delete razem z naprawą drzewa) odtworzonych z prawdziwego zamiatania,
+    dla kilku n oraz w podziale na rozmiar linii brzegowej dla największego n
+    '''
+    overhead = timer_overhead()
+    kinds = ('get_arc_above', 'insert', 'replace', 'delete')
+    print('beach line: ns/op replayed from recorded sweeps (timer overhead %.0f ns subtracted)' % overhead)
+    print('%10s' % 'n' + ''.join('%15s' % kind for kind in kinds))
+    for n in sizes:
+        totals, by_size = replay_beach_line(record_sweep(n), overhead)
+        print('%10d' % n + ''.join('%15.1f' % _ns_per_op(totals, kind) for kind in kinds))
+    print('by beach line size (n = %d)' % sizes[-1])
+    print('%16s' % 'arcs' + ''.join('%15s' % kind for kind in kinds))
+    for bucket in sorted(by_size):
+        arcs = '[%d, %d)' % (2 ** (bucket - 1), 2 ** bucket) if bucket else '0'
+        print('%16s' % arcs + ''.join('%15.1f' % _ns_per_op(by_size[bucket], kind) for kind in kinds))
+
+
+def bench_recorded_event_queue(sizes=(10 ** 3, 10 ** 4, 10 ** 5)):
+    #koszt put/get/invalidate w ciągu operacji nagranym z prawdziwego zamiatania
+    overhead = timer_overhead()
+    kinds = ('put', 'get', 'invalidate')
+    print('event queue: ns/op replayed from recorded sweeps (timer overhead %.0f ns subtracted)' % overhead)
+    print('%10s' % 'n' + ''.join('%15s' % kind for kind in kinds))
+    for n in sizes:
+        totals = replay_event_queue(record_sweep(n), overhead)
+        print('%10d' % n + ''.join('%15.1f' % _ns_per_op(totals, kind) for kind in kinds))
+
+
+def bench_recorded_metric(sizes=(10 ** 3, 10 ** 4, 10 ** 5), repeat=3):
+    #koszt funkcji metryki na argumentach nagranych z prawdziwego zamiatania, plus liczba wywołań na zdarzenie punktowe
+    print('metric kernels: ns/call on recorded arguments (best of %d)' % repeat)
+    print('%10s %22s %14s %14s %18s' % ('n', 'metric', 'breakpoint', 'convergence', 'breakpoints/site'))
+    for n in sizes:
+        for metric in (euclidean_2d, euclidean_2d_scalar):
+            #każda metryka dostaje argumenty z własnego zamiatania, w swojej postaci punktów (tablice albo krotki)
+            log = record_sweep(n, metric=metric)
+            breakpoint_time, convergence_time = float('inf'), float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                for p1, p2, l in log.breakpoints:
+                    metric.compute_breakpoint(p1, p2, l)
+                breakpoint_time = min(breakpoint_time, time.perf_counter() - start)
+
+                start = time.perf_counter()
+                for p1, p2, p3 in log.convergence_points:
+                    metric.compute_convergence_point(p1, p2, p3)
+                convergence_time = min(convergence_time, time.perf_counter() - start)
+            print('%10d %22s %14.1f %14.1f %18.1f' % (n, metric.__name__,
+                                                      breakpoint_time / len(log.breakpoints) * 1e9,
+                                                      convergence_time / max(len(log.convergence_points), 1) * 1e9,
+                                                      len(log.breakpoints) / n))
+
+
+BENCHMARKS = {'event_queue': bench_event_queue, 'metric': bench_metric, 'beach_line': bench_beach_line,
+              'recorded_event_queue': bench_recorded_event_queue, 'recorded_metric': bench_recorded_metric}
+
+
+if __name__ == '__main__':
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
@@ -0,0 +1,564 @@
+#równoległe wyznaczanie diagramów Voronoia w puli procesów
+#punkty i wyniki przechodzą między procesami przez pamięć współdzieloną jako płaskie tablice numpy,
+#przez kolejki procesów wędrują tylko nazwy bloków pamięci, indeksy i liczniki
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+from Fortune_algorithm import FortuneAlgorithm
+from Voronoi_diagram import CompactVoronoiDiagram
+
+
+def diagram_arrays(points, named_metric='euclidean_2d_scalar'):
+    '''
+    wyznacza diagram (razem z obramowaniem) na CompactVoronoiDiagram
+    :param points: tablica (n, 2) punktów
+    :return: słownik z tablicami 'vertices' (V, 2), 'edges' (E, 2) (początek i koniec półprostej), 'faces' (E,)
+    (ściana, czyli indeks punktu) oraz 'links' (E, 3) (bliźniak, następna, poprzednia półprosta), -1 oznacza brak
+    '''
+    fortune = FortuneAlgorithm(points, named_metric=named_metric, diagram_type=CompactVoronoiDiagram)
+    fortune.construct()
+    fortune.bound()
+    diagram = fortune.diagram
+    return {'vertices': diagram.vertices_array(), 'edges': diagram.edges_array(),
+            'faces': diagram.half_edge_faces(), 'links': diagram.half_edge_links()}
+
+
+def vertex_capacity(n):
+    #zamiatanie daje mniej niż 2n wierzchołków, bound dokłada po jednym na łuk linii brzegowej i rogi obramowania
+    return 4 * n + 8
+
+
+def half_edge_capacity(n):
+    #mniej niż 6n półprostych z zamiatania plus półproste na obramowaniu
+    return 8 * n + 16
+
+
+class SharedArray:
+    '''
+    tablica numpy w bloku pamięci współdzielonej. W procesie głównym tworzy blok (create=True),
+    w procesach roboczych podłącza się do niego po nazwie
+    '''
+
+    def __init__(self, shape, dtype, name=None):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        size = max(int(np.prod(self.shape)) * self.dtype.itemsize, 1)
+        self.memory = SharedMemory(name=name, create=name is None, size=size)
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.memory.buf)
+
+    def spec(self):
+        #to, co wysyłamy do procesu roboczego zamiast samej tablicy
+        return self.memory.name, self.shape, self.dtype.str
+
+    @classmethod
+    def attach(cls, spec):
+        name, shape, dtype = spec
+        return cls(shape, dtype, name)
+
+    def close(self):
+        self.array = None
+        self.memory.close()
+
+    def unlink(self):
+        self.close()
+        self.memory.unlink()
+
+
+def _construct_chunk(first, last, inputs, outputs, named_metric):
+    '''
+    praca jednego procesu roboczego: wyznacza diagramy zbiorów first..last-1 i zapisuje je w tablicach wyjściowych
+    pod przydzielonymi przesunięciami
+    :return: lista par (liczba wierzchołków, liczba półprostych) dla kolejnych zbiorów
+    '''
+    points, offsets, vertex_offsets, edge_offsets = (SharedArray.attach(spec) for spec in inputs)
+    vertices, edges, faces, links = (SharedArray.attach(spec) for spec in outputs)
+    counts = []
+    try:
+        for i in range(first, last):
+            #kopia, żeby obiekty diagramu nie trzymały widoków na pamięć współdzieloną
+            result = diagram_arrays(np.array(points.array[offsets.array[i]:offsets.array[i + 1]]), named_metric)
+            v, e = vertex_offsets.array[i], edge_offsets.array[i]
+            vertex_count, edge_count = len(result['vertices']), len(result['edges'])
+            if v + vertex_count > vertex_offsets.array[i + 1] or e + edge_count > edge_offsets.array[i + 1]:
+                raise ValueError('diagram of point set %d does not fit in the preallocated output' % i)
+            vertices.array[v:v + vertex_count] = result['vertices']
+            edges.array[e:e + edge_count] = result['edges']
+            faces.array[e:e + edge_count] = result['faces']
+            links.array[e:e + edge_count] = result['links']
+            counts.append((vertex_count, edge_count))
+    finally:
+        for shared in (points, offsets, vertex_offsets, edge_offsets, vertices, edges, faces, links):
+            shared.close()
+    return counts
+
+
+def chunk_bounds(sizes, chunks):
+    '''
+    dzieli kolejne zbiory na co najwyżej chunks ciągłych grup o podobnej łącznej liczbie punktów,
+    dzięki temu małe zbiory są wysyłane do procesów paczkami
+    :return: lista par (pierwszy, za ostatnim)
+    '''
+    total = int(np.sum(sizes))
+    target = max(total / max(chunks, 1), 1)
+    bounds = []
+    first, accumulated = 0, 0
+    for i, size in enumerate(sizes):
+        accumulated += size
+        if accumulated >= target:
+            bounds.append((first, i + 1))
+            first, accumulated = i + 1, 0
+    if first < len(sizes):
+        bounds.append((first, len(sizes)))
+    return bounds
+
+
+def construct_many(point_sets, workers=None, chunks_per_worker=4, named_metric='euclidean_2d_scalar'):
+    '''
+    wyznacza diagramy Voronoia wielu niezależnych zbiorów punktów w puli procesów
+    :param point_sets: lista tablic (n_i, 2) punktów
+    :param workers: liczba procesów (domyślnie liczba rdzeni), przy 1 wszystko liczymy w bieżącym procesie
+    :param chunks_per_worker: na ile paczek na proces dzielimy zbiory, więcej paczek to lepsze równoważenie obciążenia,
+    mniej to mniejszy narzut na zadanie
+    :return: lista słowników jak w diagram_arrays, w kolejności point_sets
+    '''
+    point_sets = [np.asarray(points, dtype=np.float64).reshape(-1, 2) for points in point_sets]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers == 1 or len(point_sets) <= 1:
+        return [{name: np.array(array) for name, array in diagram_arrays(points, named_metric).items()}
+                for points in point_sets]
+
+    sizes = np.array([len(points) for points in point_sets], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(sizes)))
+    vertex_offsets = np.concatenate(([0], np.cumsum([vertex_capacity(n) for n in sizes])))
+    edge_offsets = np.concatenate(([0], np.cumsum([half_edge_capacity(n) for n in sizes])))
+
+    shared_inputs = [SharedArray((offsets[-1], 2), np.float64), SharedArray(offsets.shape, np.int64),
+                     SharedArray(vertex_offsets.shape, np.int64), SharedArray(edge_offsets.shape, np.int64)]
+    shared_outputs = [SharedArray((vertex_offsets[-1], 2), np.float64), SharedArray((edge_offsets[-1], 2), np.int32),
+                      SharedArray((edge_offsets[-1],), np.int32), SharedArray((edge_offsets[-1], 3), np.int32)]
+    try:
+        np.concatenate(point_sets, out=shared_inputs[0].array)
+        for shared, array in zip(shared_inputs[1:], (offsets, vertex_offsets, edge_offsets)):
+            shared.array[:] = array
+
+        inputs = [shared.spec() for shared in shared_inputs]
+        outputs = [shared.spec() for shared in shared_outputs]
+        bounds = chunk_bounds(sizes, workers * chunks_per_worker)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_construct_chunk, first, last, inputs, outputs, named_metric)
+                       for first, last in bounds]
+            counts = [count for future in futures for count in future.result()]
+
+        vertices, edges, faces, links = (shared.array for shared in shared_outputs)
+        results = []
+        for i, (vertex_count, edge_count) in enumerate(counts):
+            v, e = vertex_offsets[i], edge_offsets[i]
+            results.append({'vertices': vertices[v:v + vertex_count].copy(), 'edges': edges[e:e + edge_count].copy(),
+                            'faces': faces[e:e + edge_count].copy(), 'links': links[e:e + edge_count].copy()})
+        return results
+    finally:
+        for shared in shared_inputs + shared_outputs:
+            shared.unlink()
+
+
+#jeden duży diagram liczony w pionowych pasach
+#
+#pas dostaje swoje punkty (rdzeń) oraz punkty z zakładki o szerokości margin po obu stronach. Komórka punktu
+#z rdzenia w takim częściowym diagramie jest na pewno komórką pełnego diagramu, jeśli każdy jej wierzchołek ma
+#okrąg opisany, w którym nie leży żaden pominięty punkt - wtedy wierzchołek jest wierzchołkiem pełnego diagramu,
+#a komórka częściowa zawiera pełną i ma te same wierzchołki. Okrąg mieszczący się (w osi x) w pokrytym pasie jest
+#pusty od razu; dla pozostałych (duże okręgi przy brzegu zbioru) szukamy pominiętych punktów w kubełkach osi x,
+#których prostokąt (najmniejsze i największe y punktów kubełka) przecina okrąg.
+#Półprosta komórki jest pewna, gdy jej dwa punkty są sąsiednimi punktami otoczki wypukłej wszystkich punktów
+#albo za bokiem pq nie ma pominiętych punktów.
+#Znalezione pominięte punkty (konflikty) dokładamy do pokrycia przy ponownym liczeniu niepotwierdzonych komórek:
+#dla okręgu wszystkie punkty w jego wnętrzu, dla półprostej punkt, który na niej pierwszy utworzy wierzchołek.
+#Komórki przy brzegu zbioru zależą od odległych punktów leżących też przy brzegu, więc zamiast poszerzać cały pas
+#liczymy je w małych pasach wokół grup niepotwierdzonych punktów razem z konfliktami. Gdy konfliktów nie przybywa,
+#zakładka rośnie dwa razy; pokrycie tylko rośnie, a gdy obejmie wszystkie punkty, diagram częściowy jest pełnym
+#diagramem, więc pętla zawsze się kończy.
+#Dla danych dalekich od jednostajnych (skupiska, punkty na okręgu) ponowne próby kosztują wielokrotność jednego
+#zamiatania, dlatego mają limity: liczbę rund, łączną liczbę punktów zamiatanych w próbach i zakładkę nie szerszą
+#niż pas. Po ich przekroczeniu resztę komórek bierzemy z jednego zamiatania wszystkich punktów. W pierwszej rundzie
+#pas przestaje szukać konfliktów, gdy zbyt wiele krawędzi ma okręgi wychodzące poza pas.
+#Każdą krawędź zapisuje tylko komórka punktu o mniejszym indeksie, więc krawędzie się nie powtarzają.
+
+def convex_hull_keys(points):
+    '''
+    :param points: tablica (n, 2) punktów posortowanych leksykograficznie (x, potem y)
+    :return: posortowana tablica kluczy min(i, j) * n + max(i, j) par sąsiednich punktów otoczki wypukłej
+    (punkty współliniowe na brzegu otoczki zostają w otoczce)
+    '''
+    n = len(points)
+
+    def half(indices):
+        chain = []
+        for i in indices:
+            while len(chain) >= 2:
+                (ax, ay), (bx, by) = points[chain[-2]] - points[chain[-1]], points[i] - points[chain[-1]]
+                if ax * by - ay * bx < 0:
+                    break
+                chain.pop()
+            chain.append(i)
+        return chain
+
+    hull = half(range(n))[:-1] + half(range(n - 1, -1, -1))[:-1]
+    hull = np.array(hull, dtype=np.int64)
+    following = np.roll(hull, -1)
+    return np.unique(np.minimum(hull, following) * n + np.maximum(hull, following))
+
+
+def y_envelope(points, buckets):
+    '''
+    :param points: tablica (n, 2) punktów posortowanych po x
+    :return: brzegi kubełków osi x (buckets + 1,), indeksy pierwszego i za ostatnim punktem każdego kubełka
+    oraz najmniejsze i największe y punktów w każdym kubełku (inf i -inf dla pustych)
+    '''
+    xs = points[:, 0]
+    edges = np.linspace(xs[0], xs[-1], buckets + 1)
+    starts = np.searchsorted(xs, edges[:-1], 'left')
+    ends = np.append(starts[1:], len(xs))
+    y_min = np.full(buckets, np.inf)
+    y_max = np.full(buckets, -np.inf)
+    filled = ends > starts
+    #reduceat liczy do początku następnego wskazanego kubełka, więc puste kubełki pomijamy już w indeksach
+    y_min[filled] = np.minimum.reduceat(points[:, 1], starts[filled])
+    y_max[filled] = np.maximum.reduceat(points[:, 1], starts[filled])
+    return edges, starts, ends, y_min, y_max
+
+
+def _bucket_points(envelope, selected):
+    #indeksy punktów z wybranych kubełków (kubełki to kolejne fragmenty tablicy posortowanej po x)
+    _, starts, ends, _, _ = envelope
+    starts, ends = starts[selected], ends[selected]
+    lengths = ends - starts
+    return np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+
+def _circle_conflicts(center, radius, site, points, skipped, envelope):
+    #pominięte punkty leżące wewnątrz okręgu o środku center przechodzącego przez punkt site
+    edges, _, _, y_min, y_max = envelope
+    cx, cy = center
+    slack = 1e-9 * (radius + abs(cx))
+    first = max(int(np.searchsorted(edges, cx - radius - slack, 'right')) - 1, 0)
+    last = min(int(np.searchsorted(edges, cx + radius + slack, 'right')), len(y_min))
+    left, right = edges[first:last], edges[first + 1:last + 1]
+    dx = np.where((left <= cx) & (cx <= right), 0.0, np.minimum(np.abs(left - cx), np.abs(right - cx)))
+    #zapas na błędy zaokrągleń przy ogromnych okręgach, zbędny kubełek tylko wydłuża dokładne sprawdzanie
+    h = np.sqrt(np.maximum(radius * radius - dx * dx, 0.0)) + 1e-9 * (radius + abs(cy))
+    selected = first + np.flatnonzero((cy - h <= y_max[first:last]) & (cy + h >= y_min[first:last]))
+    candidates = _bucket_points(envelope, selected)
+    candidates = candidates[skipped[candidates]]
+    #|x - center| < |site - center| względem site, co przy ogromnych okręgach (punkty prawie współliniowe) nie gubi
+    #dokładności. Punkt na samym okręgu uznany za konflikt tylko dokłada się do pokrycia w kolejnej próbie
+    offset = points[candidates] - site
+    return candidates[np.einsum('ij,ij->i', offset, offset) < 2 * offset @ (center - site)]
+
+
+def _ray_conflict(p, q, normal, points, skipped, envelope):
+    #pominięty punkt za bokiem pq (po stronie normal), który jako pierwszy utworzy wierzchołek na półprostej,
+    #albo -1, gdy takich punktów nie ma
+    edges, _, _, y_min, y_max = envelope
+    filled = np.flatnonzero(y_min <= y_max)
+    #najdalszy w kierunku normal róg prostokąta kubełka
+    x = (edges[1:] if normal[0] > 0 else edges[:-1])[filled]
+    y = (y_max if normal[1] > 0 else y_min)[filled]
+    selected = filled[(x - p[0]) * normal[0] + (y - p[1]) * normal[1] > 0]
+    candidates = _bucket_points(envelope, selected)
+    candidates = candidates[skipped[candidates]]
+    beyond = candidates[(points[candidates] - p) @ normal > 0]
+    if not len(beyond):
+        return -1
+    #środek okręgu przez p, q i r to middle + t * normal, wierzchołek tworzy punkt o najmniejszym t
+    middle = (p + q) / 2
+    offset = points[beyond] - middle
+    t = (np.einsum('ij,ij->i', offset, offset) - np.dot(p - middle, p - middle)) / (2 * offset @ normal)
+    return int(beyond[np.argmin(t)])
+
+
+def cell_edges(all_points, first, last, extra, core, hull_keys, named_metric='euclidean_2d_scalar', envelope=None,
+               check_limit=None):
+    '''
+    wyznacza diagram częściowy i zwraca krawędzie potwierdzonych komórek punktów z rdzenia
+    :param all_points: wszystkie punkty posortowane leksykograficznie (x, potem y)
+    :param first: indeks pierwszego punktu pokrytego pasa
+    :param last: indeks za ostatnim punktem pokrytego pasa
+    :param extra: indeksy dodatkowych punktów pokrycia (konfliktów z poprzednich prób)
+    :param core: indeksy punktów, których komórki potwierdzamy
+    :param hull_keys: wynik convex_hull_keys dla wszystkich punktów
+    :param envelope: wynik y_envelope dla wszystkich punktów, potrzebny, gdy pokrycie nie obejmuje wszystkich punktów
+    :param check_limit: największa liczba końców krawędzi sprawdzanych dokładnie (szukaniem pominiętych punktów);
+    po jej przekroczeniu pozostałe komórki zostają niepotwierdzone bez szukania konfliktów. None to brak limitu
+    :return: słownik: 'sites' potwierdzone punkty rdzenia, 'edges' (F, 2, 2) odcinki, 'edge_sites' (F, 2) ich punkty,
+    'ray_origins' (R, 2), 'ray_directions' (R, 2) i 'ray_sites' (R, 2) półproste oraz 'conflicts' pominięte punkty,
+    przez które nie udało się potwierdzić komórek; indeksy są globalne
+    '''
+    total = len(all_points)
+    extra = np.setdiff1d(extra, np.arange(first, last))
+    cover = np.concatenate((np.arange(first, last), extra))
+    points = all_points[cover]
+    fortune = FortuneAlgorithm(points, named_metric=named_metric, diagram_type=CompactVoronoiDiagram)
+    fortune.construct()
+    diagram = fortune.diagram
+
+    vertices = diagram.vertices_array()
+    edges = diagram.edges_array()
+    faces = diagram.half_edge_faces()
+    twins = diagram.half_edge_links()[:, 0]
+    p, q = faces, faces[twins]
+    origin, destination = edges[:, 0], edges[:, 1]
+
+    n = len(points)
+    whole = n == total
+    in_core = np.zeros(total, dtype=bool)
+    in_core[core] = True
+    confirmed = in_core[cover]
+    conflicts = []
+    if not whole:
+        skipped = np.ones(total, dtype=bool)
+        skipped[cover] = False
+        #okrąg w pasie x z [lo, hi] nie zawiera pominiętych punktów
+        lo, hi = np.inf, -np.inf
+        if last > first:
+            lo = all_points[first, 0] if np.any(skipped[:first]) else -np.inf
+            hi = all_points[last - 1, 0] if np.any(skipped[last:]) else np.inf
+        is_hull = np.isin(np.minimum(cover[p], cover[q]) * total + np.maximum(cover[p], cover[q]), hull_keys)
+        #ściana leży po lewej stronie półprostej, więc jej kierunek to wektor od q do p obrócony w prawo
+        difference = points[p] - points[q]
+        direction = np.column_stack((difference[:, 1], -difference[:, 0]))
+        checked = confirmed[p]
+        budget = [np.inf if check_limit is None else check_limit]
+
+        def endpoint_ok(vertex, sign):
+            #wierzchołek jest pewny, gdy w jego okręgu opisanym nie ma pominiętego punktu. Brak wierzchołka oznacza
+            #półprostą (sign mówi, w którą stronę biegnie), ona jest pewna, gdy nie ma pominiętych punktów za bokiem pq
+            center = vertices[np.maximum(vertex, 0)]
+            radius = np.hypot(*(center - points[p]).T)
+            slack = 1e-9 * (radius + np.abs(center[:, 0]))
+            inside = (center[:, 0] - radius - slack >= lo) & (center[:, 0] + radius + slack <= hi)
+            ok = np.where(vertex >= 0, inside, is_hull)
+            uncertain = np.flatnonzero(~ok & checked)
+            budget[0] -= len(uncertain)
+            if budget[0] < 0:
+                #prawie każdy okrąg wychodzi poza pas (dane skupione, punkty na okręgu), szukanie konfliktów
+                #kosztowałoby więcej niż zamiatanie; komórki zostają niepotwierdzone
+                return ok
+            for i in uncertain:
+                if vertex[i] >= 0:
+                    found = _circle_conflicts(center[i], radius[i], points[p[i]], all_points, skipped,
+                                              envelope)
+                    conflicts.append(found)
+                else:
+                    found = _ray_conflict(points[p[i]], points[q[i]], sign * direction[i], all_points, skipped,
+                                          envelope)
+                    conflicts.append(np.array([found])[:found + 1])
+                ok[i] = not len(conflicts[-1])
+            return ok
+
+        #krawędź bez wierzchołków w diagramie częściowym może mieć wierzchołki w pełnym
+        bad = ~(endpoint_ok(origin, -1) & endpoint_ok(destination, 1)) | ((origin < 0) & (destination < 0))
+        confirmed[p[bad]] = False
+        if n > 1:
+            #komórka bez żadnej półprostej (pojedynczy punkt) nie jest pewna
+            has_edges = np.zeros(n, dtype=bool)
+            has_edges[p] = True
+            confirmed &= has_edges
+    else:
+        difference = points[p] - points[q]
+        direction = np.column_stack((difference[:, 1], -difference[:, 0]))
+
+    own = confirmed[p] & (cover[p] < cover[q])
+    finite = own & (origin >= 0) & (destination >= 0)
+    outgoing = own & (origin >= 0) & (destination < 0)
+    incoming = own & (origin < 0) & (destination >= 0)
+
+    rays = outgoing | incoming
+    ray_origins = np.where(outgoing[:, None], vertices[np.maximum(origin, 0)], vertices[np.maximum(destination, 0)])
+    ray_directions = np.where(outgoing[:, None], direction, -direction)
+
+    return {'sites': cover[confirmed],
+            'edges': np.stack((vertices[origin[finite]], vertices[destination[finite]]), axis=1),
+            'edge_sites': np.column_stack((cover[p[finite]], cover[q[finite]])),
+            'ray_origins': ray_origins[rays], 'ray_directions': ray_directions[rays],
+            'ray_sites': np.column_stack((cover[p[rays]], cover[q[rays]])),
+            'conflicts': np.unique(np.concatenate(conflicts)) if conflicts else np.empty(0, dtype=np.int64)}
+
+
+def _strip_task(spec, first, last, extra, core, hull_keys, envelope, named_metric, check_limit):
+    shared = SharedArray.attach(spec)
+    try:
+        return cell_edges(shared.array, first, last, extra, core, hull_keys, named_metric, envelope, check_limit)
+    finally:
+        shared.close()
+
+
+def _cover(xs, core_first, core_last, margin):
+    #zakres indeksów pasa pokrywającego rdzeń z zakładką margin
+    return int(np.searchsorted(xs, xs[core_first] - margin, 'left')), \
+        int(np.searchsorted(xs, xs[core_last - 1] + margin, 'right'))
+
+
+def _neighbourhood(points, indices, margin):
+    #indeksy punktów w kwadratach o boku 2 * margin wokół wskazanych punktów (points posortowane po x)
+    xs = points[:, 0]
+    found = []
+    for i in indices:
+        first, last = _cover(xs, i, i + 1, margin)
+        near = first + np.flatnonzero(np.abs(points[first:last, 1] - points[i, 1]) <= margin)
+        found.append(near)
+    return np.unique(np.concatenate(found))
+
+
+def construct_strips(points, strips=None, workers=None, margin=None, named_metric='euclidean_2d_scalar',
+                     retry_limit=0.25, max_retries=8):
+    '''
+    wyznacza jeden diagram Voronoia, dzieląc punkty na pionowe pasy liczone równolegle (opis wyżej).
+    Przyspieszenie względem jednego zamiatania jest tylko dla danych zbliżonych do jednostajnych: przy danych
+    skupionych albo punktach na okręgu komórki mają wierzchołki daleko poza zakładką i prawie każda wymaga ponownej
+    próby. Gdy ponowne próby przekroczą limity, pozostałe komórki bierzemy z jednego zamiatania wszystkich punktów,
+    więc wynik kosztuje wtedy mniej więcej pierwszą rundę pasów i jedno zamiatanie
+    :param points: tablica (n, 2) punktów
+    :param strips: liczba pasów (domyślnie liczba procesów)
+    :param workers: liczba procesów (domyślnie liczba rdzeni)
+    :param margin: początkowa szerokość zakładki, domyślnie kilka średnich odległości między punktami
+    :param retry_limit: największa łączna liczba punktów zamiatanych w ponownych próbach (ułamek n)
+    :param max_retries: największa liczba rund ponownych prób; limitem jest też zakładka szersza niż pas
+    :return: słownik jak w cell_edges (bez 'sites' i 'conflicts'), z indeksami punktów w points; odcinki to krawędzie
+    skończone, półproste to nieskończone krawędzie diagramu (krawędzie bez żadnego wierzchołka, np. dla dwóch
+    punktów, są pomijane)
+    '''
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    n = len(points)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if strips is None:
+        strips = workers
+    order = np.lexsort((points[:, 1], points[:, 0]))
+    sorted_points = points[order]
+    xs = sorted_points[:, 0]
+    if margin is None:
+        extent = np.ptp(sorted_points, axis=0) if n else np.zeros(2)
+        margin = 4 * np.sqrt(max(extent[0] * extent[1], extent.max() ** 2 / max(n, 1)) / max(n, 1))
+    margin = max(margin, np.finfo(float).eps)
+    hull_keys = convex_hull_keys(sorted_points) if n > 1 else np.empty(0, dtype=np.int64)
+    #po kilkanaście punktów na kubełek, w wąskich kubełkach prostokąty rzadko przecinają duże okręgi przy brzegu
+    envelope = y_envelope(sorted_points, max(1, n // 16)) if n else None
+
+    confirmed = np.zeros(n, dtype=bool)
+    parts = []
+
+    def merge(part):
+        new_sites = part['sites'][~confirmed[part['sites']]]
+        newly = np.zeros(n, dtype=bool)
+        newly[new_sites] = True
+        confirmed[new_sites] = True
+        #krawędź należy do komórki punktu o mniejszym indeksie, bierzemy ją tylko przy jej potwierdzeniu
+        keep_edges = newly[part['edge_sites'][:, 0]]
+        keep_rays = newly[part['ray_sites'][:, 0]]
+        parts.append((part['edges'][keep_edges], part['edge_sites'][keep_edges], part['ray_origins'][keep_rays],
+                      part['ray_directions'][keep_rays], part['ray_sites'][keep_rays]))
+
+    #liczba rund ponownych prób i suma punktów zamiatanych w nich, zakładka nie powinna przerosnąć pasa
+    retries = 0
+    retried = 0
+    strip_width = (xs[-1] - xs[0]) / strips if n else 0.0
+    bounds = np.linspace(0, n, strips + 1).astype(np.int64)
+    no_extra = np.empty(0, dtype=np.int64)
+    #zadanie: pokryty pas, dodatkowe punkty pokrycia, rdzeń, zakładka, konflikty z poprzednich prób
+    pending = [(*_cover(xs, first, last, margin), no_extra, np.arange(first, last), margin, no_extra)
+               for first, last in zip(bounds[:-1], bounds[1:]) if last > first]
+
+    shared = SharedArray(sorted_points.shape, np.float64)
+    try:
+        shared.array[:] = sorted_points
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while pending:
+                futures = [pool.submit(_strip_task, shared.spec(), first, last, extra, core, hull_keys, envelope,
+                                       named_metric, None if retries else max(64, len(core) // 4))
+                           for first, last, extra, core, _, _ in pending]
+                left = []
+                for (_, _, _, core, width, known), future in zip(pending, futures):
+                    part = future.result()
+                    merge(part)
+                    unconfirmed = core[~confirmed[core]]
+                    if len(unconfirmed):
+                        left.append((unconfirmed, width, known, part['conflicts']))
+                if not left:
+                    break
+
+                #kolejna próba bez pasa: otoczenie niepotwierdzonych punktów i wszystkie dotychczasowe konflikty.
+                #Niepotwierdzone punkty i tak trafią do pokrycia, więc ich liczbę sprawdzamy przed szukaniem otoczenia
+                retries += 1
+                retried += sum(len(unconfirmed) for unconfirmed, _, _, _ in left)
+                pending = []
+                for unconfirmed, width, known, conflicts in left:
+                    if retries > max_retries or retried > retry_limit * n:
+                        break
+                    grown = np.union1d(known, conflicts)
+                    if len(grown) == len(known):
+                        width *= 2
+                    extra = np.union1d(grown, _neighbourhood(sorted_points, unconfirmed, width))
+                    retried += len(extra) - len(unconfirmed)
+                    if width > strip_width:
+                        break
+                    pending.append((0, 0, extra, unconfirmed, width, grown))
+                else:
+                    continue
+
+                #ponowne próby kosztowałyby więcej niż jedno zamiatanie (dane skupione, punkty na okręgu):
+                #resztę komórek bierzemy z diagramu wszystkich punktów
+                unconfirmed = np.concatenate([unconfirmed for unconfirmed, _, _, _ in left])
+                merge(cell_edges(sorted_points, 0, n, no_extra, unconfirmed, hull_keys, named_metric))
+                pending = []
+    finally:
+        shared.unlink()
+
+    if not parts:
+        empty = np.empty((0, 2))
+        return {'edges': np.empty((0, 2, 2)), 'edge_sites': empty.astype(np.int64), 'ray_origins': empty,
+                'ray_directions': empty, 'ray_sites': empty.astype(np.int64)}
+    edges, edge_sites, ray_origins, ray_directions, ray_sites = (np.concatenate(arrays) for arrays in zip(*parts))
+    return {'edges': edges, 'edge_sites': order[edge_sites], 'ray_origins': ray_origins,
+            'ray_directions': ray_directions, 'ray_sites': order[ray_sites]}
+
+
+def single_process_edges(points, named_metric='euclidean_2d_scalar'):
+    #ten sam wynik co construct_strips, ale z jednego zamiatania po wszystkich punktach
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    order = np.lexsort((points[:, 1], points[:, 0]))
+    n = len(points)
+    result = cell_edges(points[order], 0, n, np.empty(0, dtype=np.int64), np.arange(n), np.empty(0, dtype=np.int64),
+                        named_metric)
+    result['edge_sites'] = order[result['edge_sites']]
+    result['ray_sites'] = order[result['ray_sites']]
+    del result['sites'], result['conflicts']
+    return result
+
+
+def validate_strips(points, result, tolerance=1e-9, named_metric='euclidean_2d_scalar'):
+    '''
+    porównuje wynik construct_strips z jednym zamiataniem: te same pary punktów krawędzi i półprostych,
+    te same końce odcinków i początki półprostych (z dokładnością tolerance). Odcinki krótsze niż tolerance
+    są pomijane, bo wierzchołek wspólny dla więcej niż trzech punktów zamiatanie rozbija na krawędzie
+    zerowej długości w zależności od zaokrągleń
+    :return: True, gdy diagramy się zgadzają
+    '''
+    reference = single_process_edges(points, named_metric)
+
+    def by_sites(sites, *arrays):
+        if arrays[0].ndim == 3:
+            long = np.linalg.norm(arrays[0][:, 0] - arrays[0][:, 1], axis=1) > tolerance
+            sites, arrays = sites[long], tuple(array[long] for array in arrays)
+        key = np.sort(sites, axis=1)
+        order = np.lexsort((key[:, 1], key[:, 0]))
+        return (key[order],) + tuple(array[order] for array in arrays)
+
+    expected = by_sites(reference['edge_sites'], reference['edges'])
+    actual = by_sites(result['edge_sites'], result['edges'])
+    expected_rays = by_sites(reference['ray_sites'], reference['ray_origins'])
+    actual_rays = by_sites(result['ray_sites'], result['ray_origins'])
+    return all(a.shape == b.shape and np.allclose(a, b, atol=tolerance, rtol=0)
+               for a, b in zip(expected + expected_rays, actual + actual_rays))
@@ -0,0 +1,147 @@
+#lokalizacja punktów w diagramie Voronoia: komórka zawierająca punkt to komórka najbliższego site, więc wystarczy
+#szukać najbliższego site. Site są rozłożone do kubełków regularnej siatki (średnio kilka na kubełek), zapytanie
+#szuka najmniejszego niepustego kwadratu kubełków wokół swojego kubełka, a odległość d do najbliższego site
+#z tego kwadratu ogranicza odległość do szukanego site, więc na koniec wystarczy przejrzeć kubełki przecinające
+#koło o promieniu d. Dla punktów rozłożonych jednostajnie to kilka kubełków, czyli O(1) na zapytanie. Dla punktów
+#skupionych zapytanie daleko od skupisk przegląda wiele pustych kubełków i brzeg skupiska, który przecina koło
+
+import numpy as np
+
+
+class SiteGrid:
+    '''
+    siatka kubełków nad site, budowana raz w O(n log n). Site są posortowane po numerze kubełka (kolumna, potem
+    wiersz), kubełek c zawiera site order[starts[c]:starts[c + 1]]
+    '''
+
+    def __init__(self, sites, per_bucket=2):
+        '''
+        :param sites: tablica (n, 2) punktów
+        :param per_bucket: średnia liczba site w kubełku
+        '''
+        self.sites = np.asarray(sites, dtype=np.float64).reshape(-1, 2)
+        n = len(self.sites)
+        if n == 0:
+            raise ValueError('SiteGrid needs at least one site')
+
+        self.low = self.sites.min(axis=0)
+        extent = self.sites.max(axis=0) - self.low
+        #zdegenerowany wymiar (punkty współliniowe) dostaje jeden rząd kubełków
+        extent = np.where(extent > 0, extent, max(extent.max(), 1.0))
+        side = np.sqrt(extent[0] * extent[1] / max(1.0, n / per_bucket))
+        self.shape = np.clip(np.ceil(extent / side), 1, n).astype(np.int64)
+        self.size = extent / self.shape
+
+        column, row = self._columns_rows(self.sites)
+        cells = column * self.shape[1] + row
+        self.order = np.argsort(cells, kind='stable')
+        self.starts = np.searchsorted(cells[self.order], np.arange(self.shape[0] * self.shape[1] + 1))
+
+    def _columns_rows(self, points):
+        #indeksy kubełka (kolumna, wiersz), punkty spoza siatki trafiają do skrajnych kubełków
+        index = np.floor((points - self.low) / self.size)
+        return np.clip(index[:, 0], 0, self.shape[0] - 1).astype(np.int64), \
+            np.clip(index[:, 1], 0, self.shape[1] - 1).astype(np.int64)
+
+    def nearest(self, query_points, chunk=1 << 16):
+        '''
+        :param query_points: tablica (Q, 2) punktów
+        :param chunk: liczba zapytań liczonych naraz, ogranicza rozmiar tablic pomocniczych
+        :return: tablica (Q,) indeksów najbliższych site (przy remisie najmniejszy indeks, jak argmin)
+        '''
+        query_points = np.asarray(query_points, dtype=np.float64).reshape(-1, 2)
+        result = np.empty(len(query_points), dtype=np.int64)
+        for first in range(0, len(query_points), chunk):
+            result[first:first + chunk] = self._nearest(query_points[first:first + chunk])
+        return result
+
+    def _nearest(self, queries):
+        column, row = self._columns_rows(queries)
+
+        #najmniejszy niepusty kwadrat kubełków wokół kubełka zapytania, liczymy tylko liczbę site w kwadratach
+        ring = np.zeros(len(queries), dtype=np.int64)
+        active = np.arange(len(queries))
+        size = 0
+        while len(active):
+            owner, columns = self._columns(column[active] - size, column[active] + size)
+            starts, ends = self._ranges(columns, row[active][owner] - size, row[active][owner] + size)
+            active = active[np.bincount(owner, ends - starts, minlength=len(active)) == 0]
+            size += 1
+            ring[active] = size
+
+        #najbliższy site z tego kwadratu ogranicza odległość d do najbliższego, wystarczy przejrzeć kubełki
+        #przecinające koło o promieniu d wokół zapytania
+        owner, columns = self._columns(column - ring, column + ring)
+        distance, _ = self._scan(queries, owner, *self._ranges(columns, (row - ring)[owner], (row + ring)[owner]))
+        distance = np.sqrt(distance)
+        #zapas na zaokrąglenia, zbędny kubełek tylko wydłuża przeglądanie
+        distance += 1e-12 * (distance + np.abs(queries).max(axis=1))
+
+        low_column, _ = self._columns_rows(queries - distance[:, None])
+        high_column, _ = self._columns_rows(queries + distance[:, None])
+        owner, columns = self._columns(low_column, high_column)
+        left = self.low[0] + columns * self.size[0]
+        x = queries[owner, 0]
+        dx = np.maximum(np.maximum(left - x, x - left - self.size[0]), 0)
+        half = np.sqrt(np.maximum(distance[owner] ** 2 - dx ** 2, 0))
+        y = queries[owner, 1]
+        low_row = np.floor((y - half - self.low[1]) / self.size[1]).astype(np.int64)
+        high_row = np.floor((y + half - self.low[1]) / self.size[1]).astype(np.int64)
+        return self._scan(queries, owner, *self._ranges(columns, low_row, high_row))[1]
+
+    def _columns(self, low_column, high_column):
+        #pary (zapytanie, kolumna) dla przedziałów kolumn, po jednym na zapytanie
+        low_column = np.maximum(low_column, 0)
+        high_column = np.minimum(high_column, self.shape[0] - 1)
+        columns = high_column - low_column + 1
+        owner = np.repeat(np.arange(len(columns)), columns)
+        return owner, np.repeat(low_column - np.cumsum(columns) + columns, columns) + np.arange(columns.sum())
+
+    def _ranges(self, columns, low_row, high_row):
+        #kubełki jednej kolumny są kolejne w order, więc przedział wierszy kolumny to jeden przedział order
+        low_row = np.clip(low_row, 0, self.shape[1] - 1)
+        high_row = np.clip(high_row, 0, self.shape[1] - 1)
+        first = columns * self.shape[1]
+        return self.starts[first + low_row], self.starts[first + high_row + 1]
+
+    def _scan(self, queries, owner, starts, ends, batch=1 << 22):
+        '''
+        najbliższy site spośród przedziałów order[starts:ends] przypisanych zapytaniom owner
+        :return: kwadraty odległości i indeksy site (przy remisie najmniejszy indeks)
+        '''
+        q = len(queries)
+        best = np.full(q, np.inf)
+        found = np.full(q, len(self.sites), dtype=np.int64)
+        lengths = ends - starts
+
+        #pary (zapytanie, site) tworzymy porcjami po około batch par
+        total = np.cumsum(lengths)
+        bounds = np.searchsorted(total, np.arange(batch, total[-1] if len(total) else 0, batch))
+        for part in np.split(np.arange(len(owner)), bounds):
+            length = lengths[part]
+            count = length.sum()
+            if not count:
+                continue
+            pair_owner = np.repeat(owner[part], length)
+            position = np.repeat(starts[part] - np.cumsum(length) + length, length) + np.arange(count)
+            candidate = self.order[position]
+            difference = self.sites[candidate] - queries[pair_owner]
+            distance = np.einsum('ij,ij->i', difference, difference)
+
+            previous = best.copy()
+            np.minimum.at(best, pair_owner, distance)
+            found[best < previous] = len(self.sites)
+            closest = distance == best[pair_owner]
+            np.minimum.at(found, pair_owner[closest], candidate[closest])
+        return best, found
+
+
+def brute_force_nearest(sites, query_points, chunk=1024):
+    #punkt odniesienia: argmin odległości do wszystkich site, O(n) na zapytanie
+    sites = np.asarray(sites, dtype=np.float64).reshape(-1, 2)
+    query_points = np.asarray(query_points, dtype=np.float64).reshape(-1, 2)
+    result = np.empty(len(query_points), dtype=np.int64)
+    for first in range(0, len(query_points), chunk):
+        difference = query_points[first:first + chunk, None, :] - sites[None, :, :]
+        result[first:first + chunk] = np.argmin(np.einsum('ijk,ijk->ij', difference, difference), axis=1)
+    return result
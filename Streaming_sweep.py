@@ -0,0 +1,188 @@
+#zamiatanie strumieniowe: punkty przychodzą z iteratora już posortowane po y (malejąco, w kolejności miotły),
+#a krawędź diagramu oddajemy w chwili, gdy remove_arc ustali oba jej końce, i od razu o niej zapominamy.
+#Diagram nie trzyma żadnej listy półprostych ani wierzchołków: półprosta żyje, dopóki wskazuje na nią łuk linii
+#brzegowej albo jej bliźniak, a w kolejce zdarzeń czeka tylko jedno zdarzenie punktowe. Pamięć zależy więc od
+#rozmiaru linii brzegowej (i żywych zdarzeń okręgowych), a nie od liczby punktów
+
+import numpy as np
+from Event import Event, EventType
+from Event_queue import EventQueue
+from Fortune_algorithm import FortuneAlgorithm
+from Voronoi_diagram import Site
+
+
+class StreamHalfEdge:
+    __slots__ = ('origin', 'destination', 'incident_face', 'twin')
+
+    def __init__(self, incident_face):
+        self.origin = None
+        self.destination = None
+        #ściana to indeks punktu (jak w CompactVoronoiDiagram)
+        self.incident_face = incident_face
+        self.twin = None
+
+
+class StreamingDiagram:
+    '''
+    diagram dla StreamingFortune: zamiast przechowywać półproste, zbiera gotowe krawędzie w finished, skąd odbiera
+    je StreamingFortune.edges. Wierzchołek to sam punkt, cykle ścian nie są budowane (link nic nie robi), bo
+    wiązałyby ze sobą wszystkie półproste diagramu
+    '''
+
+    def __init__(self, points=()):
+        #punkty dochodzą w trakcie zamiatania, konstruktor dostaje pustą listę od FortuneAlgorithm
+        self.sites = list(points)
+        self.finished = []
+        self.edge_count = 0
+
+    def add_half_edge(self, face):
+        return StreamHalfEdge(face)
+
+    def add_vertex(self, point):
+        return point
+
+    def set_origin(self, half_edge, vertex):
+        half_edge.origin = vertex
+        self._check_finished(half_edge)
+
+    def set_destination(self, half_edge, vertex):
+        half_edge.destination = vertex
+        self._check_finished(half_edge)
+
+    def _check_finished(self, half_edge):
+        #krawędź jest gotowa, gdy obie jej półproste mają oba końce; zrywamy wtedy wzajemne odwołania bliźniaków
+        twin = half_edge.twin
+        if twin is None or half_edge.origin is None or half_edge.destination is None or \
+                twin.origin is None or twin.destination is None:
+            return
+        self.finished.append((half_edge.incident_face, twin.incident_face, half_edge.origin, half_edge.destination))
+        self.edge_count += 1
+        half_edge.twin = None
+        twin.twin = None
+
+    def set_twins(self, half_edge1, half_edge2):
+        half_edge1.twin = half_edge2
+        half_edge2.twin = half_edge1
+
+    def link(self, prev, next):
+        pass
+
+
+class StreamingFortune(FortuneAlgorithm):
+    '''
+    algorytm Fortune'a czytający punkty z iteratora. Zamiatanie zaczyna dopiero edges(), punkty są numerowane
+    w kolejności, w jakiej przychodzą
+    '''
+
+    def __init__(self, points, named_metric='euclidean_2d_scalar', metric=None, ascending=False):
+        '''
+        :param points: iterowalny zbiór punktów (x, y) posortowanych po y malejąco (np. wiersze pliku .npy)
+        :param ascending: punkty są posortowane po y rosnąco; zamiatamy wtedy odbicie y -> -y i odbijamy wynik
+        '''
+        super().__init__((), named_metric, metric, diagram_type=StreamingDiagram)
+        self.points = points
+        self.sign = -1.0 if ascending else 1.0
+        self.site_count = 0
+        self.max_beach_line_size = 0
+
+    def edges(self):
+        '''
+        :return: generator krawędzi (i, j, początek, koniec), gdzie i, j to numery punktów rozdzielanych przez
+        krawędź, a początek i koniec to krotki (x, y). Półproste nieskończone zostają na linii brzegowej,
+        po wyczerpaniu generatora zwraca je rays()
+        '''
+        sign = self.sign
+        events = self.events = EventQueue()
+        finished = self.diagram.finished
+        points = iter(self.points)
+        previous = float('inf')
+        waiting = False
+
+        while True:
+            if not waiting:
+                point = next(points, None)
+                if point is not None:
+                    site = Site(self.site_count, self.metric.prepare_point((point[0], sign * point[1])),
+                                self.site_count)
+                    if site.point[1] > previous:
+                        raise ValueError('points must be sorted by y', 'ascending' if sign < 0 else 'descending')
+                    previous = site.point[1]
+                    self.site_count += 1
+                    events.put(Event(site.point[1], EventType.site, site=site, point=site.point))
+                    waiting = True
+            if events.empty():
+                break
+
+            event = events.get()
+            if event.type == EventType.site:
+                waiting = False
+                self.handle_site_event(event, events)
+                #zwykle zdarzenie punktowe dokłada dwa łuki, ale add_arc_beside i add_arc_between tylko jeden,
+                #więc rozmiar bierzemy z linii brzegowej; zdarzenie okręgowe go nie zwiększa
+                self.max_beach_line_size = max(self.max_beach_line_size, self.beach_line.size)
+            else:
+                self.handle_circle_event(event, events)
+
+            if finished:
+                for i, j, origin, destination in finished:
+                    yield i, j, (origin[0], sign * origin[1]), (destination[0], sign * destination[1])
+                finished.clear()
+
+    def edge_arrays(self, batch=1 << 16):
+        '''
+        edges() zebrane w tablice po batch krawędzi, wygodne do zapisu na dysk
+        :return: generator par: tablica (B, 2) numerów punktów i tablica (B, 2, 2) odcinków
+        '''
+        sites = np.empty((batch, 2), dtype=np.int64)
+        segments = np.empty((batch, 2, 2), dtype=np.float64)
+        count = 0
+        for i, j, origin, destination in self.edges():
+            sites[count] = i, j
+            segments[count] = origin, destination
+            count += 1
+            if count == batch:
+                yield sites.copy(), segments.copy()
+                count = 0
+        if count:
+            yield sites[:count].copy(), segments[:count].copy()
+
+    def rays(self):
+        '''
+        krawędzie nieskończone, które zostały na linii brzegowej po zamiataniu (jak półproste przed bound)
+        :return: słownik: 'ray_sites' (R, 2) numery punktów, 'ray_origins' (R, 2) początki i 'ray_directions' (R, 2)
+        kierunki półprostych oraz 'lines' (L, 2) numery punktów rozdzielanych przez całe proste (bez wierzchołków)
+        '''
+        sign = self.sign
+        ray_sites, origins, directions, lines = [], [], [], []
+        left_arc = self.beach_line.get_leftmost_arc() if not self.beach_line.is_empty() else None
+        right_arc = left_arc.next if left_arc is not None else None
+        while right_arc is not None:
+            half_edge = left_arc.right_half_edge
+            left_point, right_point = left_arc.site.point, right_arc.site.point
+            #kierunek jak w bound, w stronę brakującego początku półprostej ściany left_arc
+            direction = (right_point[1] - left_point[1], left_point[0] - right_point[0])
+            pair = (left_arc.site.idx, right_arc.site.idx)
+            if half_edge.destination is not None:
+                ray_sites.append(pair)
+                origins.append((half_edge.destination[0], sign * half_edge.destination[1]))
+                directions.append((direction[0], sign * direction[1]))
+            else:
+                lines.append(pair)
+            left_arc, right_arc = right_arc, right_arc.next
+
+        #pionowe krawędzie pierwszego rzędu punktów biegną w górę; te bez dolnego końca są już wyżej w lines
+        for half_edge, (_, left_site, right_site) in self.vertical_rays.items():
+            if half_edge.origin is not None:
+                ray_sites.append((left_site.idx, right_site.idx))
+                origins.append((half_edge.origin[0], sign * half_edge.origin[1]))
+                directions.append((0.0, sign))
+
+        return {'ray_sites': np.array(ray_sites, dtype=np.int64).reshape(-1, 2),
+                'ray_origins': np.array(origins, dtype=np.float64).reshape(-1, 2),
+                'ray_directions': np.array(directions, dtype=np.float64).reshape(-1, 2),
+                'lines': np.array(lines, dtype=np.int64).reshape(-1, 2)}
+
+
+def stream_edges(points, named_metric='euclidean_2d_scalar', ascending=False):
+    #skrót: krawędzie diagramu dla punktów posortowanych po y, bez półprostych
+    return StreamingFortune(points, named_metric, ascending=ascending).edges()
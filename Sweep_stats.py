@@ -0,0 +1,123 @@
+import time
+from Beach_line import BeachLine
+from Event_queue import EventQueue
+
+
+class SweepStats:
+    '''
+    statystyki jednego zamiatania, zbierane tylko wtedy, gdy construct dostanie stats=True.
+    Wtedy FortuneAlgorithm podmienia linię brzegową na CountingBeachLine i obsługuje zdarzenia w osobnej pętli
+    z pomiarem czasu, więc zwykłe zamiatanie nie płaci za liczniki nic.
+    Czasy (s): queue - zdejmowanie, dodawanie i unieważnianie zdarzeń, tree_search - get_arc_above,
+    event_handling - reszta obsługi zdarzeń, bound - domykanie półprostych na obramowaniu
+    '''
+
+    def __init__(self):
+        self.site_events = 0
+        self.circle_events_queued = 0
+        self.circle_events_fired = 0
+        self.circle_events_invalidated = 0
+        self.left_rotations = 0
+        self.right_rotations = 0
+        self.arc_searches = 0
+        self.breakpoint_calls = 0
+        self.beach_line_size = 0
+        self.max_beach_line_size = 0
+        self.max_tree_depth = 0
+        self.times = {'queue': 0.0, 'tree_search': 0.0, 'event_handling': 0.0, 'bound': 0.0}
+
+    def breakpoints_per_search(self):
+        return self.breakpoint_calls / self.arc_searches if self.arc_searches else 0.0
+
+    def as_dict(self):
+        result = {name: value for name, value in vars(self).items() if name != 'times'}
+        result['breakpoints_per_search'] = self.breakpoints_per_search()
+        result['times'] = dict(self.times)
+        return result
+
+    def __repr__(self):
+        return 'SweepStats(%s)' % ', '.join('%s=%r' % item for item in self.as_dict().items())
+
+
+class CountingBeachLine(BeachLine):
+    '''
+    linia brzegowa licząca obroty, wywołania compute_breakpoint na jedno get_arc_above, swój rozmiar
+    i głębokość drzewa. Głębokość mierzymy dla każdego wstawionego łuku po naprawie drzewa, czyli w O(log n),
+    zamiast przechodzić całe drzewo po każdym zdarzeniu
+    '''
+
+    def __init__(self, compute_breakpoint, stats):
+        super().__init__(self.counted_breakpoint)
+        self.breakpoint = compute_breakpoint
+        self.stats = stats
+
+    def counted_breakpoint(self, point1, point2, l):
+        self.stats.breakpoint_calls += 1
+        return self.breakpoint(point1, point2, l)
+
+    def get_arc_above(self, point, l):
+        self.stats.arc_searches += 1
+        start = time.perf_counter()
+        arc = super().get_arc_above(point, l)
+        self.stats.times['tree_search'] += time.perf_counter() - start
+        return arc
+
+    def left_rotate(self, node):
+        self.stats.left_rotations += 1
+        super().left_rotate(node)
+
+    def right_rotate(self, node):
+        self.stats.right_rotations += 1
+        super().right_rotate(node)
+
+    def set_root(self, arc):
+        super().set_root(arc)
+        self.grown(arc)
+
+    def insert_before(self, x, y):
+        super().insert_before(x, y)
+        self.grown(y)
+
+    def insert_after(self, x, y):
+        super().insert_after(x, y)
+        self.grown(y)
+
+    def delete(self, node):
+        super().delete(node)
+        self.stats.beach_line_size -= 1
+
+    def grown(self, arc):
+        stats = self.stats
+        stats.beach_line_size += 1
+        stats.max_beach_line_size = max(stats.max_beach_line_size, stats.beach_line_size)
+
+        depth = 0
+        while arc is not None:
+            depth += 1
+            arc = arc.parent
+        stats.max_tree_depth = max(stats.max_tree_depth, depth)
+
+
+class CountingEventQueue(EventQueue):
+    #kolejka zdarzeń mierząca czas swoich operacji i przepisująca liczniki zdarzeń okręgowych do statystyk
+    def __init__(self, events, stats):
+        super().__init__(events)
+        self.stats = stats
+
+    def put(self, event):
+        start = time.perf_counter()
+        super().put(event)
+        self.stats.times['queue'] += time.perf_counter() - start
+        self.stats.circle_events_queued = self.circle_events
+
+    def invalidate(self, event):
+        start = time.perf_counter()
+        super().invalidate(event)
+        self.stats.times['queue'] += time.perf_counter() - start
+        self.stats.circle_events_invalidated = self.invalidated
+
+    def get(self):
+        start = time.perf_counter()
+        event = super().get()
+        self.stats.times['queue'] += time.perf_counter() - start
+        return event
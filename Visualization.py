@@ -1,15 +1,21 @@
 # Narzędzie jest oparte o kilka zewnętrznych bibliotek, które potrzebujemy najpierw zaimportować.
 
+import bisect
 import json as js
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.collections as mcoll
+import matplotlib.path as mpath
+import matplotlib.transforms as mtransforms
 from matplotlib.widgets import Button
 
 # Parametr określający jak blisko (w odsetku całego widocznego zakresu) punktu początkowego
 # wielokąta musimy kliknąć, aby go zamknąć.
 TOLERANCE = 0.15
 
+# Liczba ostatnio oglądanych scen, dla których pamiętamy tło do blittingu.
+BACKGROUNDS = 16
+
 
 def dist(point1, point2):
     return np.sqrt(np.power(point1[0] - point2[0], 2) + np.power(point1[1] - point2[1], 2))
@@ -18,9 +24,13 @@ def dist(point1, point2):
 # Klasa ta trzyma obecny stan wykresu oraz posiada metody, które mają zostać wykonane
 # po naciśnięciu przycisków.
 class _Button_callback(object):
-    def __init__(self, scenes):
+    def __init__(self, scenes, animated=None):
         self.i = 0
         self.scenes = scenes
+        # miejsca kolekcji rysowane blittingiem (zob. draw): podane przez użytkownika albo wykrywane w set_axes
+        # (miejsce -> lista kwargs, z którymi kolekcja w tym miejscu jest podmieniana)
+        self.fixed_animated = animated is not None
+        self.animated = set(animated) if animated is not None else {}
         self.adding_points = False
         self.added_points = []
         self.adding_lines = False
@@ -30,6 +40,17 @@ class _Button_callback(object):
 
     def set_axes(self, ax):
         self.ax = ax
+        # artysty kolekcji i ich dane (zob. draw), tło do blittingu
+        self.artists = {}
+        self.increments = {}
+        self.background = None
+        self.backgrounds = {}
+        self.blit = ax.figure.canvas.supports_blit
+        ax.set_autoscale_on(False)
+        ax.figure.canvas.mpl_connect('draw_event', self.on_draw)
+        if self.blit and not self.fixed_animated:
+            # wybór zależy tylko od ciągu scen, nie od drogi do sceny, więc każda scena wygląda tak samo
+            self.animated = _replaced_slots(self.scenes)
 
     # Metoda ta obsługuje logikę przejścia do następnej sceny.
     def next(self, event):
@@ -41,6 +62,17 @@ class _Button_callback(object):
         self.i = (self.i - 1) % len(self.scenes)
         self.draw(autoscaling=True)
 
+    # Metoda ta pozwala przeskoczyć od razu do sceny o numerze i.
+    def jump(self, i):
+        if i >= len(self.scenes):
+            # długość strumienia scen (SceneStream) znamy dopiero po pobraniu scen, więc najpierw pobieramy scenę i
+            try:
+                self.scenes[i]
+            except IndexError:
+                pass
+        self.i = i % len(self.scenes)
+        self.draw(autoscaling=True)
+
     # Metoda ta aktywuje funkcję rysowania punktów wyłączając równocześnie rysowanie
     # odcinków i wielokątów.
     def add_point(self, event):
@@ -112,27 +144,184 @@ class _Button_callback(object):
                     self.rect_points.append(new_point)
                 self.draw(autoscaling=False)
 
-    # Metoda odpowiedzialna za narysowanie całego wykresu. Warto zauważyć,
-    # że zaczyna się ona od wyczyszczenia jego wcześniejszego stanu. Istnieje w
-    # niej nietrywialna logika zarządzania zakresem wykresu, tak żeby, w zależności
-    # od ustawionego parametru autoscaling, uniknąć sytuacji, kiedy dodawanie
-    # nowych punktów przy brzegu obecnie widzianego zakresu powoduje niekorzystne
-    # przeskalowanie.
+    # Metoda odpowiedzialna za narysowanie całego wykresu. Artysty (scatter dla
+    # PointsCollection, LineCollection dla LinesCollection) tworzymy raz dla
+    # każdego miejsca kolekcji w scenie i przy zmianie sceny tylko podmieniamy
+    # ich dane (set_offsets, set_segments). Kolekcje animowane (np. miotła i linia
+    # brzegowa) nie należą do tła. Które to są, decyduje Plot: miejsca kolekcji
+    # podane w Plot(animated=...) jako pary ('points', j) i ('lines', j), a
+    # domyślnie te miejsca sceny, których niepusta kolekcja jest w którejś
+    # scenie podmieniana w całości, a nie tylko uzupełniana, razem z kwargs tej
+    # kolekcji (zob. _replaced_slots). Wybór jest ustalany przed pierwszym
+    # rysowaniem, więc scena wygląda tak samo niezależnie od tego, czy doszliśmy
+    # do niej krok po kroku, czy przez jump. Tło kopiujemy po każdym pełnym
+    # rysowaniu, a przy zmianie sceny odtwarzamy je, dorysowujemy na nim tylko
+    # elementy dopisane do zwykłych kolekcji (np. nowe krawędzie diagramu),
+    # rysujemy kolekcje animowane i przenosimy wynik na ekran (blitting). Tła
+    # ostatnich BACKGROUNDS scen pamiętamy, więc cofnięcie się o kilka scen też
+    # nie wymaga pełnego rysowania. Pełne rysowanie jest potrzebne, gdy zmienia
+    # się zakres wykresu, elementy dodane myszką albo zwykła kolekcja zmienia się
+    # inaczej niż przez dopisanie elementów. Przy autoscaling zakres liczymy sami
+    # z danych zwykłych kolekcji (kolekcje animowane są chwilowe i przesuwałyby
+    # zakres w każdej scenie), a gdy scena ma tylko kolekcje animowane, z nich,
+    # żeby zakres zależał tylko od sceny. Bez autoscaling zostawiamy obecny, żeby
+    # dodawanie punktów przy brzegu nie przeskalowywało wykresu.
     def draw(self, autoscaling=True):
-        if not autoscaling:
-            xlim = self.ax.get_xlim()
-            ylim = self.ax.get_ylim()
-        self.ax.clear()
-        for collection in (self.scenes[self.i].points + self.added_points):
-            if len(collection.points) > 0:
-                self.ax.scatter(*zip(*(np.array(collection.points))), **collection.kwargs)
-        for collection in (self.scenes[self.i].lines + self.added_lines + self.added_rects):
-            self.ax.add_collection(collection.get_collection())
-        self.ax.autoscale(autoscaling)
-        if not autoscaling:
-            self.ax.set_xlim(xlim)
-            self.ax.set_ylim(ylim)
-        plt.draw()
+        scene = self.scenes[self.i]
+        current = [(('scene', 'points', j), col.points, col.kwargs) for j, col in enumerate(scene.points)] + \
+                  [(('added', 'points', j), col.points, col.kwargs) for j, col in enumerate(self.added_points)] + \
+                  [(('scene', 'lines', j), col.lines, col.kwargs) for j, col in enumerate(scene.lines)] + \
+                  [(('added', 'lines', j), col.lines, col.kwargs)
+                   for j, col in enumerate(self.added_lines + self.added_rects)]
+
+        # redraw: tło trzeba narysować od nowa, valid: zapamiętane tła innych scen są nadal aktualne
+        redraw = self.background is None
+        valid = True
+        increments = []
+        for key in set(self.artists) - {key for key, _, _ in current}:
+            artist, _, _ = self.artists.pop(key)
+            valid = valid and artist.get_animated()
+            artist.remove()
+        for key, data, kwargs in current:
+            data = np.asarray(data, dtype=float).reshape((-1, 2) if key[1] == 'points' else (-1, 2, 2))
+            old = self.artists.get(key)
+            if old is None or old[1] != kwargs:
+                if old is not None:
+                    old[0].remove()
+                artist = self.__create_artist(key[1], data, kwargs, self.__animated(key, kwargs))
+                change = 'new'
+            else:
+                artist = old[0]
+                change = self.__update_artist(artist, key[1], old[2], data, kwargs)
+            if change != 'same' and not artist.get_animated():
+                if change == 'append':
+                    increments.append((key, data[len(old[2]):], kwargs))
+                else:
+                    redraw = True
+                valid = valid and key[0] == 'scene' and change != 'new'
+            self.artists[key] = (artist, kwargs, data)
+
+        limits = (self.ax.get_xlim(), self.ax.get_ylim())
+        if autoscaling:
+            static = [data for artist, _, data in self.artists.values() if not artist.get_animated() and data.size]
+            self.__autoscale(static or [data for _, _, data in self.artists.values()])
+        valid = valid and limits == (self.ax.get_xlim(), self.ax.get_ylim())
+        if not valid:
+            self.backgrounds.clear()
+
+        canvas = self.ax.figure.canvas
+        if self.blit and self.i in self.backgrounds:
+            self.background = self.backgrounds[self.i]
+            canvas.restore_region(self.background)
+        elif redraw or not valid or not self.blit:
+            self.background = None
+            canvas.draw_idle()
+            return
+        elif not self.__on_top([self.artists[key][0] for key, _, _ in increments]):
+            # dopisane elementy przykryłyby późniejsze zwykłe kolekcje
+            self.background = None
+            canvas.draw_idle()
+            return
+        else:
+            canvas.restore_region(self.background)
+            for key, data, kwargs in increments:
+                self.ax.draw_artist(self.__increment_artist(key, data, kwargs))
+            self.__remember_background()
+        self.__draw_animated()
+        canvas.blit(self.ax.figure.bbox)
+
+    # Po każdym pełnym rysowaniu (także po zmianie rozmiaru okna) zapamiętujemy
+    # tło bez kolekcji animowanych i dorysowujemy je.
+    def on_draw(self, event):
+        if not self.blit:
+            return
+        self.backgrounds.clear()
+        self.__remember_background()
+        self.__draw_animated()
+
+    # Sprawdza, czy artysty są rysowane po wszystkich pozostałych zwykłych
+    # artystach (kolejność jak w Axes.draw: zorder, potem kolejność dodania).
+    def __on_top(self, artists):
+        static = {id(artist) for artist, _, _ in self.artists.values() if not artist.get_animated()}
+        order = sorted((artist for artist in self.ax.get_children() if id(artist) in static),
+                       key=lambda artist: artist.get_zorder())
+        return {id(artist) for artist in order[len(order) - len(artists):]} == {id(artist) for artist in artists}
+
+    def __remember_background(self):
+        self.background = self.ax.figure.canvas.copy_from_bbox(self.ax.figure.bbox)
+        self.backgrounds.pop(self.i, None)
+        self.backgrounds[self.i] = self.background
+        if len(self.backgrounds) > BACKGROUNDS:
+            del self.backgrounds[next(iter(self.backgrounds))]
+
+    # Aktualizuje dane artysty i zwraca rodzaj zmiany jak _delta ('same',
+    # 'append', 'full') albo 'truncate', gdy nowe dane są początkiem starych
+    # (cofnięcie się do wcześniejszej sceny).
+    def __update_artist(self, artist, kind, old, data, kwargs):
+        change = _delta(old, data, kwargs)[0]
+        if change == 'full' and 0 < len(data) < len(old) and np.array_equal(old[:len(data)], data):
+            change = 'truncate'
+        if kind == 'lines' and change in ('append', 'truncate'):
+            # set_segments tworzy Path dla każdego odcinka, więc zmieniamy tylko koniec listy ścieżek
+            paths = artist.get_paths()
+            if change == 'append':
+                paths.extend(mpath.Path(segment) for segment in data[len(old):])
+            else:
+                del paths[len(data):]
+            artist.stale = True
+        elif change != 'same':
+            self.__set_data(artist, kind, data)
+        return change
+
+    def __animated(self, key, kwargs):
+        if key[0] != 'scene':
+            return False
+        if self.fixed_animated:
+            return key[1:] in self.animated
+        return kwargs in self.animated.get(key[1:], ())
+
+    def __draw_animated(self):
+        for artist, _, _ in self.artists.values():
+            if artist.get_animated():
+                self.ax.draw_artist(artist)
+
+    def __create_artist(self, kind, data, kwargs, animated=False):
+        # bez blittingu kolekcje animowane nie byłyby wcale rysowane
+        kwargs = dict(kwargs, animated=animated and self.blit)
+        if kind == 'points':
+            return self.ax.scatter(data[:, 0], data[:, 1], **kwargs)
+        return self.ax.add_collection(mcoll.LineCollection(data, **kwargs), autolim=False)
+
+    @staticmethod
+    def __set_data(artist, kind, data):
+        if kind == 'points':
+            artist.set_offsets(data)
+        else:
+            artist.set_segments(data)
+
+    # Artysta z samymi dopisanymi elementami kolekcji key, rysowany tylko
+    # bezpośrednio na tle (animated=True wyłącza go z pełnego rysowania).
+    def __increment_artist(self, key, data, kwargs):
+        artist = self.increments.get(key)
+        if artist is None or artist[1] != kwargs:
+            if artist is not None:
+                artist[0].remove()
+            artist = (self.__create_artist(key[1], data, kwargs, animated=True), kwargs)
+            self.increments[key] = artist
+        self.__set_data(artist[0], key[1], data)
+        return artist[0]
+
+    def __autoscale(self, arrays):
+        arrays = [data.reshape(-1, 2) for data in arrays if data.size]
+        if not arrays:
+            return
+        low = np.min([data.min(axis=0) for data in arrays], axis=0)
+        high = np.max([data.max(axis=0) for data in arrays], axis=0)
+        margins = self.ax.margins()
+        for axis, set_limits in enumerate((self.ax.set_xlim, self.ax.set_ylim)):
+            first, last = mtransforms.nonsingular(low[axis], high[axis], expander=0.05)
+            margin = (last - first) * margins[axis]
+            set_limits(first - margin, last + margin)
 
 
 # Klasa Scene odpowiada za przechowywanie elementów, które mają być
@@ -144,6 +333,386 @@ class Scene:
         self.lines = lines
 
 
+# Klasa SceneStream pozwala oglądać sceny produkowane na bieżąco przez generator
+# (np. FortuneAlgorithm.construct_scenes) bez trzymania ich wszystkich w pamięci.
+# Sceny są pobierane z generatora dopiero wtedy, gdy są potrzebne, a w pamięci
+# zostaje tylko okno history ostatnio pobranych scen. Jeśli zamiast generatora
+# podamy funkcję, która go tworzy, to cofnięcie się poza okno uruchamia
+# generator od nowa i przewija go do żądanej sceny. Długość jest znana dopiero
+# po wyczerpaniu generatora; wcześniej len() zwraca liczbę pobranych scen plus
+# jeden, bo zawsze pobieramy jedną scenę do przodu.
+class SceneStream:
+    def __init__(self, scenes, history=3):
+        self.factory = scenes if callable(scenes) else None
+        self.history = max(history, 2)
+        self.restart(scenes)
+
+    def restart(self, scenes=None):
+        self.iterator = iter(self.factory() if scenes is None or callable(scenes) else scenes)
+        self.cache = {}
+        self.produced = 0
+        self.exhausted = False
+
+    def __pull(self):
+        try:
+            scene = next(self.iterator)
+        except StopIteration:
+            self.exhausted = True
+            return
+        self.cache[self.produced] = scene
+        self.produced += 1
+        for old in [idx for idx in self.cache if idx < self.produced - self.history]:
+            del self.cache[old]
+
+    def __len__(self):
+        return self.produced if self.exhausted else self.produced + 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if i not in self.cache and i < self.produced - self.history:
+            if self.factory is None:
+                raise IndexError('scena %d nie jest już przechowywana, podaj funkcję tworzącą generator' % i)
+            self.restart()
+        # pobieramy jedną scenę do przodu, żeby wiedzieć, czy i jest ostatnią sceną
+        while not self.exhausted and self.produced <= i + 1:
+            self.__pull()
+        if i not in self.cache:
+            raise IndexError(i)
+        return self.cache[i]
+
+    def __iter__(self):
+        i = 0
+        while i < len(self):
+            yield self[i]
+            i += 1
+
+
+# Klasa SceneStore przechowuje ciąg scen jako klatki kluczowe i różnice między
+# kolejnymi scenami. Co keyframe_interval scen (albo gdy zmienia się liczba
+# kolekcji) zapamiętujemy całą scenę, a pomiędzy nimi dla każdej kolekcji tylko
+# to, co się zmieniło: nic (kolekcja taka sama), dopisane na końcu elementy
+# (np. nowe krawędzie diagramu) albo całą kolekcję (np. linię brzegową i miotłę).
+# Scena k jest odtwarzana od najbliższej wcześniejszej klatki kluczowej, a
+# ostatnio odtworzona scena jest pamiętana, więc przejście do następnej kosztuje
+# tylko jedną różnicę. Z zewnątrz SceneStore zachowuje się jak lista scen, ale
+# scena zwrócona przez store[i] jest składana od nowa przy każdym odwołaniu, więc
+# jej zmiany w miejscu (np. store[i].points.append(...)) nie są zapamiętywane.
+# Zmienioną scenę trzeba przypisać z powrotem: store[i] = scene, co zapisuje od
+# nowa różnice sceny i oraz następnej.
+class SceneStore:
+    def __init__(self, scenes=(), keyframe_interval=32):
+        self.keyframe_interval = keyframe_interval
+        self.steps = []
+        self.keyframes = []
+        self.previous = None
+        self.cached = None
+        # miejsce kolekcji -> lista kwargs, z którymi niepusta kolekcja w tym miejscu była podmieniana w całości
+        self.replaced_kwargs = {}
+        self.extend(scenes)
+
+    @staticmethod
+    def __arrays(scene):
+        return ([(np.array(col.points, dtype=float), col.kwargs) for col in scene.points],
+                [(np.array(col.lines, dtype=float), col.kwargs) for col in scene.lines])
+
+    def __encode(self, i, previous, current):
+        # krok sceny i: cała scena (klatka kluczowa) albo różnice względem sceny poprzedniej
+        deltas = None
+        if previous is not None:
+            deltas = tuple([_delta(old, data, kwargs) for (old, _), (data, kwargs) in zip(old_cols, cols)]
+                           for old_cols, cols in zip(previous, current))
+            for kind, old_cols, cols, records in zip(('points', 'lines'), previous, current, deltas):
+                for j, ((old, old_kwargs), (_, kwargs), record) in enumerate(zip(old_cols, cols, records)):
+                    if record[0] == 'full' and len(old) and old_kwargs == kwargs:
+                        _add_replaced(self.replaced_kwargs, (kind, j), kwargs)
+        if deltas is None or i % self.keyframe_interval == 0 or \
+                [len(cols) for cols in current] != [len(cols) for cols in previous]:
+            return True, tuple([('full', data, kwargs) for data, kwargs in cols] for cols in current)
+        return False, deltas
+
+    def __set_step(self, i, previous, current):
+        keyframe, step = self.__encode(i, previous, current)
+        position = bisect.bisect_left(self.keyframes, i)
+        is_keyframe = position < len(self.keyframes) and self.keyframes[position] == i
+        if keyframe and not is_keyframe:
+            self.keyframes.insert(position, i)
+        elif not keyframe and is_keyframe:
+            del self.keyframes[position]
+        self.steps[i] = step
+
+    def append(self, scene):
+        current = self.__arrays(scene)
+        self.steps.append(None)
+        self.__set_step(len(self.steps) - 1, self.previous, current)
+        self.previous = current
+
+    def __setitem__(self, i, scene):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        previous = self.__arrays(self[i - 1]) if i > 0 else None
+        following = self.__arrays(self[i + 1]) if i + 1 < len(self) else None
+        current = self.__arrays(scene)
+        self.cached = None
+        self.__set_step(i, previous, current)
+        if following is not None:
+            self.__set_step(i + 1, current, following)
+        else:
+            self.previous = current
+
+    def extend(self, scenes):
+        for scene in scenes:
+            self.append(scene)
+
+    def replaced(self):
+        # zob. _replaced_slots; po store[i] = scene lista może zawierać też kolekcje już niepodmieniane
+        return {slot: list(kwargs) for slot, kwargs in self.replaced_kwargs.items()}
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        if self.cached is not None and self.cached[0] <= i and bisect.bisect_right(self.keyframes, i) - 1 == \
+                bisect.bisect_right(self.keyframes, self.cached[0]) - 1:
+            start, state = self.cached
+            start += 1
+        else:
+            start = self.keyframes[bisect.bisect_right(self.keyframes, i) - 1]
+            state = None
+        for step in self.steps[start:i + 1]:
+            state = _apply_delta(state, step)
+        self.cached = (i, state)
+        return Scene([PointsCollection(_join(parts), **kwargs) for parts, kwargs in state[0]],
+                     [LinesCollection(_join(parts), **kwargs) for parts, kwargs in state[1]])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def _delta(old, new, kwargs):
+    # zapis jednej kolekcji względem tej samej kolekcji w poprzedniej scenie
+    if new.shape == old.shape and (new is old or np.array_equal(new, old)):
+        return 'same', None, kwargs
+    if len(new) > len(old) > 0 and new.shape[1:] == old.shape[1:] and np.array_equal(new[:len(old)], old):
+        return 'append', new[len(old):].copy(), kwargs
+    return 'full', new, kwargs
+
+
+def _apply_delta(state, step):
+    # stan to dla każdej kolekcji lista kawałków (klatka kluczowa i dopisane końcówki) oraz jej kwargs
+    new_state = []
+    for i, records in enumerate(step):
+        cols = []
+        for j, (kind, data, kwargs) in enumerate(records):
+            if kind == 'full':
+                cols.append(([data], kwargs))
+            elif kind == 'same':
+                cols.append((state[i][j][0], kwargs))
+            else:
+                cols.append((state[i][j][0] + [data], kwargs))
+        new_state.append(cols)
+    return new_state
+
+
+def _add_replaced(found, slot, kwargs):
+    if kwargs not in found.setdefault(slot, []):
+        found[slot].append(kwargs)
+
+
+def _replaced_slots(scenes):
+    # miejsca scen ('points', j) / ('lines', j) z listami kwargs, z którymi niepusta kolekcja w tym miejscu jest
+    # w którejś scenie podmieniana w całości (a nie tylko uzupełniana). SceneStore i SceneFile znają je z zapisu
+    # różnic; strumienia scen nie da się przejrzeć z góry, więc dla niego patrzymy tylko na dwie pierwsze sceny
+    if hasattr(scenes, 'replaced'):
+        return scenes.replaced()
+    try:
+        # len() strumienia przed pobraniem scen nie mówi jeszcze, czy jest druga scena
+        first, second = scenes[0], scenes[1]
+    except IndexError:
+        return {}
+    return SceneStore([first, second]).replaced()
+
+
+def _join(parts):
+    return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+
+# Format pliku scen (SceneFileWriter zapisuje, SceneFile czyta) jest kolumnowy:
+# współrzędne wszystkich kolekcji wszystkich scen leżą w jednej tablicy float64
+# (punkt to 2 liczby, odcinek 4), a scena to tylko przesunięcia w tej tablicy.
+# Plik zaczyna się od SCENE_FILE_MAGIC, dalej są współrzędne dopisywane w miarę
+# powstawania scen, a przy zamknięciu dopisujemy indeks (tablice .npy) i stopkę
+# z położeniem indeksu. Indeks to: scenes (S + 1,) początki scen w tablicy
+# kolekcji, collections (C, 4) rodzaj (0 punkty, 1 odcinki), numer stylu
+# (kwargs zapisane jako JSON), pierwszy kawałek i liczba kawałków, parts (P, 2)
+# przesunięcie (w liczbach float64) i liczba elementów kawałka. Jak w
+# SceneStore, kolekcja niezmieniona względem poprzedniej sceny wskazuje na te
+# same kawałki, a kolekcja z dopisanymi elementami na te same kawałki i jeden
+# nowy. Przy odczycie współrzędne są mapowane do pamięci, a scena jest składana
+# dopiero wtedy, gdy jest potrzebna.
+SCENE_FILE_MAGIC = b'VSCENES\x01'
+SCENE_FILE_END = b'VSCENEND'
+
+
+class SceneFileWriter:
+    def __init__(self, path, max_parts=64):
+        # max_parts ogranicza liczbę kawałków kolekcji, dłuższą zapisujemy od nowa
+        self.path = path
+        self.max_parts = max_parts
+        self.file = open(path, 'wb')
+        self.file.write(SCENE_FILE_MAGIC)
+        self.offset = 0
+        self.scenes = [0]
+        self.collections = []
+        self.parts = []
+        self.styles = {}
+        self.previous = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __write(self, data):
+        data = np.ascontiguousarray(data, dtype='<f8')
+        self.file.write(data.tobytes())
+        self.parts.append((self.offset, len(data)))
+        self.offset += data.size
+        return len(self.parts) - 1
+
+    def append(self, scene):
+        current = [(0, np.array(col.points, dtype=float).reshape(-1, 2), col.kwargs) for col in scene.points] + \
+                  [(1, np.array(col.lines, dtype=float).reshape(-1, 2, 2), col.kwargs) for col in scene.lines]
+        records = []
+        for j, (kind, data, kwargs) in enumerate(current):
+            style = self.styles.setdefault(js.dumps(kwargs, sort_keys=True), len(self.styles))
+            old = self.previous[j] if self.previous is not None and j < len(self.previous) else None
+            delta = 'full' if old is None or old[0] != kind else _delta(old[1], data, kwargs)[0]
+            if delta == 'same':
+                first, count = old[3]
+            elif delta == 'append' and old[3][1] < self.max_parts and old[3][0] + old[3][1] == len(self.parts):
+                # kawałki kolekcji muszą być kolejne w parts, więc dopisujemy tylko do ostatnio zapisanych
+                first, count = old[3][0], old[3][1] + 1
+                self.__write(data[len(old[1]):])
+            elif delta == 'append' and old[3][1] < self.max_parts:
+                first, count = len(self.parts), old[3][1] + 1
+                self.parts.extend(self.parts[old[3][0]:old[3][0] + old[3][1]])
+                self.__write(data[len(old[1]):])
+            else:
+                first, count = self.__write(data), 1
+            self.collections.append((kind, style, first, count))
+            records.append((kind, data, kwargs, (first, count)))
+        self.scenes.append(len(self.collections))
+        self.previous = records
+
+    def extend(self, scenes):
+        for scene in scenes:
+            self.append(scene)
+
+    def close(self):
+        if self.file.closed:
+            return
+        index = self.file.tell()
+        styles = [js.loads(style) for style in sorted(self.styles, key=self.styles.get)]
+        for array in (np.array(self.scenes, dtype=np.int64),
+                      np.array(self.collections, dtype=np.int64).reshape(-1, 4),
+                      np.array(self.parts, dtype=np.int64).reshape(-1, 2),
+                      np.frombuffer(js.dumps(styles).encode(), dtype=np.uint8)):
+            np.lib.format.write_array(self.file, array)
+        self.file.write(np.int64(index).tobytes() + SCENE_FILE_END)
+        self.file.close()
+
+
+# Klasa SceneFile otwiera plik zapisany przez SceneFileWriter i z zewnątrz
+# zachowuje się jak lista scen. Czytamy tylko indeks, współrzędne zostają w
+# pliku (np.memmap), a scena powstaje przy odwołaniu do niej.
+class SceneFile:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            if file.read(len(SCENE_FILE_MAGIC)) != SCENE_FILE_MAGIC:
+                raise ValueError('nieznany format pliku scen', path)
+            file.seek(-8 - len(SCENE_FILE_END), 2)
+            footer = file.read()
+            if footer[8:] != SCENE_FILE_END:
+                raise ValueError('plik scen nie został zamknięty (brak indeksu)', path)
+            index = int(np.frombuffer(footer[:8], dtype='<i8')[0])
+            file.seek(index)
+            self.scenes, self.collections, self.parts, styles = \
+                (np.lib.format.read_array(file) for _ in range(4))
+        self.styles = js.loads(styles.tobytes().decode())
+        length = (index - len(SCENE_FILE_MAGIC)) // 8
+        self.coordinates = np.memmap(path, dtype='<f8', mode='r', offset=len(SCENE_FILE_MAGIC),
+                                     shape=(length,)) if length else np.empty(0)
+
+    def __len__(self):
+        return len(self.scenes) - 1
+
+    def collection(self, c):
+        # dane kolekcji c (widok na plik, gdy ma jeden kawałek) i jej kwargs
+        kind, style, first, count = self.collections[c]
+        shape = (-1, 2) if kind == 0 else (-1, 2, 2)
+        size = 2 if kind == 0 else 4
+        parts = [self.coordinates[offset:offset + size * length].reshape(shape)
+                 for offset, length in self.parts[first:first + count]]
+        return _join(parts) if parts else np.empty((0,) + shape[1:]), self.styles[style]
+
+    def __slots(self, i):
+        #miejsce ('points', j) / ('lines', j) -> numer kolekcji sceny i
+        slots = {}
+        for c in range(self.scenes[i], self.scenes[i + 1]):
+            kind = 'points' if self.collections[c, 0] == 0 else 'lines'
+            slots[(kind, sum(slot[0] == kind for slot in slots))] = c
+        return slots
+
+    def replaced(self):
+        # jak SceneStore.replaced, z indeksu: dopisanie do kolekcji to te same kawałki i jeden nowy, współrzędne
+        # czytamy tylko dla pozostałych zmian (podmiana albo kolekcja przepisana po max_parts kawałkach)
+        found = {}
+        for i in range(1, len(self)):
+            previous = self.__slots(i - 1)
+            for slot, c in self.__slots(i).items():
+                if slot not in previous:
+                    continue
+                _, style, first, count = self.collections[c]
+                _, old_style, old_first, old_count = self.collections[previous[slot]]
+                old_parts = self.parts[old_first:old_first + old_count]
+                if style != old_style or (first, count) == (old_first, old_count) or not old_parts[:, 1].sum():
+                    continue
+                if count == old_count + 1 and np.array_equal(self.parts[first:first + old_count], old_parts):
+                    continue
+                old, kwargs = self.collection(previous[slot])
+                if _delta(old, self.collection(c)[0], kwargs)[0] == 'full':
+                    _add_replaced(found, slot, kwargs)
+        return found
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        points, lines = [], []
+        for c in range(self.scenes[i], self.scenes[i + 1]):
+            data, kwargs = self.collection(c)
+            if self.collections[c, 0] == 0:
+                points.append(PointsCollection(data, **kwargs))
+            else:
+                lines.append(LinesCollection(data, **kwargs))
+        return Scene(points, lines)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
 # Klasa PointsCollection gromadzi w sobie punkty jednego typu, a więc takie,
 # które zostaną narysowane w takim samym kolorze i stylu. W konstruktorze
 # przyjmuje listę punktów rozumianych jako pary współrzędnych (x, y). Parametr
@@ -180,16 +749,25 @@ class LinesCollection:
 # referencje na przyciski, dzięki czemu nie będą one skasowane podczas tzw.
 # garbage collectingu.
 class Plot:
-    def __init__(self, scenes=[Scene()], points=[], lines=[], json=None):
-        if json is None:
-            self.scenes = scenes
+    def __init__(self, scenes=[Scene()], points=[], lines=[], json=None, file=None, animated=None):
+        # animated: miejsca kolekcji ('points', j) i ('lines', j) rysowane blittingiem, domyślnie wykrywane
+        self.animated = animated
+        if file is not None:
+            # plik zapisany przez save() czytamy leniwie, scena po scenie
+            self.scenes = SceneFile(file)
+        elif json is None:
+            # generator albo funkcję tworzącą generator scen oglądamy leniwie
+            if callable(scenes) or not hasattr(scenes, '__getitem__'):
+                scenes = SceneStream(scenes)
             if points or lines:
-                self.scenes[0].points = points
-                self.scenes[0].lines = lines
+                scenes[0].points = points
+                scenes[0].lines = lines
+            # listę scen zapisujemy jako klatki kluczowe i różnice
+            self.scenes = scenes if isinstance(scenes, SceneStream) else SceneStore(scenes)
         else:
-            self.scenes = [Scene([PointsCollection(pointsCol) for pointsCol in scene["points"]],
-                                 [LinesCollection(linesCol) for linesCol in scene["lines"]])
-                           for scene in js.loads(json)]
+            self.scenes = SceneStore(Scene([PointsCollection(pointsCol) for pointsCol in scene["points"]],
+                                           [LinesCollection(linesCol) for linesCol in scene["lines"]])
+                                     for scene in js.loads(json))
 
     # Ta metoda ma szczególne znaczenie, ponieważ konfiguruje przyciski i
     # wykonuje tym samym dość skomplikowaną logikę. Zauważmy, że konfigurując każdy
@@ -214,17 +792,36 @@ class Plot:
         b_add_rect.on_clicked(self.callback.add_rect)
         return [b_prev, b_next, b_add_point, b_add_line, b_add_rect]
 
+    # Sceny czytane leniwie (SceneFile, SceneStream) są tylko do odczytu, więc
+    # przed dopisaniem sceny przepisujemy je do SceneStore (strumień jest przy
+    # tym wyczerpywany do końca).
+    def __store(self):
+        if not isinstance(self.scenes, SceneStore):
+            self.scenes = SceneStore(self.scenes)
+            if getattr(self, 'callback', None) is not None:
+                self.callback.scenes = self.scenes
+        return self.scenes
+
     def add_scene(self, scene):
-        self.scenes.append(scene)
+        self.__store().append(scene)
 
     def add_scenes(self, scenes):
-        self.scenes = self.scenes + scenes
+        self.__store().extend(scenes)
+
+    # Metoda save() zapisuje sceny do pliku w formacie kolumnowym (SceneFileWriter),
+    # który można potem otworzyć przez Plot(file=path). Dla dużych animacji jest to
+    # dużo szybsze i mniejsze niż toJson(). Sceny z generatora (np.
+    # FortuneAlgorithm.construct_scenes) można zapisywać bez Plot, na bieżąco:
+    # with SceneFileWriter(path) as writer: writer.extend(scenes)
+    def save(self, path):
+        with SceneFileWriter(path) as writer:
+            writer.extend(self.scenes)
 
     # Metoda toJson() odpowiada za zapisanie stanu obiektu do ciągu znaków w
     # formacie JSON.
     def toJson(self):
         return js.dumps([{"points": [np.array(pointCol.points).tolist() for pointCol in scene.points],
-                          "lines": [linesCol.lines for linesCol in scene.lines]}
+                          "lines": [np.array(linesCol.lines).tolist() for linesCol in scene.lines]}
                          for scene in self.scenes])
 
         # Metoda ta zwraca punkty dodane w trakcie rysowania.
@@ -261,10 +858,43 @@ class Plot:
     def draw(self):
         plt.close()
         fig = plt.figure()
-        self.callback = _Button_callback(self.scenes)
+        self.callback = _Button_callback(self.scenes, self.animated)
         self.widgets = self.__configure_buttons()
         ax = plt.axes(autoscale_on=False)
         self.callback.set_axes(ax)
         fig.canvas.mpl_connect('button_press_event', self.callback.on_click)
         plt.show()
         self.callback.draw()
+
+
+# Funkcja check_navigation sprawdza, czy scena wygląda tak samo po dojściu do
+# niej krok po kroku (next, z blittingiem i dorysowywaniem na tle) i po jump w
+# nowo otwartym wykresie. Argumenty plot_kwargs trafiają do Plot (scenes,
+# file, animated). Porównujemy zakres osi i piksele płótna, więc potrzebny jest
+# backend oparty o Agg (np. matplotlib.use('Agg')). Zwraca numery scen, które
+# się różnią.
+def check_navigation(indices=None, **plot_kwargs):
+    plot = Plot(**plot_kwargs)
+    indices = sorted(set(range(len(plot.scenes)) if indices is None else indices))
+
+    def snapshot(callback):
+        canvas = callback.ax.figure.canvas
+        return np.asarray(canvas.buffer_rgba()).copy(), callback.ax.get_xlim(), callback.ax.get_ylim()
+
+    plot.draw()
+    stepped = {}
+    for k in range(indices[-1] + 1 if indices else 0):
+        if k:
+            plot.callback.next(None)
+        if k in indices:
+            stepped[k] = snapshot(plot.callback)
+
+    different = []
+    for k in indices:
+        plot.draw()
+        plot.callback.jump(k)
+        pixels, xlim, ylim = snapshot(plot.callback)
+        if xlim != stepped[k][1] or ylim != stepped[k][2] or not np.array_equal(pixels, stepped[k][0]):
+            different.append(k)
+    plt.close()
+    return different
@@ -1,4 +1,5 @@
 import numpy as np
+from Point_location import SiteGrid
 
 
 class VoronoiDiagram:
@@ -19,8 +20,19 @@ class VoronoiDiagram:
         self.vertices = []
         self.half_edges = []
 
+        # dopisywany indeks krawędzi, które mają już oba końce, complete_edges zwraca widok na niego
+        self.finished_edge_count = 0
+        self._finished_edges = np.empty((max(16, 2 * len(self.sites)), 2, 2), dtype=np.float64)
+        # po insert_site/remove_site indeks krawędzi jest odbudowywany przy najbliższym complete_edges
+        self._finished_edges_stale = False
+        # ustawiane przez FortuneAlgorithm.bound, po obramowaniu diagramu nie zmieniamy już lokalnie
+        self.bounded = False
+        # siatka kubełków dla locate, budowana przy pierwszym zapytaniu
+        self._locator = None
+
     def add_half_edge(self, face):
         half_edge = HalfEdge(face)
+        half_edge.index = len(self.half_edges)
 
         if face.edge is None:
             face.edge = half_edge
@@ -30,14 +42,765 @@ class VoronoiDiagram:
 
     def add_vertex(self, point):
 
-        vertex = Vertex(np.array(point))
+        vertex = Vertex(np.array(point), len(self.vertices))
 
         self.vertices.append(vertex)
 
         return vertex
 
+    # algorytm zamiatający zmienia półproste tylko przez poniższe metody, dzięki temu może pracować również
+    # na CompactVoronoiDiagram, gdzie półprosta i wierzchołek są tylko indeksami w tablicach.
+    # Półprosta z bliźniakiem trafia do indeksu krawędzi w chwili, gdy dostaje drugi koniec
+    def set_origin(self, half_edge, vertex):
+        if half_edge.origin is None and half_edge.destination is not None and half_edge.twin is not None:
+            self._finish_edge(vertex.point, half_edge.destination.point)
+        half_edge.origin = vertex
+
+    def set_destination(self, half_edge, vertex):
+        if half_edge.destination is None and half_edge.origin is not None and half_edge.twin is not None:
+            self._finish_edge(half_edge.origin.point, vertex.point)
+        half_edge.destination = vertex
+
+    def _finish_edge(self, origin, destination):
+        if self.finished_edge_count == len(self._finished_edges):
+            self._finished_edges = _grow(self._finished_edges)
+        self._finished_edges[self.finished_edge_count] = (origin, destination)
+        self.finished_edge_count += 1
+
+    def set_twins(self, half_edge1, half_edge2):
+        half_edge1.twin = half_edge2
+        half_edge2.twin = half_edge1
+
+    def link(self, prev, next):
+        prev.next = next
+        next.prev = prev
+
+    def complete_edges(self):
+        '''
+        krawędzie (półproste, które mają już oba końce) w kolejności domykania, bez półprostych dodanych na
+        obramowaniu przez link_box_boundary (nie mają bliźniaka). Koszt O(1): indeks jest tylko dopisywany, więc
+        zwrócony widok nie zmienia się przy kolejnych zdarzeniach i może od razu trafić do sceny
+        Po insert_site/remove_site indeks jest raz odbudowywany w O(n), a krawędzie są w kolejności half_edges;
+        jak przy budowie, każda krawędź występuje dwa razy, raz dla każdej z jej półprostych
+        :return: widok (F, 2, 2) par punktów (początek, koniec)
+        '''
+        if self._finished_edges_stale:
+            self.finished_edge_count = 0
+            for e in self.half_edges:
+                if e.twin is not None and e.origin is not None and e.destination is not None:
+                    self._finish_edge(e.origin.point, e.destination.point)
+            self._finished_edges_stale = False
+        return self._finished_edges[:self.finished_edge_count]
+
+    def sites_array(self):
+        #kopia, punkty są rozproszone po obiektach Site
+        return np.array([s.point for s in self.sites], dtype=float).reshape(-1, 2)
+
+    def vertices_array(self, start=0):
+        #kopia, punkty są rozproszone po obiektach Vertex; start pomija wierzchołki o mniejszych indeksach
+        return np.array([v.point for v in self.vertices[start:]], dtype=float).reshape(-1, 2)
+
+    def edges_array(self):
+        '''
+        :return: tablica (E, 2) indeksów (w vertices_array) początku i końca każdej półprostej, -1 oznacza brak końca
+        '''
+        index = {id(v): i for i, v in enumerate(self.vertices)}
+        edges = np.full((len(self.half_edges), 2), -1, dtype=np.int32)
+        for i, e in enumerate(self.half_edges):
+            if e.origin is not None:
+                edges[i, 0] = index[id(e.origin)]
+            if e.destination is not None:
+                edges[i, 1] = index[id(e.destination)]
+        return edges
+
+    def locate(self, query_points):
+        '''
+        komórki zawierające punkty, czyli najbliższe site (metryka euklidesowa), zob. Point_location
+        :param query_points: tablica (Q, 2) punktów
+        :return: tablica (Q,) indeksów site
+        '''
+        if self._locator is None:
+            self._locator = SiteGrid(self.sites_array())
+        return self._locator.nearest(query_points)
+
+    # lokalne zmiany zbioru punktów (diagram po construct, przed bound, metryka euklidesowa).
+    # W języku triangulacji Delaunaya (dualnej do diagramu) to krok algorytmu Bowyera-Watsona: wierzchołek diagramu
+    # to trójkąt, a jest "zły", gdy nowy punkt leży w jego okręgu opisanym. Półproste kończą się w nieskończoności
+    # na trójkątach (a, b, nieskończoność) nad bokami otoczki wypukłej, taki trójkąt jest zły, gdy punkt leży za bokiem.
+    # Zmieniamy tylko komórki, których dotyka obszar złych wierzchołków, więc koszt zależy od jego rozmiaru, nie od n.
+
+    def nearest_site(self, point, start=None):
+        '''
+        najbliższy punkt diagramu, zachłanne przejście po sąsiednich komórkach (krawędziach triangulacji Delaunaya)
+        :param start: Site, od którego zaczynamy, najlepiej leżący blisko point
+        '''
+        px, py = point
+        site = start if start is not None else self.sites[0]
+        distance = (site.point[0] - px) ** 2 + (site.point[1] - py) ** 2
+        improved = True
+        while improved:
+            improved = False
+            for face in site.face.neighbors():
+                x, y = face.site.point
+                if (x - px) ** 2 + (y - py) ** 2 < distance:
+                    site, distance, improved = face.site, (x - px) ** 2 + (y - py) ** 2, True
+        return site
+
+    def insert_site(self, point, near=None):
+        '''
+        dodaje punkt i naprawia tylko komórki, które zmienia jego nowa komórka. Wynik jest taki sam jak przy
+        ponownym zamiataniu wszystkich punktów (z dokładnością do kolejności półprostych i wierzchołków)
+        :param point: nowy punkt (x, y)
+        :param near: indeks punktu leżącego blisko point, od niego zaczynamy szukanie komórki, która zawiera point
+        :return: Site nowego punktu (jego indeks to len(sites) - 1)
+        '''
+        if self.bounded:
+            raise ValueError('insert_site works on a diagram before bound')
+        self._locator = None
+        point = (float(point[0]), float(point[1]))
+        if len(self.vertices) == 0:
+            return self._rebuild([s.point for s in self.sites] + [point])
+
+        try:
+            return self._insert_site(point, self.sites[near] if near is not None else self.sites[-1])
+        except _DegenerateUpdate:
+            return self._rebuild([s.point for s in self.sites] + [point])
+
+    def _insert_site(self, point, start):
+        px, py = point
+        bad = {}
+        bad_vertices = []
+
+        def vertex_bad(vertex, site):
+            key = id(vertex)
+            if key not in bad:
+                (x, y), (sx, sy) = vertex.point, site.point
+                bad[key] = (x - px) ** 2 + (y - py) ** 2 < (x - sx) ** 2 + (y - sy) ** 2
+                if bad[key]:
+                    bad_vertices.append(vertex)
+            return bad[key]
+
+        def ghost_bad(ray):
+            #ray to półprosta kończąca się w nieskończoności, ab to bok otoczki (a po lewej stronie półprostej)
+            key = id(ray)
+            if key not in bad:
+                (ax, ay), (bx, by) = ray.incident_face.site.point, ray.twin.incident_face.site.point
+                #zewnętrzna normalna boku ab to wektor a - b obrócony w prawo
+                side = (px - ax) * (ay - by) - (py - ay) * (ax - bx)
+                if side == 0:
+                    bad[key] = (px - ax) * (bx - ax) + (py - ay) * (by - ay) > 0 and \
+                               (px - bx) * (ax - bx) + (py - by) * (ay - by) > 0
+                else:
+                    bad[key] = side > 0
+            return bad[key]
+
+        def corners(face):
+            #narożnik i to początek półprostej i, w łańcuchu komórki nieograniczonej dochodzi narożnik w nieskończoności
+            chain = list(face.half_edges())
+            flags, around = [], []
+            for i, half_edge in enumerate(chain):
+                if half_edge.twin is None or half_edge.origin is None and half_edge.destination is None:
+                    raise _DegenerateUpdate()
+                neighbors = [half_edge.twin.incident_face]
+                if half_edge.origin is None:
+                    flags.append(ghost_bad(half_edge.twin))
+                else:
+                    flags.append(vertex_bad(half_edge.origin, face.site))
+                    neighbors.append(chain[i - 1].twin.incident_face)
+                around.append(neighbors)
+            if chain[0].origin is None:
+                flags.append(ghost_bad(chain[-1]))
+                around.append([chain[-1].twin.incident_face])
+            return chain, flags, around
+
+        #komórki ze złymi narożnikami, obszar złych wierzchołków jest spójny, więc szukamy go wszerz od komórki punktu
+        affected = {}
+        queue = [self.nearest_site(point, start).face]
+        while queue:
+            face = queue.pop()
+            if id(face) in affected:
+                continue
+            chain, flags, around = corners(face)
+            if not any(flags):
+                if not affected:
+                    raise _DegenerateUpdate()
+                continue
+            affected[id(face)] = (face, chain, flags)
+            for flag, neighbors in zip(flags, around):
+                if flag:
+                    queue.extend(neighbor for neighbor in neighbors if id(neighbor) not in affected)
+
+        site = Site(len(self.sites), point, None)
+        new_face = Face(site, None)
+        site.face = new_face
+
+        cut = {}
+        removed = {}
+        changed = []
+        new_half_edges = []
+
+        def cut_vertex(half_edge, other):
+            #nowy wierzchołek na przecinanej krawędzi, wspólny dla obu jej półprostych
+            key = min(id(half_edge), id(half_edge.twin))
+            if key not in cut:
+                cut[key] = self.add_vertex(_circumcenter(point, half_edge.incident_face.site.point, other))
+            return cut[key]
+
+        for face, chain, flags in affected.values():
+            m, k = len(flags), len(chain)
+            starts = [i for i in range(m) if flags[i] and not flags[i - 1]]
+            if len(starts) != 1:
+                raise _DegenerateUpdate()
+            s = starts[0]
+            length = 1
+            while flags[(s + length) % m]:
+                length += 1
+            e = (s + length - 1) % m
+
+            #półprosta wchodząca w złe narożniki i wychodząca z nich zostają przycięte, te pomiędzy znikają
+            h_in = chain[s - 1] if s > 0 or m == k else None
+            h_out = chain[e] if e < k else None
+            for j in range(length - 1):
+                i = (s + j) % m
+                if i < k:
+                    removed[id(chain[i])] = chain[i]
+
+            w_in = cut_vertex(h_in, h_in.twin.incident_face.site.point) if h_in is not None else None
+            w_out = cut_vertex(h_out, h_out.twin.incident_face.site.point) if h_out is not None else None
+            changed.append((face, chain, h_in, w_in, h_out, w_out))
+
+        if any(h_in is not None and id(h_in) in removed or h_out is not None and id(h_out) in removed
+               for _, _, h_in, _, h_out, _ in changed):
+            raise _DegenerateUpdate()
+
+        self.sites.append(site)
+        self.faces.append(new_face)
+        for face, chain, h_in, w_in, h_out, w_out in changed:
+            if h_in is not None:
+                h_in.destination = w_in
+                h_in.twin.origin = w_in
+            if h_out is not None:
+                h_out.origin = w_out
+                h_out.twin.destination = w_out
+            half_edge = self.add_half_edge(face)
+            twin = self.add_half_edge(new_face)
+            half_edge.origin, half_edge.destination = w_in, w_out
+            twin.origin, twin.destination = w_out, w_in
+            self.set_twins(half_edge, twin)
+            new_half_edges.append(twin)
+            self._relink(face, [h for h in chain if id(h) not in removed] + [half_edge])
+        self._relink(new_face, new_half_edges)
+
+        for half_edge in removed.values():
+            self._remove_half_edge(half_edge)
+        for vertex in bad_vertices:
+            self._remove_vertex(vertex)
+        self._finished_edges_stale = True
+        return site
+
+    def remove_site(self, idx):
+        '''
+        usuwa punkt, jego komórkę dzielą między siebie sąsiedzi. Nowe wierzchołki to wierzchołki diagramu samych
+        sąsiadów leżące w starej komórce (liczymy go zamiataniem, koszt O(d log d) dla d sąsiadów), krawędzie
+        sąsiadów przechodzące przez stare narożniki komórki zostają przedłużone do nowych wierzchołków.
+        Ostatni punkt przejmuje indeks usuniętego (jak przy usuwaniu przez zamianę z ostatnim elementem listy)
+        :param idx: indeks usuwanego punktu w sites
+        '''
+        if self.bounded:
+            raise ValueError('remove_site works on a diagram before bound')
+        self._locator = None
+        try:
+            if len(self.sites) <= 4:
+                raise _DegenerateUpdate()
+            self._remove_site(idx)
+        except _DegenerateUpdate:
+            self._rebuild([s.point for i, s in enumerate(self.sites) if i != idx])
+
+    def _remove_site(self, idx):
+        from Fortune_algorithm import FortuneAlgorithm
+
+        site = self.sites[idx]
+        face = site.face
+        chain = list(face.half_edges())
+        if not chain or any(h.twin is None or h.origin is None and h.destination is None for h in chain):
+            raise _DegenerateUpdate()
+
+        neighbors = []
+        for half_edge in chain:
+            if all(half_edge.twin.incident_face is not f for f in neighbors):
+                neighbors.append(half_edge.twin.incident_face)
+        neighbor_chains = [list(f.half_edges()) for f in neighbors]
+
+        local = FortuneAlgorithm([f.site.point for f in neighbors], named_metric='euclidean_2d_scalar')
+        local.construct()
+        small = local.diagram
+        big_face = {id(small.faces[i]): f for i, f in enumerate(neighbors)}
+
+        #wierzchołek diagramu sąsiadów jest nowym wierzchołkiem, gdy leży w starej komórce, czyli bliżej usuwanego
+        #punktu niż swoich trzech sąsiadów (oni są najbliżej spośród wszystkich pozostałych)
+        ax, ay = site.point
+        new_vertices = {}
+        for half_edge in small.half_edges:
+            vertex = half_edge.origin
+            if vertex is not None and id(vertex) not in new_vertices:
+                (x, y), (sx, sy) = vertex.point, half_edge.incident_face.site.point
+                new_vertices[id(vertex)] = (x - ax) ** 2 + (y - ay) ** 2 < (x - sx) ** 2 + (y - sy) ** 2
+        new_vertices = {key: self.add_vertex(v.point) for key, v in
+                        ((id(v), v) for v in small.vertices) if new_vertices.get(key)}
+
+        outside = object()
+
+        def mapped(vertex):
+            if vertex is None:
+                return None
+            return new_vertices.get(id(vertex), outside)
+
+        small_by_pair = {}
+        for half_edge in small.half_edges:
+            if half_edge.twin is not None:
+                small_by_pair[(id(big_face[id(half_edge.incident_face)]),
+                               id(big_face[id(half_edge.twin.incident_face)]))] = half_edge
+
+        #krawędzie sąsiadów wychodzące ze starych narożników komórki: nowy początek to koniec krawędzi diagramu
+        #sąsiadów po stronie starej komórki (oba mają tę samą ścianę po lewej, więc ten sam kierunek)
+        extended = set()
+        for half_edge in chain:
+            if half_edge.origin is None:
+                continue
+            corner_edge = half_edge.twin.next
+            if corner_edge is None or corner_edge.origin is not half_edge.origin:
+                raise _DegenerateUpdate()
+            pair = (id(corner_edge.incident_face), id(corner_edge.twin.incident_face))
+            small_edge = small_by_pair.get(pair)
+            if small_edge is None or pair in extended:
+                raise _DegenerateUpdate()
+            origin = mapped(small_edge.origin)
+            if origin is outside:
+                raise _DegenerateUpdate()
+            extended.add(pair)
+            extended.add(pair[::-1])
+            corner_edge.origin = origin
+            corner_edge.twin.destination = origin
+
+        added = {id(f): [] for f in neighbors}
+        for half_edge in small.half_edges:
+            twin = half_edge.twin
+            if twin is None or half_edge.index > twin.index:
+                continue
+            pair = (id(big_face[id(half_edge.incident_face)]), id(big_face[id(twin.incident_face)]))
+            origin, destination = mapped(half_edge.origin), mapped(half_edge.destination)
+            if pair in extended or (origin is None or origin is outside) and \
+                    (destination is None or destination is outside):
+                continue
+            if origin is outside or destination is outside:
+                raise _DegenerateUpdate()
+            left = self.add_half_edge(big_face[id(half_edge.incident_face)])
+            right = self.add_half_edge(big_face[id(twin.incident_face)])
+            left.origin, left.destination = origin, destination
+            right.origin, right.destination = destination, origin
+            self.set_twins(left, right)
+            added[pair[0]].append(left)
+            added[pair[1]].append(right)
+
+        removed = {id(h): h for h in chain}
+        removed.update((id(h.twin), h.twin) for h in chain)
+        for neighbor, neighbor_chain in zip(neighbors, neighbor_chains):
+            self._relink(neighbor, [h for h in neighbor_chain if id(h) not in removed] + added[id(neighbor)])
+
+        for vertex in {id(h.origin): h.origin for h in chain if h.origin is not None}.values():
+            self._remove_vertex(vertex)
+        for half_edge in removed.values():
+            self._remove_half_edge(half_edge)
+
+        last = self.sites.pop()
+        last_face = self.faces.pop()
+        if last is not site:
+            last.idx = idx
+            self.sites[idx] = last
+            self.faces[idx] = last_face
+        self._finished_edges_stale = True
+
+    def _relink(self, face, half_edges):
+        #łączy półproste ściany w cykl (albo łańcuch od półprostej bez początku) po wspólnych wierzchołkach
+        starts = {id(h.origin): h for h in half_edges if h.origin is not None}
+        for half_edge in half_edges:
+            half_edge.prev = None
+        face.edge = half_edges[0] if half_edges else None
+        for half_edge in half_edges:
+            following = starts.get(id(half_edge.destination)) if half_edge.destination is not None else None
+            half_edge.next = following
+            if following is not None:
+                following.prev = half_edge
+            if half_edge.origin is None:
+                face.edge = half_edge
+
+    def _remove_half_edge(self, half_edge):
+        #usuwanie przez zamianę z ostatnim elementem, O(1)
+        last = self.half_edges.pop()
+        if last is not half_edge:
+            last.index = half_edge.index
+            self.half_edges[half_edge.index] = last
+
+    def _remove_vertex(self, vertex):
+        last = self.vertices.pop()
+        if last is not vertex:
+            last.index = vertex.index
+            self.vertices[vertex.index] = last
+
+    def _rebuild(self, points):
+        #pełne zamiatanie, gdy zmiana lokalna nie ma sensu (bardzo mało punktów, punkty współliniowe, współokręgowe)
+        from Fortune_algorithm import FortuneAlgorithm
+
+        fortune = FortuneAlgorithm(points, named_metric='euclidean_2d_scalar')
+        fortune.construct()
+        self.__dict__.update(fortune.diagram.__dict__)
+        self._finished_edges_stale = True
+        return self.sites[-1] if self.sites else None
+
+
+class CompactVoronoiDiagram:
+    '''
+    zwarta wersja VoronoiDiagram dla dużych zbiorów punktów. Wierzchołki trzymane są w jednym rosnącym buforze (V, 2)
+    float64, a półproste jako tablice int32 (początek, koniec, ściana, bliźniak, następna, poprzednia), więc wierzchołek
+    i półprosta są po prostu indeksami. Ściana to indeks site. Obiekty Site zostają, bo korzysta z nich linia brzegowa.
+    vertices_array() i edges_array() zwracają widoki na bufory bez kopiowania; widok jest ważny do czasu
+    kolejnego powiększenia bufora, czyli w praktyce po zakończeniu construct.
+    '''
+
+    def __init__(self, points, capacity=None):
+        self.sites = [Site(idx, p, idx) for idx, p in enumerate(points)]
+        self._sites = np.array(points, dtype=float).reshape(-1, 2)
+
+        if capacity is None:
+            #diagram dla n punktów ma mniej niż 2n wierzchołków i 3n krawędzi (6n półprostych)
+            capacity = max(16, 2 * len(self.sites))
+
+        self.vertex_count = 0
+        self._vertices = np.empty((capacity, 2), dtype=np.float64)
+
+        self.half_edge_count = 0
+        self._edges = np.full((3 * capacity, 2), -1, dtype=np.int32)
+        self._half_edge_faces = np.full(3 * capacity, -1, dtype=np.int32)
+        self._links = np.full((3 * capacity, 3), -1, dtype=np.int32)
+
+        self._face_edges = np.full(len(self.sites), -1, dtype=np.int32)
+
+        self.finished_edge_count = 0
+        self._finished_edges = np.empty((capacity, 2, 2), dtype=np.float64)
+        self.bounded = False
+        self._locator = None
+
+    @classmethod
+    def from_arrays(cls, sites, vertices, edges, faces, links, face_edges, bounded=False):
+        '''
+        diagram na gotowych tablicach (np. zmapowanych z pliku przez Diagram_io.load_diagram), bez kopiowania.
+        Obiekty Site powstają dopiero przy odwołaniu do sites, a indeks krawędzi przy pierwszym complete_edges
+        :param sites, vertices, edges, faces, links, face_edges: tablice jak z sites_array, vertices_array,
+        edges_array, half_edge_faces, half_edge_links i face_edges
+        '''
+        diagram = cls.__new__(cls)
+        diagram._sites = sites
+        diagram.sites = _SiteView(sites)
+        diagram.vertex_count = len(vertices)
+        diagram._vertices = vertices
+        diagram.half_edge_count = len(edges)
+        diagram._edges = edges
+        diagram._half_edge_faces = faces
+        diagram._links = links
+        diagram._face_edges = face_edges
+        diagram.finished_edge_count = 0
+        diagram._finished_edges = None
+        diagram.bounded = bounded
+        diagram._locator = None
+        return diagram
+
+    def add_half_edge(self, face):
+        half_edge = self.half_edge_count
+        if half_edge == len(self._edges):
+            self._edges = _grow(self._edges, -1)
+            self._half_edge_faces = _grow(self._half_edge_faces, -1)
+            self._links = _grow(self._links, -1)
+
+        self._half_edge_faces[half_edge] = face
+        if self._face_edges[face] == -1:
+            self._face_edges[face] = half_edge
+
+        self.half_edge_count += 1
+        return half_edge
+
+    def add_vertex(self, point):
+        vertex = self.vertex_count
+        if vertex == len(self._vertices):
+            self._vertices = _grow(self._vertices)
+
+        self._vertices[vertex] = point
+        self.vertex_count += 1
+        return vertex
+
+    def set_origin(self, half_edge, vertex):
+        destination = self._edges[half_edge, 1]
+        if self._edges[half_edge, 0] == -1 and destination != -1 and self._links[half_edge, 0] != -1:
+            self._finish_edge(self._vertices[vertex], self._vertices[destination])
+        self._edges[half_edge, 0] = vertex
+
+    def set_destination(self, half_edge, vertex):
+        origin = self._edges[half_edge, 0]
+        if self._edges[half_edge, 1] == -1 and origin != -1 and self._links[half_edge, 0] != -1:
+            self._finish_edge(self._vertices[origin], self._vertices[vertex])
+        self._edges[half_edge, 1] = vertex
+
+    def _finish_edge(self, origin, destination):
+        if self._finished_edges is None:
+            self.complete_edges()
+        if self.finished_edge_count == len(self._finished_edges):
+            self._finished_edges = _grow(self._finished_edges)
+        self._finished_edges[self.finished_edge_count, 0] = origin
+        self._finished_edges[self.finished_edge_count, 1] = destination
+        self.finished_edge_count += 1
+
+    def set_twins(self, half_edge1, half_edge2):
+        self._links[half_edge1, 0] = half_edge2
+        self._links[half_edge2, 0] = half_edge1
+
+    def link(self, prev, next):
+        self._links[prev, 1] = next
+        self._links[next, 2] = prev
+
+    def complete_edges(self):
+        #widok (F, 2, 2) na dopisywany indeks krawędzi, jak w VoronoiDiagram.complete_edges
+        if self._finished_edges is None:
+            #diagram z from_arrays: jak przy construct, każda półprosta z bliźniakiem i z oboma końcami
+            edges = self.edges_array()
+            finished = (self.half_edge_links()[:, 0] != -1) & (edges != -1).all(axis=1)
+            self._finished_edges = self.vertices_array()[edges[finished]]
+            self.finished_edge_count = len(self._finished_edges)
+        return self._finished_edges[:self.finished_edge_count]
+
+    def sites_array(self):
+        return self._sites
+
+    def vertices_array(self, start=0):
+        return self._vertices[start:self.vertex_count]
+
+    def edges_array(self):
+        '''
+        :return: widok (E, 2) indeksów początku i końca każdej półprostej, -1 oznacza brak końca
+        '''
+        return self._edges[:self.half_edge_count]
+
+    def locate(self, query_points):
+        #jak VoronoiDiagram.locate
+        if self._locator is None:
+            self._locator = SiteGrid(self._sites)
+        return self._locator.nearest(query_points)
+
+    def half_edge_faces(self):
+        #widok (E,) indeksów ścian (site) po których lewej stronie leży półprosta
+        return self._half_edge_faces[:self.half_edge_count]
+
+    def half_edge_links(self):
+        #widok (E, 3) indeksów: bliźniak, następna i poprzednia półprosta, -1 gdy brak
+        return self._links[:self.half_edge_count]
+
+    def face_edges(self):
+        #pierwsza półprosta każdej ściany, -1 gdy ściana nie ma jeszcze krawędzi
+        return self._face_edges
+
+    def face_half_edges(self, face):
+        '''
+        odpowiednik Face.half_edges dla indeksu ściany. Zamiast zbioru odwiedzonych liczymy kroki: więcej kroków niż
+        półprostych w diagramie oznacza pętlę, która nie przechodzi przez początek (ValueError)
+        :param face: indeks ściany (site)
+        :return: generator indeksów półprostych ściany w kierunku przeciwnym do ruchu wskazówek zegara
+        '''
+        edge = int(self._face_edges[face])
+        if edge == -1:
+            return
+        links = self._links
+        limit = self.half_edge_count
+        first = edge
+        steps = 0
+        while links[first, 2] != -1 and links[first, 2] != edge:
+            first = int(links[first, 2])
+            steps += 1
+            if steps > limit:
+                raise ValueError('half-edges of the face do not form a chain or a cycle', face)
+
+        half_edge = first
+        steps = 0
+        while half_edge != -1:
+            steps += 1
+            if steps > limit:
+                raise ValueError('half-edges of the face do not form a chain or a cycle', face)
+            yield half_edge
+            half_edge = int(links[half_edge, 1])
+            if half_edge == first:
+                return
+
+    def face_vertices(self, face):
+        for half_edge in self.face_half_edges(face):
+            if self._edges[half_edge, 0] != -1:
+                yield int(self._edges[half_edge, 0])
+
+    def face_neighbors(self, face):
+        for half_edge in self.face_half_edges(face):
+            twin = self._links[half_edge, 0]
+            if twin != -1:
+                yield int(self._half_edge_faces[twin])
+
+
+def link_box_boundary(diagram, x_left, y_left, x_right, y_right, starts, ends):
+    '''
+    domyka cykle nieograniczonych ścian wzdłuż prostokąta obramowania, dodając półproste po jego bokach
+    (i wierzchołki w jego rogach). Półproste na obramowaniu nie mają bliźniaka.
+    :param diagram: VoronoiDiagram albo CompactVoronoiDiagram
+    :param starts: lista (ściana, półprosta, wierzchołek, punkt) półprostych, które zaczynają się na obramowaniu
+    :param ends: lista (ściana, półprosta, wierzchołek, punkt) półprostych, które kończą się na obramowaniu
+    '''
+    width = x_right - x_left
+    height = y_right - y_left
+    perimeter = 2 * (width + height)
+
+    def position(point):
+        #położenie punktu na obwodzie liczone od lewego dolnego rogu przeciwnie do ruchu wskazówek zegara
+        x, y = point
+        distances = [abs(y - y_left), abs(x - x_right), abs(y - y_right), abs(x - x_left)]
+        side = distances.index(min(distances))
+        if side == 0:
+            return x - x_left
+        if side == 1:
+            return width + (y - y_left)
+        if side == 2:
+            return width + height + (x_right - x)
+        return 2 * width + height + (y_right - y)
+
+    corners = [(width, (x_right, y_left)), (width + height, (x_right, y_right)),
+               (2 * width + height, (x_left, y_right)), (perimeter, (x_left, y_left))]
+
+    starts_by_face = {}
+    for face, half_edge, vertex, point in starts:
+        starts_by_face.setdefault(face, []).append((position(point), half_edge, vertex))
+
+    for face, end_half_edge, end_vertex, point in ends:
+        if face not in starts_by_face:
+            continue
+        end_position = position(point)
+        # ściany są przeciwne do ruchu wskazówek zegara, więc od końca idziemy po obwodzie do najbliższego początku
+        gap, start_half_edge, start_vertex = min((((start_position - end_position) % perimeter, half_edge, vertex)
+                                                  for start_position, half_edge, vertex in starts_by_face[face]),
+                                                 key=lambda candidate: candidate[0])
+
+        prev_half_edge, prev_vertex = end_half_edge, end_vertex
+        for corner_position, corner in sorted(corners, key=lambda c: (c[0] - end_position) % perimeter):
+            if 0 < (corner_position - end_position) % perimeter < gap:
+                corner_vertex = diagram.add_vertex(corner)
+                prev_half_edge, prev_vertex = _add_box_half_edge(diagram, face, prev_half_edge, prev_vertex,
+                                                                 corner_vertex)
+        if gap > 0:
+            prev_half_edge, prev_vertex = _add_box_half_edge(diagram, face, prev_half_edge, prev_vertex, start_vertex)
+        diagram.link(prev_half_edge, start_half_edge)
+
+
+def _add_box_half_edge(diagram, face, prev_half_edge, origin, destination):
+    half_edge = diagram.add_half_edge(face)
+    diagram.set_origin(half_edge, origin)
+    diagram.set_destination(half_edge, destination)
+    diagram.link(prev_half_edge, half_edge)
+    return half_edge, destination
+
+
+class _DegenerateUpdate(Exception):
+    #lokalna zmiana diagramu trafiła na przypadek zdegenerowany, wtedy insert_site/remove_site liczą diagram od nowa
+    pass
+
+
+def _circumcenter(a, b, c):
+    #środek okręgu opisanego na trójkącie abc, liczony względem a
+    (ax, ay), (bx, by), (cx, cy) = a, b, c
+    bx, by, cx, cy = bx - ax, by - ay, cx - ax, cy - ay
+    d = 2 * (bx * cy - by * cx)
+    if d == 0:
+        raise _DegenerateUpdate()
+    b2, c2 = bx * bx + by * by, cx * cx + cy * cy
+    return ax + (cy * b2 - by * c2) / d, ay + (bx * c2 - cx * b2) / d
+
+
+def canonical_edges(diagram):
+    '''
+    krawędzie diagramu w postaci niezależnej od kolejności budowy, do porównania z diagramem liczonym od nowa
+    :return: tablica (E, 8): punkty obu komórek (mniejszy leksykograficznie pierwszy), początek i koniec krawędzi
+    widzianej z komórki pierwszego punktu (nan, gdy brak końca), posortowana po punktach
+    '''
+    rows = []
+    for e in diagram.half_edges:
+        if e.twin is None or tuple(e.incident_face.site.point) > tuple(e.twin.incident_face.site.point):
+            continue
+        origin = e.origin.point if e.origin is not None else (np.nan, np.nan)
+        destination = e.destination.point if e.destination is not None else (np.nan, np.nan)
+        #krawędzie zerowej długości (punkty współokręgowe) zależą od kolejności budowy
+        if e.origin is not None and e.destination is not None and np.allclose(origin, destination):
+            continue
+        rows.append((*e.incident_face.site.point, *e.twin.incident_face.site.point, *origin, *destination))
+    rows = np.array(rows, dtype=float).reshape(-1, 8)
+    return rows[np.lexsort(rows[:, 3::-1].T)]
+
+
+def _sorted_complete_edges(diagram):
+    #complete_edges bez krawędzi zerowej długości, posortowane (kolejność indeksu zależy od kolejności budowy)
+    edges = np.asarray(diagram.complete_edges(), dtype=float).reshape(-1, 4)
+    edges = edges[~np.isclose(edges[:, :2], edges[:, 2:]).all(axis=1)]
+    return edges[np.lexsort(edges[:, ::-1].T)]
+
+
+def diagrams_match(diagram, other, tolerance=1e-6):
+    '''
+    czy dwa diagramy (np. po insert_site/remove_site i policzony od nowa) mają te same krawędzie, zarówno w DCEL,
+    jak i w indeksie complete_edges. Tolerancja jest względna, bo wierzchołki prawie zdegenerowanych trójkątów leżą
+    daleko i zamiatanie liczy je mniej dokładnie
+    '''
+    for a, b in ((canonical_edges(diagram), canonical_edges(other)),
+                 (_sorted_complete_edges(diagram), _sorted_complete_edges(other))):
+        if a.shape != b.shape or not np.allclose(a, b, atol=tolerance, rtol=tolerance, equal_nan=True):
+            return False
+    return True
+
+
+def _grow(buffer, fill=None):
+    #podwaja pierwszy wymiar bufora, nowe miejsca wypełnia fill (albo zostawia niezainicjalizowane)
+    if fill is None:
+        grown = np.empty((2 * len(buffer),) + buffer.shape[1:], dtype=buffer.dtype)
+    else:
+        grown = np.full((2 * len(buffer),) + buffer.shape[1:], fill, dtype=buffer.dtype)
+    grown[:len(buffer)] = buffer
+    return grown
+
+
+class _SiteView:
+    #lekka sekwencja obiektów Site nad tablicą punktów, tworzy Site dopiero przy odwołaniu (dla from_arrays)
+
+    def __init__(self, points):
+        self.points = points
+
+    def __len__(self):
+        return len(self.points)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        return Site(idx, tuple(self.points[idx]), idx)
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
 
 class Site:
+    # obiekty diagramu powstają w milionach przy dużych zbiorach punktów, stąd __slots__ zamiast __dict__
+    __slots__ = ('idx', 'point', 'face')
 
     def __init__(self, idx, point, face):
         self.idx = idx
@@ -46,21 +809,71 @@ class Site:
 
 
 class Vertex:
+    #index to pozycja w VoronoiDiagram.vertices, pozwala usuwać wierzchołki w O(1) przy lokalnych zmianach diagramu
+    __slots__ = ('point', 'index')
 
-    def __init__(self, point):
+    def __init__(self, point, index=-1):
         self.point = point
+        self.index = index
 
 
 class HalfEdge:
+    __slots__ = ('origin', 'destination', 'incident_face', 'twin', 'next', 'prev', 'index')
 
     def __init__(self, incident_face, origin=None, destination=None):
         self.origin = origin
         self.destination = destination
         self.incident_face = incident_face
+        #pozycja w VoronoiDiagram.half_edges
+        self.index = -1
+        #bliźniacza półprosta (ta sama krawędź widziana z sąsiedniej ściany) oraz sąsiedzi w cyklu ściany
+        self.twin = None
+        self.next = None
+        self.prev = None
 
 
 class Face:
+    __slots__ = ('site', 'edge')
 
     def __init__(self, site, edge=None):
         self.site = site
         self.edge = edge
+
+    def half_edges(self):
+        '''
+        przechodzi po półprostych ściany w kierunku przeciwnym do ruchu wskazówek zegara, koszt O(rozmiar komórki).
+        Po bound cykl jest zamknięty; wcześniej komórki nieograniczone są łańcuchem i zwracamy go od początku.
+        Półprosta odwiedzona drugi raz przed powrotem do początku oznacza zepsute łącza next/prev (pętla, która
+        nie przechodzi przez początek), wtedy zamiast chodzić w kółko zgłaszamy ValueError
+        '''
+        if self.edge is None:
+            return
+        first = self.edge
+        visited = {first}
+        while first.prev is not None and first.prev is not self.edge:
+            first = first.prev
+            if first in visited:
+                raise ValueError('half-edges of the face do not form a chain or a cycle', self.site.idx)
+            visited.add(first)
+
+        visited = set()
+        half_edge = first
+        while half_edge is not None:
+            if half_edge in visited:
+                raise ValueError('half-edges of the face do not form a chain or a cycle', self.site.idx)
+            visited.add(half_edge)
+            yield half_edge
+            half_edge = half_edge.next
+            if half_edge is first:
+                return
+
+    def vertices(self):
+        for half_edge in self.half_edges():
+            if half_edge.origin is not None:
+                yield half_edge.origin
+
+    def neighbors(self):
+        #ściany sąsiednie, półproste na obramowaniu nie mają bliźniaka
+        for half_edge in self.half_edges():
+            if half_edge.twin is not None:
+                yield half_edge.twin.incident_face